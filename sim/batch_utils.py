@@ -0,0 +1,132 @@
+# sim/batch_utils.py
+# Helpers shared by the batched (array-per-field) simulation engines.
+
+import numpy as np
+
+from market_timeline import MarketTimeline, REGIME_BULL, REGIME_BEAR
+
+def stack_state_field(states, key, default=0.0, dtype=np.float64):
+    """Stacks one field from a list of state dicts into an array (one entry per run)."""
+    return np.array([s.get(key, default) for s in states], dtype=dtype)
+
+def stack_market_inputs(states, num_months, month_offset=0):
+    """
+    Builds per-run, per-month market input arrays of shape (N, num_months) from each state's
+    MarketTimeline ('market_timeline', or one built from 'market_features_df' /
+    'market_trend_monthly_pct_change'). Month t reads position t + month_offset, exactly as
+    the scalar engines do. Runs sharing a timeline (or the same source objects) share one window.
+    """
+    n = len(states)
+    windows = {}
+    rows = []
+    for s in states:
+        timeline = s.get('market_timeline')
+        source_key = id(timeline) if timeline is not None else (id(s.get('market_features_df')), id(s.get('market_trend_monthly_pct_change')))
+        if source_key not in windows:
+            windows[source_key] = MarketTimeline.from_state(s).window(num_months, month_offset)
+        rows.append(source_key)
+    market = {}
+    for name in MarketTimeline.FIELDS:
+        first = windows[rows[0]][name]
+        if len(windows) == 1:
+            market[name] = np.broadcast_to(first, (n, num_months))
+        else:
+            market[name] = np.stack([windows[key][name] for key in rows])
+    return market
+
+def random_source(rng=None):
+    """
+    Where an engine draws its random numbers from: a np.random.Generator for a SeedSequence
+    or int seed, or the global np.random module when rng is None (unseeded, the engines'
+    behaviour before explicit streams). A Generator, or any object with its draw methods
+    (uniform/random/normal/binomial/choice/spawn, e.g. variance_reduction.AntitheticGenerator),
+    passes through unchanged.
+    """
+    if rng is None or rng is np.random:
+        return np.random
+    if isinstance(rng, (int, np.integer, np.random.SeedSequence, np.random.BitGenerator)):
+        return np.random.default_rng(rng)
+    return rng
+
+def split_random_source(source, n):
+    """n independent child generators of a Generator source (np.random itself stays one shared stream).
+    Lets up-front draws (demand paths) and per-month draws use separate streams, so a shorter
+    run draws the same numbers as the first months of a longer one."""
+    if source is np.random:
+        return [source] * n
+    return source.spawn(n)
+
+def engine_streams(rng=None):
+    """
+    (demand_source, step_source) of an engine run: child 0 of rng feeds the up-front demand
+    paths (see demand_paths.demand_streams), child 1 the per-month draws. Every engine uses
+    this layout, so runs of different models given the same seed draw the same demand-side
+    numbers (common random numbers). Both are np.random when rng is None.
+    """
+    return split_random_source(random_source(rng), 2)
+
+def effective_growth_and_churn(base_growth_rate, impact_factor, trend, volatility_30d, drawdown, regime, extreme_event, rng=None):
+    """Array version of the market-feature block shared by all three engines' demand updaters.
+    Extreme-event shocks are drawn from random_source(rng)."""
+    # --- Trend: modulate growth rate ---
+    effective_growth_rate = base_growth_rate * (1 + trend * impact_factor)
+    # --- Regime: switch between optimistic/pessimistic growth ---
+    effective_growth_rate = np.where(regime == REGIME_BULL, effective_growth_rate * 1.2, effective_growth_rate)
+    effective_growth_rate = np.where(regime == REGIME_BEAR, effective_growth_rate * 0.8, effective_growth_rate)
+    # --- Volatility: modulate churn/staking ---
+    churn_multiplier = np.where(volatility_30d > 0.08, 1.0 + 0.05, 1.0)
+    # --- Drawdown: trigger panic events ---
+    panic = drawdown < -0.3
+    effective_growth_rate = np.where(panic, effective_growth_rate * 0.5, effective_growth_rate)
+    churn_multiplier = np.where(panic, churn_multiplier + 0.10, churn_multiplier)
+    # --- Extreme event: apply random demand shock ---
+    if extreme_event.any():
+        effective_growth_rate = effective_growth_rate.copy()
+        effective_growth_rate[extreme_event] *= random_source(rng).uniform(0.7, 1.3, size=int(extreme_event.sum()))
+    return effective_growth_rate, churn_multiplier
+
+def batch_history_to_frame(history, run_index):
+    """Returns the month-by-month history of a single run from a batched history as a DataFrame."""
+    import pandas as pd
+    return pd.DataFrame({col: values[:, run_index] for col, values in history.items()})
+
+def kpi_reduction(kpi_name):
+    """How calc_metrics_market reduces an optional KPI column: 'sum', 'mean' or 'final'."""
+    if "total_" in kpi_name or "outflows" in kpi_name or "_slashed" in kpi_name:
+        return 'sum'
+    if "avg_" in kpi_name:
+        return 'mean'
+    return 'final'
+
+def batch_metrics(history, price_col, node_col, **kwargs):
+    """
+    Array version of compare_with_market.calc_metrics_market: reduces a batched history
+    (column -> array of shape (months, N)) to one metrics dict per run.
+    """
+    n = history[price_col].shape[1]
+    metrics = {}
+    price = history[price_col]
+    metrics['final_price'] = price[-1]
+    metrics['lowest_price'] = price.min(axis=0)
+    metrics['price_std_dev'] = price.std(axis=0, ddof=1) if len(price) > 1 else np.full(n, np.nan)
+    if node_col in history:
+        nodes = history[node_col].astype(np.float64)
+        metrics['final_node_count'] = nodes[-1]
+        metrics['peak_node_count'] = nodes.max(axis=0)
+        metrics['avg_node_growth'] = np.diff(nodes, axis=0).mean(axis=0) if len(nodes) > 1 else np.full(n, np.nan)
+    else:
+        for name in ('final_node_count', 'peak_node_count', 'avg_node_growth'):
+            metrics[name] = np.full(n, np.nan)
+    for kpi_name, col_name in kwargs.items():
+        if col_name and col_name in history:
+            values = history[col_name].astype(np.float64)
+            reduction = kpi_reduction(kpi_name)
+            if reduction == 'sum':
+                metrics[kpi_name] = values.sum(axis=0)
+            elif reduction == 'mean':
+                metrics[kpi_name] = values.mean(axis=0)
+            else:
+                metrics[kpi_name] = values[-1]
+        else:
+            metrics[kpi_name] = np.full(n, np.nan)
+    return [{k: float(v[i]) for k, v in metrics.items()} for i in range(n)]
@@ -0,0 +1,104 @@
+# sim/benchmark_state_records.py
+# Micro-benchmark: per-step state overhead of plain dicts vs the slotted state records. Each
+# engine's real run_* loop (all its handlers, demand paths and history) runs once on its
+# StateRecord class and once with that class swapped for DictState, which keeps the same
+# fields in a per-instance dict and snapshots by copying it, as the dict-based engines did.
+# Run from sim/:  python benchmark_state_records.py
+
+import timeit
+import sys
+import io
+import contextlib
+import numpy as np
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import compare_with_market as cwm
+import simulation_engine as engine1
+import simulation_engine_proposal as engine2
+import simulation_engine_bme as engine3
+from state_records import OriginalState, ProposalState, BmeState
+
+SEED = 0  # Same draws for both state types, so both runs take the same path
+
+class DictState:
+    """Dict-backed state with the StateRecord interface the engines use: fields live in the
+    instance __dict__ and snapshot() copies it (the history rows are plain dicts)."""
+
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(**state)
+
+    def snapshot(self):
+        return self.__dict__.copy()
+
+    @classmethod
+    def history_to_dicts(cls, snapshots):
+        return snapshots
+
+    # --- Mapping compatibility ---
+    def __getitem__(self, key):
+        return self.__dict__[key]
+
+    def __setitem__(self, key, value):
+        self.__dict__[key] = value
+
+    def __contains__(self, key):
+        return key in self.__dict__
+
+    def get(self, key, default=None):
+        return self.__dict__.get(key, default)
+
+@contextlib.contextmanager
+def engine_state_class(module, record_cls, state_cls):
+    """Runs the engine module with state_cls in place of its record class."""
+    setattr(module, record_cls.__name__, state_cls)
+    try:
+        yield
+    finally:
+        setattr(module, record_cls.__name__, record_cls)
+
+def engine_runs():
+    """{record class: (engine module, run(), months per run)} at the base shared parameters."""
+    shared = cwm.BASE_SHARED_PARAMS
+    years = shared['SIMULATION_YEARS']
+    timeline = cwm.MarketTimeline.from_trend_series(np.zeros(years * 12))
+    return {
+        OriginalState: (engine1, lambda: engine1.run_simulation(cwm.build_initial_state_original(shared, timeline), years, rng=SEED), years * 12),
+        ProposalState: (engine2, lambda: engine2.run_simulation_proposal(cwm.build_initial_state_proposal(shared, timeline), cwm.p2_module, years, rng=SEED), years * 12),
+        BmeState: (engine3, lambda: engine3.run_simulation_bme(cwm.build_initial_state_bme(shared, timeline), cwm.p3_module, years, rng=SEED), years * 12),
+    }
+
+def bench_state_overhead(record_cls, module, run, months, repeat=5, number=3):
+    """Seconds per simulated month of the engine's run on DictState and on record_cls,
+    plus both final rows (they have to agree on the keys they share)."""
+    timings, finals = {}, {}
+    for style, state_cls in (('dict', DictState), ('record', record_cls)):
+        with engine_state_class(module, record_cls, state_cls), contextlib.redirect_stdout(io.StringIO()):
+            finals[style] = run()[-1]
+            timings[style] = min(timeit.repeat(run, repeat=repeat, number=number)) / (number * months)
+    return timings, finals
+
+def history_bytes(record_cls, run, months):
+    """Container bytes held by one run's history: dict snapshots vs record snapshots
+    (field values themselves are shared, as with the dicts' shallow copies)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        final = run()[-1]
+    record = record_cls.from_dict(final)
+    dict_row = sys.getsizeof(DictState.from_dict(final).snapshot())
+    values, extra = record.snapshot()
+    record_row = sys.getsizeof((values, extra)) + sys.getsizeof(values) # extra is shared, not copied
+    return {'dict': dict_row * months, 'record': record_row * months}
+
+if __name__ == '__main__':
+    print(f"--- Engine runs per step (dict state vs slotted records, seed {SEED}) ---")
+    print(f"{'Model':<14} {'Fields':>6} {'dict us/step':>13} {'slots us/step':>14} {'Speedup':>8} {'dict hist KB':>13} {'slots hist KB':>14}")
+    for record_cls, (module, run, months) in engine_runs().items():
+        timings, finals = bench_state_overhead(record_cls, module, run, months)
+        shared_keys = finals['dict'].keys() & finals['record'].keys() # Records also carry unused fields at their defaults
+        assert all(finals['dict'][k] == finals['record'][k] for k in shared_keys), f"{record_cls.__name__}: dict and record runs ended in different states"
+        sizes = history_bytes(record_cls, run, months)
+        print(f"{record_cls.__name__:<14} {len(record_cls.FIELDS):>6} {timings['dict'] * 1e6:>13.2f} {timings['record'] * 1e6:>14.2f} "
+              f"{timings['dict'] / timings['record']:>7.2f}x {sizes['dict'] / 1024:>13.1f} {sizes['record'] / 1024:>14.1f}")
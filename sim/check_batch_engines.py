@@ -0,0 +1,112 @@
+# sim/check_batch_engines.py
+# Consistency check: the batched engines against their single-run engines on a few sweep
+# parameter sets. Without extreme events the original and BME models' runs are deterministic,
+# so the batched histories have to match the scalar ones to rounding. The proposal model
+# draws churn, scoring and slashing every month, so there the final-month means of many
+# runs have to agree within a few standard errors.
+# Run from sim/:  python check_batch_engines.py
+
+import io
+import contextlib
+import numpy as np
+import pandas as pd
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import compare_with_market as cwm
+import simulation_engine as engine1
+import simulation_engine_batch as batch1
+import simulation_engine_bme as engine3
+import simulation_engine_bme_batch as batch3
+import simulation_engine_proposal as engine2
+import simulation_engine_proposal_batch as batch2
+from market_timeline import MarketTimeline, REGIME_SIDEWAYS, REGIME_BULL, REGIME_BEAR
+from sweep_space import SweepSpace
+
+NUM_PARAM_SETS = 6
+SAMPLE_SEED = 0
+RTOL = 1e-9  # Batched vs scalar float columns (they differ by reordered rounding only)
+SIM2_SCALAR_RUNS = 100  # Proposal runs per engine for the statistical check
+SIM2_BATCH_RUNS = 2000
+SIM2_NODE_COUNT = 300  # Small network: the scalar proposal engine loops over nodes
+SIM2_MAX_Z = 4.0  # Allowed |mean difference| in standard errors
+SIM2_COLUMNS = ('simulated_dria_price_usd_proposal', 'current_usd_demand_per_month_proposal', 'circulating_supply_proposal',
+                'total_tokens_slashed_proposal', 'current_contributor_nodes', 'total_utilized_gflops_monthly')
+
+def check_timeline(num_months, seed=0):
+    """Market inputs that exercise every regime and the volatility / drawdown branches, with no
+    extreme events (those draw a random demand shock)."""
+    rng = np.random.default_rng(seed)
+    month = np.arange(num_months)
+    return MarketTimeline(trend=rng.normal(0, 0.05, num_months),
+                          volatility_30d=np.where(month % 5 == 0, 0.1, 0.02),
+                          drawdown=np.where(month % 7 == 0, -0.4, -0.1),
+                          regime=np.array([REGIME_SIDEWAYS, REGIME_BULL, REGIME_BEAR])[month % 3])
+
+def check_param_sets():
+    """NUM_PARAM_SETS cells of the PARAM_SWEEP_CONFIG grid, resolved against BASE_SHARED_PARAMS."""
+    space = SweepSpace(cwm.PARAM_SWEEP_CONFIG)
+    return [{**cwm.BASE_SHARED_PARAMS, **space[index]} for index in space.sample(NUM_PARAM_SETS, SAMPLE_SEED)]
+
+def compare_histories(scalar_frames, batch_history):
+    """Largest relative difference per column shared by the scalar DataFrames and the batched history."""
+    diffs = {}
+    for run_index, frame in enumerate(scalar_frames):
+        for col, values in batch_history.items():
+            if col not in frame:
+                continue
+            a = frame[col].to_numpy(dtype=np.float64)
+            b = values[:, run_index].astype(np.float64)
+            scale = np.maximum(np.abs(a), 1e-300)
+            diff = np.where(np.isnan(a) & np.isnan(b), 0.0, np.abs(a - b) / scale)
+            diffs[col] = max(diffs.get(col, 0.0), float(np.nanmax(diff)) if len(diff) else 0.0)
+    return diffs
+
+def check_original(years=5):
+    """Sim 1: run_simulation_batch vs run_simulation; returns the largest relative difference."""
+    timeline = check_timeline(years * 12)
+    params_sets = [params for params in check_param_sets() if params['SIMULATION_YEARS'] >= years]
+    states = lambda: [cwm.build_initial_state_original(params, timeline) for params in params_sets]
+    scalar = [pd.DataFrame(engine1.run_simulation(state, years, rng=0)) for state in states()]
+    batch = batch1.run_simulation_batch(states(), years, rng=0)
+    return max(compare_histories(scalar, batch).values())
+
+def check_bme(years=5):
+    """Sim 3: run_simulation_bme_batch vs run_simulation_bme; returns the largest relative difference."""
+    timeline = check_timeline(years * 12)
+    params_sets = [params for params in check_param_sets() if params['SIMULATION_YEARS'] >= years]
+    states = lambda: [cwm.build_initial_state_bme(params, timeline) for params in params_sets]
+    scalar = [pd.DataFrame(engine3.run_simulation_bme(state, cwm.p3_module, years, rng=0)) for state in states()]
+    batch = batch3.run_simulation_bme_batch(states(), cwm.p3_module, years, rng=0)
+    return max(compare_histories(scalar, batch).values())
+
+def check_proposal(years=2):
+    """Sim 2: final-month means of SIM2_COLUMNS over independent scalar and batched runs;
+    returns {column: (scalar_mean, batch_mean, z)}, z the difference in standard errors."""
+    params = {**cwm.BASE_SHARED_PARAMS, 'INITIAL_NODE_COUNT': SIM2_NODE_COUNT}
+    state = lambda: cwm.build_initial_state_proposal(params, check_timeline(years * 12))
+    scalar = {col: [] for col in SIM2_COLUMNS}
+    for seed in range(SIM2_SCALAR_RUNS):
+        with contextlib.redirect_stdout(io.StringIO()):
+            frame = pd.DataFrame(engine2.run_simulation_proposal(state(), cwm.p2_module, years, rng=seed))
+        for col in SIM2_COLUMNS:
+            scalar[col].append(frame[col].iloc[-1])
+    batch = batch2.run_simulation_proposal_batch([state() for _ in range(SIM2_BATCH_RUNS)], cwm.p2_module, years, rng=SIM2_SCALAR_RUNS)
+    results = {}
+    for col in SIM2_COLUMNS:
+        a = np.asarray(scalar[col], dtype=np.float64)
+        b = batch[col][-1].astype(np.float64)
+        std_error = np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+        difference = abs(a.mean() - b.mean())
+        z = difference / std_error if std_error > 0 else (0.0 if difference <= RTOL * abs(a.mean()) else np.inf)
+        results[col] = (a.mean(), b.mean(), z)
+    return results
+
+if __name__ == '__main__':
+    for model, check in (('sim1', check_original), ('sim3', check_bme)):
+        worst = check()
+        print(f"{model} batch vs scalar: max relative difference {worst:.1e}")
+        assert worst <= RTOL, f"{model} batched engine differs from the scalar engine by {worst:.1e}"
+    print(f"sim2 batch vs scalar: final-month means of {SIM2_SCALAR_RUNS} scalar and {SIM2_BATCH_RUNS} batched runs")
+    for col, (scalar_mean, batch_mean, z) in check_proposal().items():
+        print(f"  {col:<40} {scalar_mean:>16.6g} {batch_mean:>16.6g}   z = {z:.2f}")
+        assert z <= SIM2_MAX_Z, f"sim2 batched engine's mean {col} differs from the scalar engine's by {z:.1f} standard errors"
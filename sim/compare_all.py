@@ -3,7 +3,6 @@
 import importlib
 import numpy as np
 import pandas as pd
-import itertools
 
 # Import all engines and parameter modules
 import model_parameters as p1
@@ -12,6 +11,7 @@ import model_parameters_proposal as p2
 import simulation_engine_proposal as engine2
 import model_parameters_bme as p3
 import simulation_engine_bme as engine3
+from sweep_space import SweepSpace
 
 # --- Shared Parameters ---
 SHARED_PARAMS = {
@@ -60,13 +60,11 @@ def calc_metrics(df, price_col, node_col, treasury_col=None, demand_col=None, bu
     return metrics
 
 # --- Batch Runner ---
-def run_batch():
-    sweep_keys = list(PARAM_SWEEP.keys())
-    sweep_values = list(PARAM_SWEEP.values())
+def run_batch(indices=None):
+    """Runs the three models for each PARAM_SWEEP combination; indices (flat SweepSpace indices,
+    e.g. a shard or a sample) limits the run to those combinations."""
     results = []
-    for values in itertools.product(*sweep_values):
-        # Set up parameter set
-        param_set = dict(zip(sweep_keys, values))
+    for _, param_set in SweepSpace(PARAM_SWEEP).items(indices):
         # Update shared params
         shared = SHARED_PARAMS.copy()
         shared.update(param_set)
@@ -1,13 +1,18 @@
 # sim/compare_with_market.py
 
 import importlib
+import itertools
+import hashlib
+import json
+import multiprocessing
 import numpy as np
 import pandas as pd
-import itertools
 import time
 from datetime import datetime, timedelta
 import os
+import sys
 import concurrent.futures
+from contextlib import contextmanager
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend for saving plots
 import matplotlib.pyplot as plt
@@ -31,6 +36,19 @@ import model_parameters_proposal as p2_module
 import simulation_engine_proposal as engine2
 import model_parameters_bme as p3_module
 import simulation_engine_bme as engine3
+from market_timeline import MarketTimeline
+from history_recorder import HistoryRecorder, MetricsRecorder
+from batch_utils import kpi_reduction, stack_market_inputs
+from sweep_space import SweepSpace, ProductSpace, index_ranges, contiguous_ranges, space_from_definition
+from sweep_sampling import design_space, QMC_BACKEND
+from result_cache import ResultCache, source_fingerprint
+from sweep_journal import SweepJournal, restore_job_metrics
+from sweep_scheduler import CostModel, longest_first, guided_chunks
+from results_buffer import SharedResultsBuffer
+from work_queue import SQLiteWorkQueue, worker_name
+from sweep_telemetry import SweepTelemetry, peak_rss_mb
+from demand_paths import precompute_demand_paths_original, precompute_demand_paths_proposal, precompute_demand_paths_bme, market_growth
+from variance_reduction import AntitheticGenerator, NoShockSource, replicate_estimate
 
 # --- Configuration ---
 CG_API_REQUEST_DELAY = 1.5  # Seconds to wait between CoinGecko API calls to avoid rate limiting
@@ -64,6 +82,45 @@ PARAM_SWEEP_CONFIG = {
     'SIMULATION_YEARS': [5, 10],  # Simulation duration
     # Add more as needed for further robustness
 }
+PARAM_SAMPLER = None  # None: sweep the PARAM_SWEEP_CONFIG grid; "sobol", "halton" or "lhs": PARAM_SAMPLE_SIZE points drawn from PARAM_SAMPLING_RANGES
+PARAM_SAMPLE_SIZE = 256  # Design points per scenario (a power of two keeps a Sobol design balanced)
+PARAM_SAMPLER_SEED = 0  # Scrambling / permutation seed of the design
+PARAM_SAMPLING_RANGES = {  # (low, high): uniform, ints if both bounds are; (low, high, 'log'): log-uniform; [values]: crossed with the points like a grid
+    'INITIAL_NODE_COUNT': (1000, 20000, 'log'),
+    'BASE_USD_DEMAND_GROWTH_RATE_MONTHLY': (0.005, 0.02),
+    'INITIAL_DRIA_PRICE_USD': (0.25, 1.0, 'log'),
+    'MARKET_TREND_IMPACT_FACTOR': (0.25, 0.75),
+    'INITIAL_USD_CREDIT_PURCHASE_PER_MONTH': (50000, 200000, 'log'),
+    'INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH': (100000, 400000, 'log'),
+    'SIMULATION_YEARS': [5, 10],
+}
+USE_BATCHED_ENGINES = False  # Run the sweep with the array-backed engines instead of one process job per run
+SWEEP_METRICS_MODE = "streaming"  # "streaming": KPIs accumulated during the run, no history kept; "columns": record the KPI columns, then calc_metrics_market
+SWEEP_HORIZONS_FROM_PREFIX = True  # Treat SIMULATION_YEARS as an output: run the longest swept horizon once and take shorter horizons' metrics from its first months
+SWEEP_DEDUP = True  # Run each model once per distinct effective input set and fan the metrics out to every grid cell
+SWEEP_DEDUP_STOCHASTIC = False  # Also share runs of stochastic models; separate runs of these differ, so sharing changes the sweep's spread
+STOCHASTIC_MODELS = ('sim2',)  # Draw random events every month
+EXTREME_EVENT_MODELS = ('sim1', 'sim3')  # Draw a random demand shock in extreme-event months
+SWEEP_CACHE_PATH = None  # On-disk cache of per-run metrics reused across invocations (e.g. 'output/sweep_results_cache.sqlite'; None: always recompute)
+SWEEP_COST_MODEL_PATH = None  # Recorded run timings that calibrate the longest-first scheduling of later sweeps (e.g. 'output/sweep_cost_model.json'; None: DEFAULT_COST_COEFFICIENTS, nothing saved)
+SWEEP_RESULTS_IN_SHARED_MEMORY = True  # __main__: workers write metrics into a shared-memory table read as one DataFrame (run_sweep_to_frame)
+SWEEP_JOURNAL_PATH = None  # JSONL progress journal (e.g. 'sweep_journal.jsonl'); re-running with the same path skips the jobs already in it
+SWEEP_SEED = None  # Root seed of the sweep's RNG streams; each model run draws from its own child stream (see sweep_run_seed). None: fresh entropy per sweep
+SWEEP_REPORT_HORIZON_YEARS = ()  # Extra horizons (years) to report per result under '<model>_metrics_by_horizon', e.g. (1, 3, 5, 10)
+SWEEP_EXECUTOR = "process_pool"  # "process_pool": one local pool; "queue": lease job ranges from a work queue file to local and remote workers (see run_queue_worker)
+SWEEP_QUEUE_PATH = 'sweep_queue.sqlite'  # Work queue file of the "queue" executor; on a shared filesystem for workers on other hosts
+SWEEP_QUEUE_RANGE_SIZE = 32  # Jobs per work queue item
+SWEEP_QUEUE_LEASE_SECONDS = 300  # A leased range is handed to another worker if its lease isn't renewed (after every run) within this time
+SWEEP_TELEMETRY = True  # Print a live status line (jobs/s, ETA, per-model time split, worker utilization) during sweeps
+SWEEP_TELEMETRY_PATH = None  # File the telemetry summary is also written to at the end (.json, or .csv, e.g. 'output/sweep_telemetry.json'; None: printed only)
+REPLICATE_COMMON_RANDOM_NUMBERS = True  # Replicate runs: every model of a replicate draws from the same seed, so model differences share the market noise
+REPLICATE_ANTITHETIC = True  # Replicate runs: pair each run with one whose uniform/normal draws are mirrored
+REPLICATE_CONTROL_VARIATES = True  # Replicate runs: adjust KPIs by the final USD demand, whose mean is known from the no-shock trajectory
+SWEEP_REPLICATES = False  # __main__: run the sweep in sequential replicate mode (run_replicated_sweep) instead of once per configuration
+REPLICATE_BATCH_SIZE = 8  # Replicate mode: replicates added per round to each configuration that hasn't converged
+REPLICATE_MAX_REPLICATES = 64  # Replicate mode: budget cap on the replicates of one configuration
+REPLICATE_TOLERANCE = {'final_price': 0.01, 'final_node_count': 0.01, 'treasury_col': 0.01}  # Replicate mode: a configuration has converged once each KPI's confidence half-width is within this fraction of its mean
+REPLICATE_CONFIDENCE = 0.95  # Confidence level of the replicate confidence intervals
 
 # --- CoinGecko Data Fetching ---
 def fetch_coingecko_historical_data(token_ids, days):
@@ -137,7 +194,61 @@ def resample_daily_trend_to_monthly(daily_trend_series, method='mean'):
 # and adjust parameters like demand growth.
 
 # --- KPI Calculation (Can reuse/adapt from compare_all.py) ---
+# History columns each model's KPIs are computed from (arguments to calc_metrics_market)
+SIM1_KPI_COLUMNS = dict(
+    price_col='simulated_dria_price_usd',
+    node_col='current_node_count',
+    total_burned_monthly='total_tokens_burned',
+    total_emitted_monthly='emitted_node_rewards_monthly',
+    avg_apy='actual_node_apy_monthly_percentage',
+    avg_utilization='network_utilization_rate'
+)
+SIM2_KPI_COLUMNS = dict(
+    price_col='simulated_dria_price_usd_proposal',
+    node_col='current_contributor_nodes',
+    treasury_col='treasury_balance_proposal',
+    demand_col='current_usd_demand_per_month_proposal',
+    total_burned_monthly='burned_from_usd_payments_monthly_proposal',
+    total_emitted_monthly='emitted_rewards_monthly_proposal',
+    avg_utilization='demand_supply_ratio_monthly',
+    total_slashed='slashed_dria_monthly_proposal',
+    treasury_outflows='treasury_outflow_monthly_proposal'
+)
+SIM3_KPI_COLUMNS = dict(
+    price_col='dria_price_usd',
+    node_col='node_count',
+    total_burned_monthly='burned_from_usd_monthly',
+    total_emitted_monthly='emitted_rewards_monthly'
+)
+
+def kpi_fields(kpi_columns):
+    """State fields a *_KPI_COLUMNS mapping reads, e.g. to record only those."""
+    return [col for col in kpi_columns.values() if col]
+
+def sweep_recorder(kpi_columns, horizons=()):
+    """Recorder (HistoryRecorder or MetricsRecorder) for one sweep run, per SWEEP_METRICS_MODE.
+    horizons: month counts that sweep_metrics will be asked for."""
+    if SWEEP_METRICS_MODE == "streaming":
+        return MetricsRecorder(horizons=horizons, **kpi_columns)
+    return HistoryRecorder(kpi_fields(kpi_columns))
+
+def sweep_metrics(recorder, kpi_columns, horizons=None):
+    """KPI metrics dict from a recorder returned by sweep_recorder. With horizons (month counts),
+    {num_months: metrics} computed over the first num_months of the run instead."""
+    if horizons is None:
+        if isinstance(recorder, MetricsRecorder):
+            return recorder.metrics()
+        return calc_metrics_market(recorder, **kpi_columns)
+    if isinstance(recorder, MetricsRecorder):
+        by_horizon = recorder.horizon_metrics()
+        return {num_months: by_horizon[num_months] for num_months in horizons}
+    df = recorder.to_frame([col for col in kpi_fields(kpi_columns) if col in recorder])
+    return {num_months: calc_metrics_market(df.iloc[:num_months], **kpi_columns) for num_months in horizons}
+
 def calc_metrics_market(df, price_col, node_col, **kwargs):
+    """KPI metrics from one run's history: a DataFrame or a HistoryRecorder."""
+    if isinstance(df, HistoryRecorder):
+        df = df.to_frame([col for col in (price_col, node_col, *kwargs.values()) if col and col in df])
     metrics = {}
     # Use the exact column names provided
     if price_col not in df.columns:
@@ -155,9 +266,10 @@ def calc_metrics_market(df, price_col, node_col, **kwargs):
     # Optional metrics based on kwargs mapping to actual DataFrame columns
     for kpi_name, df_col_name in kwargs.items():
         if df_col_name and df_col_name in df.columns:
-            if "total_" in kpi_name or "outflows" in kpi_name or "_slashed" in kpi_name:
+            reduction = kpi_reduction(kpi_name)
+            if reduction == 'sum':
                 metrics[kpi_name] = df[df_col_name].sum()
-            elif "avg_" in kpi_name:
+            elif reduction == 'mean':
                 metrics[kpi_name] = df[df_col_name].mean()
             else: # Typically final values like treasury balance
                 metrics[kpi_name] = df[df_col_name].iloc[-1]
@@ -167,23 +279,9 @@ def calc_metrics_market(df, price_col, node_col, **kwargs):
                 print(f"Warning: Optional KPI column '{df_col_name}' for '{kpi_name}' not found.")
     return metrics
 
-def run_single_scenario_param(scenario, scenario_trend, current_params_set, BASE_SHARED_PARAMS):
-    # Import modules inside the function for multiprocessing safety
-    import model_parameters as p1_module
-    import simulation_engine as engine1
-    import model_parameters_proposal as p2_module
-    import simulation_engine_proposal as engine2
-    import model_parameters_bme as p3_module
-    import simulation_engine_bme as engine3
-    import pandas as pd
-    sim_shared_params = BASE_SHARED_PARAMS.copy()
-    sim_shared_params.update(current_params_set)
-    # --- Sim 1 (Original) ---
-    p1_module.USD_CREDIT_PURCHASE_GROWTH_RATE_MONTHLY = sim_shared_params['BASE_USD_DEMAND_GROWTH_RATE_MONTHLY']
-    p1_module.INITIAL_USD_CREDIT_PURCHASE_PER_MONTH = sim_shared_params['INITIAL_USD_CREDIT_PURCHASE_PER_MONTH']
-    p1_module.INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH = sim_shared_params['INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH']
-    p1_module.INITIAL_SIMULATED_DRIA_PRICE_USD = sim_shared_params['INITIAL_DRIA_PRICE_USD']
-    initial_state1 = {
+def build_initial_state_original(sim_shared_params, scenario_timeline):
+    """Initial state for the original engine (Sim 1) from a resolved shared-parameter set."""
+    return {
         "current_year": 1, "current_month": 0,
         "circulating_supply": sim_shared_params['INITIAL_CIRCULATING_SUPPLY'],
         "total_tokens_burned": 0, "total_dria_staked": 0,
@@ -203,27 +301,14 @@ def run_single_scenario_param(scenario, scenario_trend, current_params_set, BASE
         'apy_history': [], 'average_apy_for_decision': 0,
         'current_adjusted_base_staking_yield_annual': 0, 'network_utilization_rate': 0,
         'current_quarter_ecosystem_release_pool': 0,'current_quarter_ecosystem_released_so_far': 0,
-        'market_trend_monthly_pct_change': scenario_trend,
+        'market_timeline': scenario_timeline,
         'base_usd_demand_growth_rate': sim_shared_params['BASE_USD_DEMAND_GROWTH_RATE_MONTHLY'],
         'market_trend_impact_factor': sim_shared_params['MARKET_TREND_IMPACT_FACTOR']
     }
-    df1_raw = engine1.run_simulation(initial_state1, sim_shared_params['SIMULATION_YEARS'])
-    df1 = pd.DataFrame(df1_raw)
-    metrics1 = calc_metrics_market(
-        df1,
-        price_col='simulated_dria_price_usd',
-        node_col='current_node_count',
-        total_burned_monthly='total_tokens_burned',
-        total_emitted_monthly='emitted_node_rewards_monthly',
-        avg_apy='actual_node_apy_monthly_percentage',
-        avg_utilization='network_utilization_rate'
-    )
-    # --- Sim 2 (Proposal) ---
-    p2_module.USD_DEMAND_GROWTH_RATE_MONTHLY_PROPOSAL = sim_shared_params['BASE_USD_DEMAND_GROWTH_RATE_MONTHLY']
-    p2_module.INITIAL_USD_CREDIT_PURCHASE_PER_MONTH_PROPOSAL = sim_shared_params['INITIAL_USD_CREDIT_PURCHASE_PER_MONTH']
-    p2_module.INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH = sim_shared_params['INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH']
-    p2_module.INITIAL_SIMULATED_DRIA_PRICE_USD_PROPOSAL = sim_shared_params['INITIAL_DRIA_PRICE_USD']
-    initial_state2 = {
+
+def build_initial_state_proposal(sim_shared_params, scenario_timeline):
+    """Initial state for the proposal engine (Sim 2) from a resolved shared-parameter set."""
+    return {
         "current_year": 1, "current_month": 0,
         "circulating_supply_proposal": sim_shared_params['INITIAL_CIRCULATING_SUPPLY'],
         "total_tokens_burned_proposal": 0, "total_tokens_slashed_proposal": 0,
@@ -249,30 +334,14 @@ def run_single_scenario_param(scenario, scenario_trend, current_params_set, BASE
         "treasury_outflow_monthly_proposal": 0, "user_churn_event": False, "demand_shock_event": 0,
         "monthly_profit_per_validator_usd": 0, "validator_growth_rate": 0,
         "monthly_profit_per_contributor_usd": 0, "contributor_growth_rate": 0,
-        'market_trend_monthly_pct_change': scenario_trend,
+        'market_timeline': scenario_timeline,
         'base_usd_demand_growth_rate': sim_shared_params['BASE_USD_DEMAND_GROWTH_RATE_MONTHLY'],
         'market_trend_impact_factor': sim_shared_params['MARKET_TREND_IMPACT_FACTOR']
     }
-    df2_raw = engine2.run_simulation_proposal(initial_state2, p2_module, sim_shared_params['SIMULATION_YEARS'])
-    df2 = pd.DataFrame(df2_raw)
-    metrics2 = calc_metrics_market(
-        df2,
-        price_col='simulated_dria_price_usd_proposal',
-        node_col='current_contributor_nodes',
-        treasury_col='treasury_balance_proposal',
-        demand_col='current_usd_demand_per_month_proposal',
-        total_burned_monthly='burned_from_usd_payments_monthly_proposal',
-        total_emitted_monthly='emitted_rewards_monthly_proposal',
-        avg_utilization='demand_supply_ratio_monthly',
-        total_slashed='slashed_dria_monthly_proposal',
-        treasury_outflows='treasury_outflow_monthly_proposal'
-    )
-    # --- Sim 3 (BME) ---
-    p3_module.USD_DEMAND_GROWTH_RATE_MONTHLY_BME = sim_shared_params['BASE_USD_DEMAND_GROWTH_RATE_MONTHLY']
-    p3_module.INITIAL_USD_CREDIT_PURCHASE_PER_MONTH_BME = sim_shared_params['INITIAL_USD_CREDIT_PURCHASE_PER_MONTH']
-    p3_module.INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH_BME = sim_shared_params['INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH']
-    p3_module.INITIAL_DRIA_PRICE_USD_BME = sim_shared_params['INITIAL_DRIA_PRICE_USD']
-    initial_state3 = {
+
+def build_initial_state_bme(sim_shared_params, scenario_timeline):
+    """Initial state for the BME engine (Sim 3) from a resolved shared-parameter set."""
+    return {
         "current_year": 1, "current_month": 0,
         "circulating_supply": sim_shared_params['INITIAL_CIRCULATING_SUPPLY'],
         "total_tokens_burned": 0, "total_tokens_emitted": 0,
@@ -282,26 +351,191 @@ def run_single_scenario_param(scenario, scenario_trend, current_params_set, BASE
         "dria_demand_per_month": sim_shared_params['INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH'],
         "burned_from_usd_monthly": 0, "burned_from_dria_fees_monthly": 0,
         "emitted_rewards_monthly": 0, "monthly_profit_per_node_usd": 0, "node_growth_rate": 0,
-        'market_trend_monthly_pct_change': scenario_trend,
+        'market_timeline': scenario_timeline,
         'base_usd_demand_growth_rate': sim_shared_params['BASE_USD_DEMAND_GROWTH_RATE_MONTHLY'],
         'market_trend_impact_factor': sim_shared_params['MARKET_TREND_IMPACT_FACTOR']
     }
-    df3_raw = engine3.run_simulation_bme(initial_state3, p3_module, sim_shared_params['SIMULATION_YEARS'])
-    df3 = pd.DataFrame(df3_raw)
-    metrics3 = calc_metrics_market(
-        df3,
-        price_col='dria_price_usd',
-        node_col='node_count',
-        total_burned_monthly='burned_from_usd_monthly',
-        total_emitted_monthly='emitted_rewards_monthly'
-    )
-    return {
+
+# --- Per-model sweep inputs ---
+# Each model reads only some of the shared params (Sim 1 never reads the DRIA payments
+# level) and scenarios can map to the same market timeline (Bull is Baseline * 1.0).
+# A model's effective inputs are its dependency values plus the timeline's content key;
+# grid cells with equal inputs share one run (SWEEP_DEDUP).
+
+SWEEP_MODELS = {
+    'sim1': dict(build_initial_state=build_initial_state_original, kpi_columns=SIM1_KPI_COLUMNS,
+                 demand_paths=precompute_demand_paths_original, demand_col='current_usd_credit_purchase_per_month'),
+    'sim2': dict(build_initial_state=build_initial_state_proposal, kpi_columns=SIM2_KPI_COLUMNS,
+                 demand_paths=precompute_demand_paths_proposal, demand_col='current_usd_demand_per_month_proposal'),
+    'sim3': dict(build_initial_state=build_initial_state_bme, kpi_columns=SIM3_KPI_COLUMNS,
+                 demand_paths=precompute_demand_paths_bme, demand_col='usd_demand_per_month'),
+}
+
+class _ReadTracker(dict):
+    """Shared-params dict that records which keys are read."""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.keys_read = set()
+    def __getitem__(self, key):
+        self.keys_read.add(key)
+        return super().__getitem__(key)
+
+def model_sweep_dependencies(build_initial_state, shared_params=None):
+    """Sorted shared-param keys a model's initial-state builder reads, plus SIMULATION_YEARS (the run horizon)."""
+    tracker = _ReadTracker(BASE_SHARED_PARAMS if shared_params is None else shared_params)
+    build_initial_state(tracker, None)
+    return tuple(sorted(tracker.keys_read | {'SIMULATION_YEARS'}))
+
+MODEL_SWEEP_DEPENDENCIES = {model: model_sweep_dependencies(spec['build_initial_state']) for model, spec in SWEEP_MODELS.items()}
+
+def is_stochastic_run(model, scenario_timeline):
+    """True when separate runs of the model on this timeline can give different results."""
+    if model in STOCHASTIC_MODELS:
+        return True
+    return model in EXTREME_EVENT_MODELS and bool(scenario_timeline.extreme_event.any())
+
+def model_input_key(model, scenario_timeline, sim_shared_params, ignore=()):
+    """Hash of a model's effective inputs: its declared shared params (less `ignore`) and the timeline's content."""
+    values = tuple((key, sim_shared_params[key]) for key in MODEL_SWEEP_DEPENDENCIES[model] if key not in ignore)
+    return hashlib.sha1(repr((model, scenario_timeline.key, values)).encode()).hexdigest()
+
+# Parameter-module settings each model takes from the shared params: {model: {module attribute: shared param}}
+MODEL_PARAM_BINDINGS = {
+    'sim1': {'USD_CREDIT_PURCHASE_GROWTH_RATE_MONTHLY': 'BASE_USD_DEMAND_GROWTH_RATE_MONTHLY',
+             'INITIAL_USD_CREDIT_PURCHASE_PER_MONTH': 'INITIAL_USD_CREDIT_PURCHASE_PER_MONTH',
+             'INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH': 'INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH',
+             'INITIAL_SIMULATED_DRIA_PRICE_USD': 'INITIAL_DRIA_PRICE_USD'},
+    'sim2': {'USD_DEMAND_GROWTH_RATE_MONTHLY_PROPOSAL': 'BASE_USD_DEMAND_GROWTH_RATE_MONTHLY',
+             'INITIAL_USD_CREDIT_PURCHASE_PER_MONTH_PROPOSAL': 'INITIAL_USD_CREDIT_PURCHASE_PER_MONTH',
+             'INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH': 'INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH',
+             'INITIAL_SIMULATED_DRIA_PRICE_USD_PROPOSAL': 'INITIAL_DRIA_PRICE_USD'},
+    'sim3': {'USD_DEMAND_GROWTH_RATE_MONTHLY_BME': 'BASE_USD_DEMAND_GROWTH_RATE_MONTHLY',
+             'INITIAL_USD_CREDIT_PURCHASE_PER_MONTH_BME': 'INITIAL_USD_CREDIT_PURCHASE_PER_MONTH',
+             'INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH_BME': 'INITIAL_DRIA_PAYMENTS_FOR_SERVICES_PER_MONTH',
+             'INITIAL_DRIA_PRICE_USD_BME': 'INITIAL_DRIA_PRICE_USD'},
+}
+
+def configure_model_params(model, sim_shared_params):
+    """Sets a model's parameter module from a resolved shared-parameter set and returns the module."""
+    # Engine and parameter modules are the module-level imports (present in every pool worker)
+    if model not in MODEL_PARAM_BINDINGS:
+        raise ValueError(f"Unknown sweep model '{model}'. Expected one of {list(SWEEP_MODELS)}")
+    p_module = MODEL_SOURCES[model][1]
+    for attribute, shared_param in MODEL_PARAM_BINDINGS[model].items():
+        setattr(p_module, attribute, sim_shared_params[shared_param])
+    return p_module
+
+def model_params_fingerprint(model):
+    """Fingerprint of the current values of a model's parameter-module settings, so runtime edits
+    (e.g. p2_module.PROPOSAL_REWARD_SCORING_MODE = ...) change it. The settings configure_model_params
+    takes from the shared params are left out: they are part of each run's own inputs."""
+    p_module = MODEL_SOURCES[model][1]
+    values = sorted((name, repr(value)) for name, value in vars(p_module).items()
+                    if name.isupper() and name not in MODEL_PARAM_BINDINGS[model])
+    return hashlib.sha1(repr(values).encode()).hexdigest()
+
+def run_sweep_model(model, scenario_timeline, sim_shared_params, horizon_years=None, rng=None, kpi_columns=None):
+    """
+    Runs one model on a resolved shared-parameter set and returns its KPI metrics. With
+    horizon_years, runs max(horizon_years) years instead of SIMULATION_YEARS and returns
+    {years: metrics} for each horizon, taken from the first years * 12 months of that run.
+    rng (a np.random.Generator, SeedSequence or seed) feeds every draw of the engine; None
+    draws from the global generators. kpi_columns overrides the model's *_KPI_COLUMNS.
+    """
+    p_module = configure_model_params(model, sim_shared_params)
+    kpi_columns = SWEEP_MODELS[model]['kpi_columns'] if kpi_columns is None else kpi_columns
+    num_years = sim_shared_params['SIMULATION_YEARS'] if horizon_years is None else max(horizon_years)
+    horizons = [years * 12 for years in horizon_years] if horizon_years is not None else None
+    recorder = sweep_recorder(kpi_columns, horizons or ())
+    initial_state = SWEEP_MODELS[model]['build_initial_state'](sim_shared_params, scenario_timeline)
+    if model == 'sim1':
+        history = engine1.run_simulation(initial_state, num_years, recorder=recorder, rng=rng)
+    elif model == 'sim2':
+        history = engine2.run_simulation_proposal(initial_state, p_module, num_years, recorder=recorder, rng=rng)
+    else:
+        history = engine3.run_simulation_bme(initial_state, p_module, num_years, recorder=recorder, rng=rng)
+    metrics = sweep_metrics(history, kpi_columns, horizons)
+    if horizon_years is None:
+        return metrics
+    return {years: metrics[years * 12] for years in horizon_years}
+
+# --- RNG streams ---
+# A sweep has one root seed (SWEEP_SEED, or fresh entropy recorded at the start). Every
+# model run gets its own child stream, addressed by (job_index, model position) rather than
+# by the order runs are executed in, so results don't depend on the worker count, chunking,
+# sharding or resume point, and a seeded stochastic run can be cached.
+def sweep_root_seed():
+    """SWEEP_SEED, or fresh OS entropy when it is None (printed, so the sweep can be reproduced)."""
+    if SWEEP_SEED is not None:
+        return SWEEP_SEED
+    root_seed = np.random.SeedSequence().entropy
+    print(f"Sweep RNG root seed: {root_seed} (set SWEEP_SEED to reproduce)")
+    return root_seed
+
+def sweep_run_seed(root_seed, model, job_index):
+    """SeedSequence of a model run: the (job_index, model position) descendant of the root seed."""
+    return np.random.SeedSequence(root_seed, spawn_key=(job_index, list(SWEEP_MODELS).index(model)))
+
+def sweep_task_seed(root_seed, task, param_space):
+    """SeedSequence of a planned task: that of the job its scenario_index and grid_index name (see plan_sweep_tasks)."""
+    model, scenario_index, grid_index, _ = task
+    return sweep_run_seed(root_seed, model, scenario_index * len(param_space) + grid_index)
+
+# --- Result cache ---
+# Sources a model's metrics depend on besides its inputs; editing any of them invalidates
+# that model's cached results (and only that model's, for the engine / parameter modules).
+MODEL_SOURCES = {
+    'sim1': (engine1, p1_module),
+    'sim2': (engine2, p2_module),
+    'sim3': (engine3, p3_module),
+}
+_MODEL_FINGERPRINTS = {}
+
+def model_source_fingerprint(model):
+    """Fingerprint of the engine, parameter and shared modules and the sweep code behind a model's metrics."""
+    fingerprint = _MODEL_FINGERPRINTS.get(model)
+    if fingerprint is None:
+        import batch_utils, demand_paths, schedule_tables, state_records, market_timeline, history_recorder
+        fingerprint = _MODEL_FINGERPRINTS[model] = source_fingerprint(
+            *MODEL_SOURCES[model], batch_utils, demand_paths, schedule_tables, state_records, market_timeline,
+            history_recorder, SWEEP_MODELS[model]['build_initial_state'], run_sweep_model, calc_metrics_market)
+    return fingerprint
+
+def sweep_cache_key(model, scenario_timeline, sim_shared_params, years, seed=None):
+    """
+    Result-cache key for a model's metrics over `years` years: a hash of the model, its
+    resolved dependency values, the timeline content, the RNG seed, the metrics mode and the
+    source and parameter-module fingerprints. None when the run is stochastic and unseeded (not reproducible).
+    """
+    if seed is None and is_stochastic_run(model, scenario_timeline):
+        return None
+    values = tuple((key, sim_shared_params[key]) for key in MODEL_SWEEP_DEPENDENCIES[model] if key != 'SIMULATION_YEARS')
+    inputs = (model, values, scenario_timeline.key, years, seed, SWEEP_METRICS_MODE,
+              sorted(SWEEP_MODELS[model]['kpi_columns'].items()), model_source_fingerprint(model), model_params_fingerprint(model))
+    return hashlib.sha1(repr(inputs).encode()).hexdigest()
+
+def sweep_task_cache_keys(task, scenario_timelines, param_space):
+    """{years: cache key} for a planned (model, scenario_index, grid_index, horizon_years) task, or None if it can't be cached.
+    Stochastic runs are only cached with an explicit SWEEP_SEED; their key includes the run's seed."""
+    model, scenario_index, grid_index, horizon_years = task
+    sim_shared_params = BASE_SHARED_PARAMS.copy()
+    sim_shared_params.update(param_space[grid_index])
+    seed = None
+    if SWEEP_SEED is not None and is_stochastic_run(model, scenario_timelines[scenario_index]):
+        seed = (SWEEP_SEED, scenario_index * len(param_space) + grid_index, model)
+    keys = {years: sweep_cache_key(model, scenario_timelines[scenario_index], sim_shared_params, years, seed) for years in horizon_years}
+    return None if None in keys.values() else keys
+
+def run_single_scenario_param(scenario, scenario_timeline, current_params_set, BASE_SHARED_PARAMS):
+    sim_shared_params = BASE_SHARED_PARAMS.copy()
+    sim_shared_params.update(current_params_set)
+    result = {
         'params_set': current_params_set,
         'market_scenario': scenario['name'],
-        'sim1_metrics': metrics1,
-        'sim2_metrics': metrics2,
-        'sim3_metrics': metrics3,
     }
+    for model in SWEEP_MODELS:
+        result[f'{model}_metrics'] = run_sweep_model(model, scenario_timeline, sim_shared_params)
+    return result
 
 def trend_modifier_baseline(trend):
     return trend
@@ -315,51 +549,937 @@ def trend_modifier_bear(trend):
 def trend_modifier_highvol(trend):
     return trend * 2.0
 
-def run_batch_with_market_trends(general_trend_monthly, depin_trend_monthly):
+SCENARIOS = [
+    {
+        'name': 'Baseline',
+        'trend_modifier': trend_modifier_baseline
+    },
+    {
+        'name': 'Bull',
+        'trend_modifier': trend_modifier_bull
+    },
+    {
+        'name': 'Bear',
+        'trend_modifier': trend_modifier_bear
+    },
+    {
+        'name': 'HighVol',
+        'trend_modifier': trend_modifier_highvol
+    },
+]
+
+def as_market_timeline(trend):
+    """A MarketTimeline as-is, or one built from a monthly trend series."""
+    if isinstance(trend, MarketTimeline):
+        return trend
+    return MarketTimeline.from_trend_series(trend)
+
+# --- Sweep dispatch ---
+# Each pool worker receives the scenario timelines, the parameter space, the base params and
+# the planned model runs once (pool initializer); work is then sent as ranges of run indices.
+# Jobs are addressed by their index in sweep_job_space(), so a sweep can be limited to a
+# shard, a random sample or the jobs after a resume point (job_indices).
+_SWEEP_WORKER = {}
+
+def _init_sweep_worker(scenario_names, scenario_timelines, param_space, base_shared_params, root_seed, runs, run_rows=None, buffer_spec=None):
+    """Pool initializer: stores the sweep inputs shared by every job in this worker, the RNG
+    root seed and the list of (model, scenario_index, grid_index, horizon_years) runs to
+    execute. With a results buffer, run_rows[run_index] lists the (row, years) cells each run writes."""
+    _SWEEP_WORKER.update(
+        scenario_names=scenario_names,
+        scenario_timelines=scenario_timelines,
+        param_space=param_space,
+        base_shared_params=base_shared_params,
+        root_seed=root_seed,
+        runs=runs,
+        run_rows=run_rows,
+        results_buffer=SharedResultsBuffer.attach(*buffer_spec) if buffer_spec else None,
+    )
+
+def _run_sweep_chunk(run_range):
+    """Executes the runs in run_range in a worker; returns (worker_pid, peak_rss_mb, triples) with
+    one (run_index, {years: metrics}, seconds) triple per run."""
+    worker = _SWEEP_WORKER
+    results = []
+    for run_index in run_range:
+        task = worker['runs'][run_index]
+        model, scenario_index, grid_index, horizon_years = task
+        sim_shared_params = worker['base_shared_params'].copy()
+        sim_shared_params.update(worker['param_space'][grid_index])
+        rng = sweep_task_seed(worker['root_seed'], task, worker['param_space'])
+        start = time.perf_counter()
+        metrics = run_sweep_model(model, worker['scenario_timelines'][scenario_index], sim_shared_params, horizon_years, rng)
+        seconds = time.perf_counter() - start
+        if worker['results_buffer'] is not None:
+            for row, years in worker['run_rows'][run_index]:
+                worker['results_buffer'].write(row, metrics[years], prefix=sweep_column_prefix(model))
+            metrics = None # Already in the buffer
+        results.append((run_index, metrics, seconds))
+    return os.getpid(), peak_rss_mb(), results
+
+def sweep_task_cost_features(task, param_space):
+    """(months, nodes) of a planned task, the inputs of the scheduler's CostModel."""
+    _, _, grid_index, horizon_years = task
+    return max(horizon_years) * 12, {**BASE_SHARED_PARAMS, **param_space[grid_index]}['INITIAL_NODE_COUNT']
+
+def sweep_param_space():
+    """The sweep's parameter space: the PARAM_SWEEP_CONFIG grid, or with PARAM_SAMPLER a
+    sweep_sampling design of PARAM_SAMPLE_SIZE points over PARAM_SAMPLING_RANGES."""
+    if PARAM_SAMPLER is None:
+        return SweepSpace(PARAM_SWEEP_CONFIG)
+    return design_space(PARAM_SAMPLER, PARAM_SAMPLE_SIZE, PARAM_SAMPLING_RANGES, PARAM_SAMPLER_SEED)
+
+def sweep_param_names():
+    """Names of the swept parameters (the result columns next to market_scenario)."""
+    return list(sweep_param_space().keys)
+
+def sweep_job_space():
+    """Space of the sweep's jobs: market_scenario x sweep_param_space(), indexed in iter_sweep_jobs order.
+    E.g. sweep_job_space().shard(i, n), .sample(k, seed) or .index_range(start) for job_indices."""
+    return ProductSpace(SweepSpace({'market_scenario': [scenario['name'] for scenario in SCENARIOS]}), sweep_param_space())
+
+def plan_sweep_tasks(scenario_timelines, param_space, models=None, dedup=None, job_indices=None):
+    """
+    Maps each (scenario, grid cell) job to the model runs it needs. Returns (tasks, job_tasks):
+    tasks is a list of distinct (model, scenario_index, grid_index, horizon_years) runs and
+    job_tasks is {job_index: {model: task_index}} for job_indices (default: every job, in
+    iter_sweep_jobs order). A task runs max(horizon_years) years and reports metrics for
+    each of its horizons.
+    With dedup (default SWEEP_DEDUP) jobs whose model inputs hash the same share a task;
+    stochastic runs only share one when SWEEP_DEDUP_STOCHASTIC is set. With
+    SWEEP_HORIZONS_FROM_PREFIX jobs that differ only in SIMULATION_YEARS share a task.
+    An unshared stochastic task names the grid cell with the first swept SIMULATION_YEARS
+    value, whether or not that job is selected, so its RNG stream (sweep_task_seed) is the
+    same for any job_indices.
+    """
+    models = list(SWEEP_MODELS) if models is None else list(models)
+    dedup = SWEEP_DEDUP if dedup is None else dedup
+    ignore = ('SIMULATION_YEARS',) if SWEEP_HORIZONS_FROM_PREFIX else ()
+    first_values = {key: values[0] for key, values in zip(param_space.keys, param_space.values) if key in ignore}
+    tasks = []
+    task_horizons = []
+    task_by_key = {}
+    job_tasks = {}
+    if job_indices is None:
+        job_indices = range(len(scenario_timelines) * len(param_space))
+    for job_index in job_indices:
+        scenario_index, grid_index = divmod(job_index, len(param_space))
+        scenario_timeline = scenario_timelines[scenario_index]
+        params_set = param_space[grid_index]
+        sim_shared_params = BASE_SHARED_PARAMS.copy()
+        sim_shared_params.update(params_set)
+        num_years = sim_shared_params['SIMULATION_YEARS']
+        assigned = {}
+        for model in models:
+            task_grid_index = grid_index
+            if dedup and (SWEEP_DEDUP_STOCHASTIC or not is_stochastic_run(model, scenario_timeline)):
+                key = model_input_key(model, scenario_timeline, sim_shared_params, ignore)
+            else:
+                key = (model, scenario_index, tuple((k, v) for k, v in params_set.items() if k not in ignore))
+                if first_values:
+                    task_grid_index = param_space.index_of({**params_set, **first_values})
+            if key not in task_by_key:
+                task_by_key[key] = len(tasks)
+                tasks.append((model, scenario_index, task_grid_index))
+                task_horizons.append(set())
+            task_index = task_by_key[key]
+            task_horizons[task_index].add(num_years)
+            assigned[model] = task_index
+        job_tasks[job_index] = assigned
+    for task_index, horizons in enumerate(task_horizons):
+        longest = max(horizons)
+        horizons.update(years for years in SWEEP_REPORT_HORIZON_YEARS if years < longest)
+        tasks[task_index] += (tuple(sorted(horizons)),)
+    return tasks, job_tasks
+
+def sweep_job_result(model, task_metrics, num_years):
+    """A job's entries for one model from its task's {years: metrics}: '<model>_metrics' for the
+    job's own horizon, plus '<model>_metrics_by_horizon' when SWEEP_REPORT_HORIZON_YEARS is set."""
+    entries = {f'{model}_metrics': dict(task_metrics[num_years])}
+    if SWEEP_REPORT_HORIZON_YEARS:
+        entries[f'{model}_metrics_by_horizon'] = {
+            years: dict(metrics) for years, metrics in task_metrics.items()
+            if years <= num_years and (years in SWEEP_REPORT_HORIZON_YEARS or years == num_years)}
+    return entries
+
+def sweep_scenarios(general_trend_monthly):
+    """(scenario_names, scenario_timelines, param_space) for the SCENARIOS x sweep_param_space() sweep."""
+    general_timeline = as_market_timeline(general_trend_monthly)
+    scenario_names = [scenario['name'] for scenario in SCENARIOS]
+    scenario_timelines = [general_timeline.map_trend(scenario['trend_modifier']) for scenario in SCENARIOS]
+    return scenario_names, scenario_timelines, sweep_param_space()
+
+SWEEP_BASE_METRICS = ('final_price', 'lowest_price', 'price_std_dev', 'final_node_count', 'peak_node_count', 'avg_node_growth')
+
+def sweep_column_prefix(model):
+    """Prefix of a model's metric columns in the flat results layout, e.g. 'Sim1_'."""
+    return f"{model.capitalize()}_"
+
+def sweep_metric_names(model):
+    """The metric names calc_metrics_market / MetricsRecorder produce for a model, in order."""
+    return list(SWEEP_BASE_METRICS) + [name for name in SWEEP_MODELS[model]['kpi_columns'] if name not in ('price_col', 'node_col')]
+
+def sweep_result_columns():
+    """Fixed schema of the flat results table: '<Model>_<metric>' for every sweep model."""
+    return [sweep_column_prefix(model) + name for model in SWEEP_MODELS for name in sweep_metric_names(model)]
+
+def buffered_task_metrics(results_buffer, task, rows):
+    """{years: metrics} of a task read back from the rows its worker wrote (one row per distinct horizon)."""
+    model = task[0]
+    by_years = {years: row for row, years in rows}
+    return {years: results_buffer.read(row, sweep_metric_names(model), prefix=sweep_column_prefix(model)) for years, row in by_years.items()}
+
+def iter_sweep_results(general_trend_monthly, max_workers=None, chunksize=None, job_indices=None, results_buffer=None):
+    """
+    Runs the scenario x PARAM_SWEEP_CONFIG grid (or the jobs in job_indices, see sweep_job_space)
+    with the SWEEP_EXECUTOR backend and yields (job_index, result) pairs as jobs finish (see
+    _iter_pool_sweep_results). With SWEEP_TELEMETRY progress is reported while it runs and
+    the summary is printed at the end (and written to SWEEP_TELEMETRY_PATH, if set).
+    """
+    if SWEEP_EXECUTOR not in ("process_pool", "queue"):
+        raise ValueError(f"Unknown SWEEP_EXECUTOR {SWEEP_EXECUTOR!r}; expected 'process_pool' or 'queue'")
+    if job_indices is not None:
+        job_indices = list(job_indices)
+    telemetry = None
+    if SWEEP_TELEMETRY:
+        num_jobs = len(sweep_job_space()) if job_indices is None else len(set(job_indices))
+        num_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        telemetry = SweepTelemetry(num_jobs, num_workers)
+    if SWEEP_EXECUTOR == "queue":
+        results = iter_queue_sweep_results(general_trend_monthly, max_workers, job_indices, results_buffer, telemetry=telemetry)
+    else:
+        results = _iter_pool_sweep_results(general_trend_monthly, max_workers, chunksize, job_indices, results_buffer, telemetry)
+    for job_index, result in results:
+        if telemetry is not None:
+            telemetry.jobs_completed()
+        yield job_index, result
+    if telemetry is not None:
+        telemetry.finish()
+        if SWEEP_TELEMETRY_PATH:
+            telemetry.write(SWEEP_TELEMETRY_PATH)
+
+def _iter_pool_sweep_results(general_trend_monthly, max_workers=None, chunksize=None, job_indices=None, results_buffer=None, telemetry=None):
+    """
+    The "process_pool" executor: runs the jobs on a local process pool and yields
+    (job_index, result) as soon as all of a job's model runs are done. job_index follows iter_sweep_jobs order. Each distinct model run (see
+    plan_sweep_tasks) is executed once, at its longest horizon, unless SWEEP_CACHE_PATH
+    already holds its metrics. Runs are dispatched longest first by estimated cost
+    (sweep_scheduler.CostModel, recalibrated after each sweep); chunks shrink with the
+    remaining work unless a fixed chunksize is given.
+    With results_buffer (a SharedResultsBuffer of sweep_result_columns(), one row per job in
+    job_indices order) workers write each job's metrics into its row and (job_index, None)
+    is yielded instead of a result dict.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    scenario_names, scenario_timelines, param_space = sweep_scenarios(general_trend_monthly)
+    tasks, job_tasks = plan_sweep_tasks(scenario_timelines, param_space, job_indices=job_indices)
+    jobs_by_task = [[] for _ in tasks]
+    pending = {}
+    for job_index, assigned in job_tasks.items():
+        for task_index in set(assigned.values()):
+            jobs_by_task[task_index].append(job_index)
+        pending[job_index] = len(set(assigned.values()))
+    task_metrics = [None] * len(tasks)
+    task_rows = None
+    if results_buffer is not None:
+        row_of_job = {job_index: row for row, job_index in enumerate(job_tasks)}
+        task_rows = [[(row_of_job[job_index], {**BASE_SHARED_PARAMS, **param_space[job_index % len(param_space)]}['SIMULATION_YEARS'])
+                      for job_index in jobs] for jobs in jobs_by_task]
+
+    def finish(task_index, metrics):
+        """Stores a task's metrics (metrics=None: a worker already wrote them to results_buffer);
+        returns the (job_index, result) pairs it completes."""
+        if results_buffer is None:
+            task_metrics[task_index] = metrics
+        elif metrics is not None:
+            for row, years in task_rows[task_index]:
+                results_buffer.write(row, metrics[years], prefix=sweep_column_prefix(tasks[task_index][0]))
+        completed = []
+        for job_index in jobs_by_task[task_index]:
+            pending[job_index] -= 1
+            if pending[job_index]:
+                continue
+            del pending[job_index]
+            if results_buffer is not None:
+                job_tasks.pop(job_index)
+                completed.append((job_index, None))
+                continue
+            scenario_index, grid_index = divmod(job_index, len(param_space))
+            params_set = param_space[grid_index]
+            num_years = {**BASE_SHARED_PARAMS, **params_set}['SIMULATION_YEARS']
+            result = {'params_set': params_set, 'market_scenario': scenario_names[scenario_index]}
+            for model, assigned_task in job_tasks.pop(job_index).items():
+                result.update(sweep_job_result(model, task_metrics[assigned_task], num_years))
+            completed.append((job_index, result))
+        return completed
+
+    cache = ResultCache(SWEEP_CACHE_PATH) if SWEEP_CACHE_PATH else None
+    try:
+        cache_keys = [sweep_task_cache_keys(task, scenario_timelines, param_space) for task in tasks] if cache is not None else [None] * len(tasks)
+        cached = cache.get_many(key for keys in cache_keys if keys for key in keys.values()) if cache is not None else {}
+        todo = []
+        for task_index, keys in enumerate(cache_keys):
+            if keys and all(key in cached for key in keys.values()):
+                yield from finish(task_index, {years: cached[key] for years, key in keys.items()})
+            else:
+                todo.append(task_index)
+        if cache is not None:
+            print(f"Result cache: {len(tasks) - len(todo)} of {len(tasks)} model runs reused from {SWEEP_CACHE_PATH}")
+        if not todo:
+            return
+        max_workers = max_workers or os.cpu_count() or 1
+        cost_model = CostModel.load(SWEEP_COST_MODEL_PATH)
+        features = [sweep_task_cost_features(tasks[task_index], param_space) for task_index in todo]
+        costs = [cost_model.estimate(tasks[task_index][0], *f) for task_index, f in zip(todo, features)]
+        order = longest_first(costs)
+        todo = [todo[i] for i in order]
+        features = [features[i] for i in order]
+        if chunksize is None:
+            chunks = guided_chunks([costs[i] for i in order], max_workers)
+        else:
+            chunks = list(index_ranges(0, len(todo), chunksize))
+        root_seed = sweep_root_seed()
+        initargs = (scenario_names, scenario_timelines, param_space, BASE_SHARED_PARAMS, root_seed, [tasks[task_index] for task_index in todo],
+                    [task_rows[task_index] for task_index in todo] if task_rows else None,
+                    results_buffer.spec() if results_buffer is not None else None)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker, initargs=initargs) as executor:
+            futures = [executor.submit(_run_sweep_chunk, run_range) for run_range in chunks]
+            for future in as_completed(futures):
+                finished = []
+                worker_pid, worker_peak_rss_mb, chunk_results = future.result()
+                for run_index, metrics, seconds in chunk_results:
+                    finished.append((todo[run_index], metrics))
+                    cost_model.record(tasks[todo[run_index]][0], *features[run_index], seconds)
+                if telemetry is not None:
+                    telemetry.record_runs(worker_pid, [(tasks[todo[run_index]][0], seconds) for run_index, _, seconds in chunk_results], worker_peak_rss_mb)
+                if cache is not None:
+                    cache.put_many((key, metrics[years]) for task_index, metrics in
+                                   ((task_index, metrics if metrics is not None else buffered_task_metrics(results_buffer, tasks[task_index], task_rows[task_index]))
+                                    for task_index, metrics in finished)
+                                   if cache_keys[task_index] for years, key in cache_keys[task_index].items() if years in metrics)
+                for task_index, metrics in finished:
+                    yield from finish(task_index, metrics)
+        if SWEEP_COST_MODEL_PATH:
+            cost_model.fit()
+            cost_model.save(SWEEP_COST_MODEL_PATH)
+    finally:
+        if cache is not None:
+            cache.close()
+
+def sweep_fingerprint(general_trend_monthly):
+    """Identity of a sweep's job space and results: scenarios and their timelines, the grid (or design),
+    the base params, the metrics, run-sharing and seed settings, and every model's source and
+    parameter-module fingerprints."""
+    scenario_names, scenario_timelines, _ = sweep_scenarios(general_trend_monthly)
+    inputs = (scenario_names, [timeline.key for timeline in scenario_timelines], repr(PARAM_SWEEP_CONFIG),
+              sorted(BASE_SHARED_PARAMS.items()), SWEEP_METRICS_MODE, SWEEP_REPORT_HORIZON_YEARS, SWEEP_SEED,
+              SWEEP_HORIZONS_FROM_PREFIX, SWEEP_DEDUP, SWEEP_DEDUP_STOCHASTIC,
+              [model_source_fingerprint(model) for model in SWEEP_MODELS],
+              [model_params_fingerprint(model) for model in SWEEP_MODELS])
+    if PARAM_SAMPLER is not None:
+        inputs += (PARAM_SAMPLER, PARAM_SAMPLE_SIZE, PARAM_SAMPLER_SEED, repr(PARAM_SAMPLING_RANGES), QMC_BACKEND)
+    return hashlib.sha1(repr(inputs).encode()).hexdigest()
+
+def run_batch_with_market_trends(general_trend_monthly, depin_trend_monthly, max_workers=None, chunksize=None, job_indices=None, journal_path=None):
     """
     Runs the parameter sweep for multiple market scenarios. Each scenario modifies the market trend series
     (e.g., Baseline, Bull, Bear, HighVol) and stores the scenario name in the results.
+    Results are returned in iter_sweep_jobs order. job_indices limits the sweep to those jobs (see sweep_job_space).
+    With a journal (journal_path, default SWEEP_JOURNAL_PATH) each finished job is appended to it as it
+    arrives, and jobs already journaled by an earlier, interrupted invocation are not run again.
     """
-    from concurrent.futures import ProcessPoolExecutor, as_completed
-    sweep_keys = list(PARAM_SWEEP_CONFIG.keys())
-    sweep_values = list(PARAM_SWEEP_CONFIG.values())
-    all_results = []
-    SCENARIOS = [
-        {
-            'name': 'Baseline',
-            'trend_modifier': trend_modifier_baseline
-        },
-        {
-            'name': 'Bull',
-            'trend_modifier': trend_modifier_bull
-        },
-        {
-            'name': 'Bear',
-            'trend_modifier': trend_modifier_bear
-        },
-        {
-            'name': 'HighVol',
-            'trend_modifier': trend_modifier_highvol
-        },
-    ]
-    jobs = []
+    journal_path = SWEEP_JOURNAL_PATH if journal_path is None else journal_path
+    if not journal_path:
+        all_results = []
+        for job_index, result in iter_sweep_results(general_trend_monthly, max_workers, chunksize, job_indices):
+            all_results.append((job_index, result))
+        all_results.sort(key=lambda item: item[0])
+        return [result for _, result in all_results]
+    job_space = sweep_job_space()
+    selected = range(len(job_space)) if job_indices is None else sorted(job_indices)
+    with SweepJournal(journal_path, sweep_fingerprint(general_trend_monthly)) as journal:
+        remaining = journal.remaining(selected)
+        print(f"Sweep journal {journal_path}: {len(selected) - len(remaining)} of {len(selected)} jobs already done, {len(remaining)} remaining")
+        if remaining:
+            for count, (job_index, result) in enumerate(iter_sweep_results(general_trend_monthly, max_workers, chunksize, remaining), 1):
+                journal.append(job_index, {name: value for name, value in result.items() if name.startswith('sim')})
+                if count % 500 == 0:
+                    print(f"Sweep journal: {len(remaining) - count} jobs remaining")
+        all_results = []
+        for job_index in selected:
+            job = job_space[job_index]
+            market_scenario = job.pop('market_scenario')
+            all_results.append({'params_set': job, 'market_scenario': market_scenario, **journal.completed[job_index]})
+    return all_results
+
+def run_sweep_to_frame(general_trend_monthly, max_workers=None, chunksize=None, job_indices=None):
+    """
+    Runs the sweep like run_batch_with_market_trends, but pool workers write the metrics
+    straight into a shared-memory table (SharedResultsBuffer) instead of returning dicts.
+    Returns (results_df, results_buffer): results_df has the market_scenario and parameter
+    columns followed by the sweep_result_columns() metrics (the print_market_results_table
+    layout), indexed by job index. The metric columns view the shared memory, so call
+    results_buffer.close() only when done with results_df.
+    """
+    job_space = sweep_job_space()
+    selected = np.arange(len(job_space)) if job_indices is None else np.unique(np.asarray(job_indices, dtype=np.int64))
+    results_buffer = SharedResultsBuffer(sweep_result_columns(), len(selected))
+    try:
+        for _ in iter_sweep_results(general_trend_monthly, max_workers, chunksize, selected.tolist(), results_buffer):
+            pass
+    except BaseException:
+        results_buffer.close()
+        raise
+    results_df = results_buffer.to_frame(index=pd.Index(selected, name='job_index'))
+    for position, (name, values) in enumerate(job_space.columns(selected).items()):
+        results_df.insert(position, name, values)
+    return results_df, results_buffer
+
+# --- Work-queue executor ---
+# SWEEP_EXECUTOR = "queue": the coordinator (iter_queue_sweep_results) stores the sweep inputs
+# and enqueues ranges of job indices in a SQLiteWorkQueue at SWEEP_QUEUE_PATH, then starts
+# local workers. Workers on other hosts that see the same file join with
+#     python compare_with_market.py --queue-worker [queue_path]
+# A queue is named by sweep_fingerprint(), so re-running an interrupted coordinator resumes
+# it: finished ranges are kept and only the rest is run. The sweep inputs are stored as JSON
+# (queue_sweep_spec), so a worker only ever parses data from the shared file.
+SWEEP_QUEUE_SETTINGS = ('BASE_SHARED_PARAMS', 'PARAM_SWEEP_CONFIG', 'SWEEP_METRICS_MODE', 'SWEEP_HORIZONS_FROM_PREFIX',
+                        'SWEEP_REPORT_HORIZON_YEARS', 'SWEEP_DEDUP', 'SWEEP_DEDUP_STOCHASTIC')  # Module settings a queue worker adopts from the coordinator
+SWEEP_QUEUE_POLL_SECONDS = 0.5
+
+def run_sweep_jobs(scenario_timelines, param_space, job_indices, on_run=None, root_seed=None):
+    """Runs the given jobs in this process (runs shared as planned by plan_sweep_tasks); returns
+    {job_index: {'sim1_metrics': ..., ...}}. Each run draws from its sweep_task_seed stream of
+    root_seed (None: the global generators). on_run(model, seconds) is called after every model run."""
+    tasks, job_tasks = plan_sweep_tasks(scenario_timelines, param_space, job_indices=job_indices)
+    task_metrics = []
+    for task in tasks:
+        model, scenario_index, grid_index, horizon_years = task
+        sim_shared_params = {**BASE_SHARED_PARAMS, **param_space[grid_index]}
+        rng = sweep_task_seed(root_seed, task, param_space) if root_seed is not None else None
+        start = time.perf_counter()
+        task_metrics.append(run_sweep_model(model, scenario_timelines[scenario_index], sim_shared_params, horizon_years, rng))
+        if on_run is not None:
+            on_run(model, time.perf_counter() - start)
+    results = {}
+    for job_index, assigned in job_tasks.items():
+        num_years = {**BASE_SHARED_PARAMS, **param_space[job_index % len(param_space)]}['SIMULATION_YEARS']
+        results[job_index] = {}
+        for model, task_index in assigned.items():
+            results[job_index].update(sweep_job_result(model, task_metrics[task_index], num_years))
+    return results
+
+def queue_sweep_spec(scenario_names, scenario_timelines, param_space, root_seed):
+    """JSON text of the sweep inputs a queue worker needs: the scenario timelines' arrays, the
+    param space's definition(), the root seed and the SWEEP_QUEUE_SETTINGS values."""
+    return json.dumps({
+        'scenario_names': scenario_names,
+        'scenario_timelines': [{name: getattr(timeline, name).tolist() for name in MarketTimeline.FIELDS}
+                               for timeline in scenario_timelines],
+        'param_space': param_space.definition(),
+        'root_seed': root_seed,
+        'settings': {name: globals()[name] for name in SWEEP_QUEUE_SETTINGS},
+    })
+
+def load_queue_sweep_spec(spec_text):
+    """Inverse of queue_sweep_spec: {'scenario_names', 'scenario_timelines' (MarketTimelines),
+    'param_space', 'root_seed', 'settings'}; settings other than SWEEP_QUEUE_SETTINGS are dropped."""
+    spec = json.loads(spec_text)
+    spec['scenario_timelines'] = [MarketTimeline(**fields) for fields in spec['scenario_timelines']]
+    spec['param_space'] = space_from_definition(spec['param_space'])
+    spec['settings'] = {name: value for name, value in spec['settings'].items() if name in SWEEP_QUEUE_SETTINGS}
+    return spec
+
+@contextmanager
+def sweep_settings(settings):
+    """Applies {name: value} SWEEP_QUEUE_SETTINGS for the duration of the with block, then restores them."""
+    unknown = set(settings) - set(SWEEP_QUEUE_SETTINGS)
+    if unknown:
+        raise ValueError(f"Not sweep queue settings: {sorted(unknown)}")
+    saved = {name: globals()[name] for name in settings}
+    globals().update(settings)
+    try:
+        yield
+    finally:
+        globals().update(saved)
+
+def run_queue_worker(queue_path=None, queue_name=None, owner=None):
+    """
+    Worker loop of the "queue" executor: leases job ranges of the sweep queue_name (default:
+    any sweep in the file with work left), runs them with run_sweep_jobs and acknowledges each
+    range with its jobs' metrics and run timings, renewing the lease after every run. The worker takes the
+    sweep inputs and SWEEP_QUEUE_SETTINGS from the queue, so it needs nothing but the file.
+    Returns the number of ranges it completed once there is nothing left to lease.
+    """
+    queue_path = queue_path or SWEEP_QUEUE_PATH
+    owner = owner or worker_name()
+    completed = 0
+    with SQLiteWorkQueue(queue_path, SWEEP_QUEUE_LEASE_SECONDS) as queue:
+        while True:
+            names = [queue_name] if queue_name is not None else queue.queues_with_work()
+            item = next((item for item in ((name, queue.lease(name, owner)) for name in names) if item[1] is not None), None)
+            if item is None:
+                return completed
+            name, (item_id, job_range) = item
+            spec = load_queue_sweep_spec(queue.get_spec(name))
+            runs = []
+            def on_run(model, seconds):
+                runs.append((model, seconds))
+                queue.renew(item_id, owner)
+            with sweep_settings(spec['settings']):
+                results = run_sweep_jobs(spec['scenario_timelines'], spec['param_space'], job_range, on_run, spec['root_seed'])
+            queue.ack(item_id, owner, {'jobs': [[job_index, metrics] for job_index, metrics in results.items()],
+                                       'worker': owner, 'runs': runs, 'peak_rss_mb': peak_rss_mb()})
+            completed += 1
+
+def iter_queue_sweep_results(general_trend_monthly, max_workers=None, job_indices=None, results_buffer=None, queue_path=None, telemetry=None):
+    """
+    Coordinator of the "queue" executor; yields like iter_sweep_results. Enqueues the selected
+    jobs as ranges of SWEEP_QUEUE_RANGE_SIZE, keeps max_workers local workers (default: one
+    per CPU; 0 leaves the work to remote workers) running while ranges are pending or their
+    lease expired, and yields each range's jobs when it is acknowledged. Workers' run timings
+    go to telemetry (a SweepTelemetry), if given.
+    """
+    queue_path = queue_path or SWEEP_QUEUE_PATH
+    scenario_names, scenario_timelines, param_space = sweep_scenarios(general_trend_monthly)
+    selected = range(len(scenario_names) * len(param_space)) if job_indices is None else sorted(set(job_indices))
+    row_of_job = {job_index: row for row, job_index in enumerate(selected)}
+    queue_name = sweep_fingerprint(general_trend_monthly)
+    spec = queue_sweep_spec(scenario_names, scenario_timelines, param_space, sweep_root_seed())
+    num_local = (os.cpu_count() or 1) if max_workers is None else max_workers
+    workers = []
+    failures = 0
+    with SQLiteWorkQueue(queue_path, SWEEP_QUEUE_LEASE_SECONDS) as queue:
+        queue.put_spec(queue_name, spec)
+        remaining = set(queue.enqueue(queue_name, contiguous_ranges(selected, SWEEP_QUEUE_RANGE_SIZE)))
+        print(f"Sweep queue {queue_path}: {len(remaining)} ranges of up to {SWEEP_QUEUE_RANGE_SIZE} jobs "
+              f"(the sweep's queue holds {queue.counts(queue_name)['done']} finished ranges)")
+        try:
+            while remaining:
+                for item_id, payload in queue.results(remaining).items():
+                    remaining.discard(item_id)
+                    if telemetry is not None:
+                        telemetry.record_runs(payload['worker'], payload['runs'], payload['peak_rss_mb'])
+                    for job_index, metrics in payload['jobs']:
+                        if job_index not in row_of_job:
+                            continue
+                        metrics = restore_job_metrics(metrics)
+                        if results_buffer is not None:
+                            for model in SWEEP_MODELS:
+                                results_buffer.write(row_of_job[job_index], metrics[f'{model}_metrics'], prefix=sweep_column_prefix(model))
+                            yield job_index, None
+                            continue
+                        scenario_index, grid_index = divmod(job_index, len(param_space))
+                        yield job_index, {'params_set': param_space[grid_index], 'market_scenario': scenario_names[scenario_index], **metrics}
+                if not remaining:
+                    break
+                for worker in workers:
+                    if not worker.is_alive() and worker.exitcode != 0:
+                        failures += 1
+                        if failures > 3 * max(num_local, 1):
+                            raise RuntimeError(f"Sweep queue workers keep failing (last exit code {worker.exitcode})")
+                workers = [worker for worker in workers if worker.is_alive()]
+                counts = queue.counts(queue_name)
+                for _ in range(min(num_local - len(workers), counts['pending'] + counts['expired'])):
+                    worker = multiprocessing.Process(target=run_queue_worker, args=(queue_path, queue_name), daemon=True)
+                    worker.start()
+                    workers.append(worker)
+                time.sleep(SWEEP_QUEUE_POLL_SECONDS)
+        finally:
+            for worker in workers:
+                if remaining:
+                    worker.terminate()
+                worker.join()
+
+def iter_sweep_jobs(general_trend_monthly):
+    """Yields (scenario_name, scenario_timeline, params_set, sim_shared_params) for every scenario x grid cell.
+    Every job of a scenario shares the same read-only MarketTimeline."""
+    general_timeline = as_market_timeline(general_trend_monthly)
+    param_space = sweep_param_space()
     for scenario in SCENARIOS:
-        scenario_trend = scenario['trend_modifier'](general_trend_monthly)
-        for param_values in itertools.product(*sweep_values):
-            current_params_set = dict(zip(sweep_keys, param_values))
-            jobs.append((scenario, scenario_trend, current_params_set, BASE_SHARED_PARAMS))
-    with ProcessPoolExecutor() as executor:
-        futures = [executor.submit(run_single_scenario_param, scenario, scenario_trend, current_params_set, BASE_SHARED_PARAMS) for scenario, scenario_trend, current_params_set, BASE_SHARED_PARAMS in jobs]
-        for future in as_completed(futures):
-            all_results.append(future.result())
+        scenario_timeline = general_timeline.map_trend(scenario['trend_modifier'])
+        for current_params_set in param_space:
+            sim_shared_params = BASE_SHARED_PARAMS.copy()
+            sim_shared_params.update(current_params_set)
+            yield scenario['name'], scenario_timeline, current_params_set, sim_shared_params
+
+def _run_grid_batched(general_trend_monthly, model, run_batch):
+    """Runs one model for the whole scenario x PARAM_SWEEP_CONFIG grid, one vectorized pass per run horizon.
+    Distinct model runs (plan_sweep_tasks) are run once and shorter horizons are read from the
+    first months of the batched history. Results come back in iter_sweep_jobs order.
+    run_batch(states, num_years, rng) gets one generator per pass, seeded from SWEEP_SEED
+    (None: the global np.random)."""
+    from batch_utils import batch_metrics
+    build_initial_state = SWEEP_MODELS[model]['build_initial_state']
+    kpi_columns = SWEEP_MODELS[model]['kpi_columns']
+    scenario_names, scenario_timelines, param_space = sweep_scenarios(general_trend_monthly)
+    tasks, job_tasks = plan_sweep_tasks(scenario_timelines, param_space, models=[model])
+    tasks_by_years = {}
+    for task_index, (_, scenario_index, grid_index, horizon_years) in enumerate(tasks):
+        sim_shared_params = BASE_SHARED_PARAMS.copy()
+        sim_shared_params.update(param_space[grid_index])
+        tasks_by_years.setdefault(max(horizon_years), []).append(
+            (task_index, build_initial_state(sim_shared_params, scenario_timelines[scenario_index])))
+    task_metrics = [{} for _ in tasks]
+    for num_years, batch in tasks_by_years.items():
+        rng = None
+        if SWEEP_SEED is not None:
+            # Past every job's (job_index, model) key, so batched passes never reuse a run's stream
+            rng = np.random.SeedSequence(SWEEP_SEED, spawn_key=(len(scenario_names) * len(param_space), list(SWEEP_MODELS).index(model), num_years))
+        history = run_batch([state for _, state in batch], num_years, rng)
+        for years in sorted({years for task_index, _ in batch for years in tasks[task_index][3]}):
+            prefix = {col: values[:years * 12] for col, values in history.items()}
+            for (task_index, _), metrics in zip(batch, batch_metrics(prefix, **kpi_columns)):
+                if years in tasks[task_index][3]:
+                    task_metrics[task_index][years] = metrics
+    results = []
+    for job_index, assigned in job_tasks.items():
+        scenario_index, grid_index = divmod(job_index, len(param_space))
+        params_set = param_space[grid_index]
+        num_years = {**BASE_SHARED_PARAMS, **params_set}['SIMULATION_YEARS']
+        result = {'params_set': params_set, 'market_scenario': scenario_names[scenario_index]}
+        result.update(sweep_job_result(model, task_metrics[assigned[model]], num_years))
+        results.append(result)
+    return results
+
+def run_original_batch_with_market_trends(general_trend_monthly):
+    """Batched Sim 1 (original model) over the full grid. Returns one {'params_set', 'market_scenario', 'sim1_metrics'} dict per job."""
+    import simulation_engine_batch as engine1_batch
+    return _run_grid_batched(
+        general_trend_monthly, 'sim1',
+        lambda states, num_years, rng: engine1_batch.run_simulation_batch(states, num_years, p1_module, rng))
+
+def run_bme_batch_with_market_trends(general_trend_monthly):
+    """Batched Sim 3 (BME) over the full grid. Returns one {'params_set', 'market_scenario', 'sim3_metrics'} dict per job."""
+    import simulation_engine_bme_batch as engine3_batch
+    return _run_grid_batched(
+        general_trend_monthly, 'sim3',
+        lambda states, num_years, rng: engine3_batch.run_simulation_bme_batch(states, p3_module, num_years, rng))
+
+def run_proposal_batch_with_market_trends(general_trend_monthly):
+    """Batched Sim 2 (proposal model) over the full grid. Returns one {'params_set', 'market_scenario', 'sim2_metrics'} dict per job."""
+    import simulation_engine_proposal_batch as engine2_batch
+    return _run_grid_batched(
+        general_trend_monthly, 'sim2',
+        lambda states, num_years, rng: engine2_batch.run_simulation_proposal_batch(states, p2_module, num_years, rng))
+
+def run_batched_engines_with_market_trends(general_trend_monthly, depin_trend_monthly):
+    """
+    Drop-in alternative to run_batch_with_market_trends using the batched engines for all three models.
+    Returns the same list of {'params_set', 'market_scenario', 'sim1_metrics', 'sim2_metrics', 'sim3_metrics'} dicts.
+    """
+    sim1_results = run_original_batch_with_market_trends(general_trend_monthly)
+    sim2_results = run_proposal_batch_with_market_trends(general_trend_monthly)
+    sim3_results = run_bme_batch_with_market_trends(general_trend_monthly)
+    all_results = []
+    for res1, res2, res3 in zip(sim1_results, sim2_results, sim3_results):
+        all_results.append({**res1, **res2, **res3}) # Same params_set / market_scenario; one model's metrics each
     return all_results
 
+# --- Replicate runs ---
+# Repeated seeded runs of the models on one timeline and parameter set, estimating each
+# model's mean KPIs and the differences between models, with the variance reduction of
+# variance_reduction.py: common random numbers across models, antithetic pairs and the final
+# USD demand as a control variate (its mean is the no-shock trajectory's, adjusted for the
+# proposal model's expected churn).
+REPLICATE_CONTROL_KPI = 'control_usd_demand'
+
+def replicate_seed(root_seed, replicate, model=None):
+    """SeedSequence of a replicate: shared by every model (model None, common random numbers)
+    or one per (replicate, model position)."""
+    spawn_key = (replicate,) if model is None else (replicate, list(SWEEP_MODELS).index(model))
+    return np.random.SeedSequence(root_seed, spawn_key=spawn_key)
+
+def expected_final_usd_demand(model, scenario_timeline, sim_shared_params, num_years):
+    """
+    Expected final-month USD demand of a model. Extreme-event shocks have mean 1 and multiply
+    the growth rate, and the proposal model's demand shocks are symmetric, so the no-shock
+    demand path has the expected growth; the proposal model's churn events then scale it by
+    the product of (1 - churn probability * churn magnitude) over the months.
+    """
+    p_module = configure_model_params(model, sim_shared_params)
+    spec = SWEEP_MODELS[model]
+    states = [spec['build_initial_state'](sim_shared_params, scenario_timeline)]
+    num_months = num_years * 12
+    paths = spec['demand_paths'](states, p_module, num_months, NoShockSource())
+    expected = float(paths[spec['demand_col']][-1, 0])
+    if model == 'sim2':
+        _, churn_multiplier = market_growth(states, stack_market_inputs(states, num_months, 0),
+                                            p_module.USD_DEMAND_GROWTH_RATE_MONTHLY_PROPOSAL, NoShockSource())
+        churn_probability = np.minimum(p_module.USER_CHURN_PROBABILITY * churn_multiplier[:, 0], 1.0)
+        expected *= float(np.prod(1 - churn_probability * p_module.USER_CHURN_MAGNITUDE))
+    return expected
+
+def run_replicate(model, scenario_timeline, sim_shared_params, seed, antithetic=False, control_variates=False, horizon_years=None):
+    """
+    One replicate of a model run from seed (a SeedSequence): returns (metrics, antithetic_metrics),
+    the second from the mirrored stream of the same seed with antithetic, else None. With
+    control_variates the metrics also hold REPLICATE_CONTROL_KPI, the final USD demand.
+    horizon_years is passed to run_sweep_model.
+    """
+    kpi_columns = SWEEP_MODELS[model]['kpi_columns']
+    if control_variates:
+        kpi_columns = {**kpi_columns, REPLICATE_CONTROL_KPI: SWEEP_MODELS[model]['demand_col']}
+    # A fresh copy of the seed per run: spawning children advances a SeedSequence's state
+    fresh_seed = lambda: np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size)
+    metrics = run_sweep_model(model, scenario_timeline, sim_shared_params, horizon_years,
+                              rng=np.random.default_rng(fresh_seed()), kpi_columns=kpi_columns)
+    antithetic_metrics = None
+    if antithetic:
+        antithetic_metrics = run_sweep_model(model, scenario_timeline, sim_shared_params, horizon_years,
+                                             rng=AntitheticGenerator(np.random.default_rng(fresh_seed())), kpi_columns=kpi_columns)
+    return metrics, antithetic_metrics
+
+def run_replicates(model, scenario_timeline, sim_shared_params, root_seed, replicates,
+                   common_random_numbers=True, antithetic=False, control_variates=False):
+    """
+    Runs a model once per replicate index (see run_replicate). Returns (metrics,
+    antithetic_metrics): lists of KPI dicts in replicate order, the second None without antithetic.
+    """
+    seed_model = None if common_random_numbers else model
+    metrics, antithetic_metrics = [], [] if antithetic else None
+    for replicate in replicates:
+        plain, mirrored = run_replicate(model, scenario_timeline, sim_shared_params, replicate_seed(root_seed, replicate, seed_model),
+                                        antithetic, control_variates)
+        metrics.append(plain)
+        if antithetic:
+            antithetic_metrics.append(mirrored)
+    return metrics, antithetic_metrics
+
+def exact_estimates(metrics):
+    """{metric: estimate} of a deterministic run's metrics in the replicate_estimate layout: exact, zero half-width."""
+    return {metric: {'mean': value, 'half_width': 0.0, 'std_error': 0.0, 'n_runs': 1, 'variance_reduction': 1.0, 'beta': None}
+            for metric, value in metrics.items()}
+
+def replicate_kpi_estimate(runs, metric, control_mean=None, confidence=0.95, plain_variance=None):
+    """replicate_estimate of one KPI from run_replicates output (runs = (metrics, antithetic_metrics))."""
+    metrics, antithetic_metrics = runs
+    values = lambda rows, name: [row[name] for row in rows] if rows is not None else None
+    use_control = control_mean is not None and metrics and REPLICATE_CONTROL_KPI in metrics[0]
+    return replicate_estimate(values(metrics, metric), values(antithetic_metrics, metric),
+                              control=values(metrics, REPLICATE_CONTROL_KPI) if use_control else None,
+                              control_anti=values(antithetic_metrics, REPLICATE_CONTROL_KPI) if use_control else None,
+                              control_mean=control_mean if use_control else None,
+                              plain_variance=plain_variance, confidence=confidence)
+
+def _difference_runs(runs_a, runs_b):
+    """Per-replicate differences of two models' run_replicates output (KPIs present in both)."""
+    def subtract(rows_a, rows_b):
+        if rows_a is None:
+            return None
+        return [{name: a[name] - b[name] for name in a if name in b} for a, b in zip(rows_a, rows_b)]
+    return subtract(runs_a[0], runs_b[0]), subtract(runs_a[1], runs_b[1])
+
+def compare_models_monte_carlo(scenario_timeline, sim_shared_params, num_replicates, root_seed=None,
+                               metrics=('final_price', 'final_node_count'), models=None, confidence=0.95,
+                               common_random_numbers=None, antithetic=None, control_variates=None):
+    """
+    Replicate runs of each model on one timeline and parameter set. Returns
+    {'root_seed', 'models': {model: {metric: estimate}}, 'differences': {'simA - simB': {metric: estimate}}}
+    with replicate_estimate dicts (mean, half_width, variance_reduction, ...). The variance
+    reduction of a difference is against independent runs of the two models. A model whose
+    runs can't differ (is_stochastic_run) is run once and its estimates are exact. The
+    common_random_numbers / antithetic / control_variates switches default to the REPLICATE_* settings.
+    """
+    models = list(models or SWEEP_MODELS)
+    common_random_numbers = REPLICATE_COMMON_RANDOM_NUMBERS if common_random_numbers is None else common_random_numbers
+    antithetic = REPLICATE_ANTITHETIC if antithetic is None else antithetic
+    control_variates = REPLICATE_CONTROL_VARIATES if control_variates is None else control_variates
+    root_seed = sweep_root_seed() if root_seed is None else root_seed
+    num_years = sim_shared_params['SIMULATION_YEARS']
+    replicated = {model: is_stochastic_run(model, scenario_timeline) for model in models}
+    runs, control_means, estimates = {}, {}, {}
+    for model in models:
+        if not replicated[model]:
+            (single,), _ = run_replicates(model, scenario_timeline, sim_shared_params, root_seed, range(1), common_random_numbers)
+            estimates[model] = exact_estimates({metric: single[metric] for metric in metrics if metric in single})
+            # The one run stands in for every replicate (and antithetic twin) in the differences
+            runs[model] = ([single] * num_replicates, [single] * num_replicates if antithetic else None)
+            continue
+        runs[model] = run_replicates(model, scenario_timeline, sim_shared_params, root_seed, range(num_replicates),
+                                     common_random_numbers, antithetic, control_variates)
+        if control_variates:
+            control_means[model] = expected_final_usd_demand(model, scenario_timeline, sim_shared_params, num_years)
+        estimates[model] = {metric: replicate_kpi_estimate(runs[model], metric, control_means.get(model), confidence)
+                            for metric in metrics if metric in runs[model][0][0]}
+    differences = {}
+    for i, model_a in enumerate(models):
+        for model_b in models[i + 1:]:
+            label = f"{model_a} - {model_b}"
+            if not replicated[model_a] and not replicated[model_b]:
+                differences[label] = exact_estimates({metric: estimates[model_a][metric]['mean'] - estimates[model_b][metric]['mean']
+                                                      for metric in metrics if metric in estimates[model_a] and metric in estimates[model_b]})
+                continue
+            difference = _difference_runs(runs[model_a], runs[model_b])
+            control_mean = control_means[model_a] - control_means[model_b] if model_a in control_means and model_b in control_means else None
+            differences[label] = {}
+            for metric in metrics:
+                if metric not in difference[0][0]:
+                    continue
+                # Independent runs of the two models: the single-run variances add
+                plain_variance = sum(float(np.var([row[metric] for rows in model_runs if rows is not None for row in rows], ddof=1))
+                                     for model_runs in (runs[model_a], runs[model_b]))
+                differences[label][metric] = replicate_kpi_estimate(difference, metric, control_mean, confidence, plain_variance)
+    return {'root_seed': root_seed, 'models': estimates, 'differences': differences}
+
+def print_replicate_estimates(comparison):
+    """Prints compare_models_monte_carlo output: mean +/- half-width and variance reduction per KPI."""
+    print(f"\n--- Replicate estimates (root seed {comparison['root_seed']}) ---")
+    for section in ('models', 'differences'):
+        for name, by_metric in comparison[section].items():
+            for metric, estimate in by_metric.items():
+                print(f"{name:>13} {metric:<18} {estimate['mean']:>14.6g} +/- {estimate['half_width']:<12.4g}"
+                      f" ({estimate['n_runs']} runs, variance reduction x{estimate['variance_reduction']:.1f})")
+
+# --- Sequential replicate sweep ---
+# SWEEP_REPLICATES: every stochastic model run of the sweep (a planned task, see
+# plan_sweep_tasks) becomes a configuration that is replicated in rounds of
+# REPLICATE_BATCH_SIZE seeded replicates. After each round a configuration stops once the
+# confidence half-width of every REPLICATE_TOLERANCE KPI is within tolerance, or at
+# REPLICATE_MAX_REPLICATES, so low-variance configurations stop early and later rounds only
+# run the noisy ones. Deterministic runs execute once. Results are the grid's result dicts
+# holding the replicate means, plus '<model>_replicates' with the replicate counts and
+# half-widths. Replicate runs bypass the result cache.
+def sweep_replicate_seed(root_seed, task, param_space, replicate):
+    """SeedSequence of a task's replicate, addressed by (job_index, model position, replicate) like
+    sweep_task_seed. With REPLICATE_COMMON_RANDOM_NUMBERS every model of a job shares the
+    stream, under position len(SWEEP_MODELS), which no single run uses."""
+    model, scenario_index, grid_index, _ = task
+    model_position = len(SWEEP_MODELS) if REPLICATE_COMMON_RANDOM_NUMBERS else list(SWEEP_MODELS).index(model)
+    return np.random.SeedSequence(root_seed, spawn_key=(scenario_index * len(param_space) + grid_index, model_position, replicate))
+
+def _run_replicate_chunk(items):
+    """Executes (task_index, replicate, replicated) items in a worker (pool initialized with the
+    tasks as runs); returns (worker_pid, peak_rss_mb, results) with one (task_index, replicate,
+    metrics, antithetic_metrics, seconds) entry per item. Unreplicated (deterministic) tasks run
+    once, without antithetic or control runs."""
+    worker = _SWEEP_WORKER
+    results = []
+    for task_index, replicate, replicated in items:
+        task = worker['runs'][task_index]
+        model, scenario_index, grid_index, horizon_years = task
+        sim_shared_params = worker['base_shared_params'].copy()
+        sim_shared_params.update(worker['param_space'][grid_index])
+        seed = sweep_replicate_seed(worker['root_seed'], task, worker['param_space'], replicate)
+        start = time.perf_counter()
+        metrics, antithetic_metrics = run_replicate(model, worker['scenario_timelines'][scenario_index], sim_shared_params, seed,
+                                                    replicated and REPLICATE_ANTITHETIC, replicated and REPLICATE_CONTROL_VARIATES, horizon_years)
+        results.append((task_index, replicate, metrics, antithetic_metrics, time.perf_counter() - start))
+    return os.getpid(), peak_rss_mb(), results
+
+def replicate_task_estimates(samples, horizon_years, control_means=None, replicated=True):
+    """{years: {metric: replicate_estimate}} of a task from its (metrics, antithetic_metrics)
+    samples in replicate order; control_means is {years: expected control KPI}. An unreplicated
+    (deterministic) task's single run is exact: zero half-width."""
+    estimates = {}
+    for years in horizon_years:
+        plain = [metrics[years] for metrics, _ in samples]
+        if not replicated:
+            estimates[years] = exact_estimates(plain[0])
+            continue
+        mirrored = [antithetic_metrics[years] for _, antithetic_metrics in samples] if samples[0][1] is not None else None
+        control_mean = (control_means or {}).get(years)
+        estimates[years] = {metric: replicate_kpi_estimate((plain, mirrored), metric, control_mean, REPLICATE_CONFIDENCE)
+                            for metric in plain[0] if metric != REPLICATE_CONTROL_KPI}
+    return estimates
+
+def replicates_converged(estimates, tolerance=None):
+    """True when every tolerance KPI (default REPLICATE_TOLERANCE) a task reports has a
+    confidence half-width within tolerance * |mean| at every horizon. KPIs without a value (NaN) are skipped."""
+    tolerance = REPLICATE_TOLERANCE if tolerance is None else tolerance
+    return all(by_metric[metric]['half_width'] <= relative * abs(by_metric[metric]['mean'])
+               for by_metric in estimates.values() for metric, relative in tolerance.items()
+               if metric in by_metric and not np.isnan(by_metric[metric]['mean']))
+
+def run_replicated_sweep(general_trend_monthly, max_workers=None, job_indices=None):
+    """
+    Runs the scenario x PARAM_SWEEP_CONFIG grid (or job_indices) in sequential replicate mode
+    on a local process pool. Returns the run_batch_with_market_trends result list (job order),
+    with the replicate mean of every metric and a '<model>_replicates' entry per model:
+    {'replicates', 'runs', 'converged', 'half_width': {kpi: ...}, 'variance_reduction': {kpi: ...}}.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    scenario_names, scenario_timelines, param_space = sweep_scenarios(general_trend_monthly)
+    tasks, job_tasks = plan_sweep_tasks(scenario_timelines, param_space, job_indices=job_indices)
+    replicated = [is_stochastic_run(model, scenario_timelines[scenario_index]) for model, scenario_index, _, _ in tasks]
+    control_means = [{} for _ in tasks]
+    for task_index, (model, scenario_index, grid_index, horizon_years) in enumerate(tasks):
+        if replicated[task_index] and REPLICATE_CONTROL_VARIATES:
+            sim_shared_params = {**BASE_SHARED_PARAMS, **param_space[grid_index]}
+            control_means[task_index] = {years: expected_final_usd_demand(model, scenario_timelines[scenario_index], sim_shared_params, years)
+                                         for years in horizon_years}
+    max_workers = max_workers or os.cpu_count() or 1
+    cost_model = CostModel.load(SWEEP_COST_MODEL_PATH)
+    task_costs = [cost_model.estimate(task[0], *sweep_task_cost_features(task, param_space)) * (2 if replicated[i] and REPLICATE_ANTITHETIC else 1)
+                  for i, task in enumerate(tasks)]
+    samples = [{} for _ in tasks]
+    estimates = [None] * len(tasks)
+    converged = [not is_replicated for is_replicated in replicated]
+    root_seed = sweep_root_seed()
+    initargs = (scenario_names, scenario_timelines, param_space, BASE_SHARED_PARAMS, root_seed, tasks)
+    active = list(range(len(tasks)))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_sweep_worker, initargs=initargs) as executor:
+        for round_number in itertools.count(1):
+            items = []
+            for task_index in active:
+                start = len(samples[task_index])
+                stop = min(start + REPLICATE_BATCH_SIZE, REPLICATE_MAX_REPLICATES) if replicated[task_index] else 1
+                items.extend((task_index, replicate, replicated[task_index]) for replicate in range(start, stop))
+            print(f"Replicate round {round_number}: {len(active)} configurations, {len(items)} replicates")
+            order = longest_first([task_costs[task_index] for task_index, _, _ in items])
+            items = [items[i] for i in order]
+            chunks = guided_chunks([task_costs[task_index] for task_index, _, _ in items], max_workers)
+            futures = [executor.submit(_run_replicate_chunk, items[chunk.start:chunk.stop]) for chunk in chunks]
+            for future in as_completed(futures):
+                for task_index, replicate, metrics, antithetic_metrics, _ in future.result()[2]:
+                    samples[task_index][replicate] = (metrics, antithetic_metrics)
+            still_active = []
+            for task_index in active:
+                task_samples = [samples[task_index][replicate] for replicate in sorted(samples[task_index])] # Replicate order, whatever the completion order
+                estimates[task_index] = replicate_task_estimates(task_samples, tasks[task_index][3], control_means[task_index], replicated[task_index])
+                if replicated[task_index]:
+                    converged[task_index] = replicates_converged(estimates[task_index])
+                    if not converged[task_index] and len(task_samples) < REPLICATE_MAX_REPLICATES:
+                        still_active.append(task_index)
+            active = still_active
+            if not active:
+                break
+    num_replicated = sum(replicated)
+    print(f"Replicates: {sum(len(samples[i]) for i in range(len(tasks)) if replicated[i])} over {num_replicated} stochastic configurations, "
+          f"{sum(converged[i] for i in range(len(tasks)) if replicated[i])} converged, "
+          f"{sum(not converged[i] for i in range(len(tasks)))} stopped at REPLICATE_MAX_REPLICATES")
+    results = []
+    for job_index, assigned in job_tasks.items():
+        scenario_index, grid_index = divmod(job_index, len(param_space))
+        params_set = param_space[grid_index]
+        num_years = {**BASE_SHARED_PARAMS, **params_set}['SIMULATION_YEARS']
+        result = {'params_set': params_set, 'market_scenario': scenario_names[scenario_index]}
+        for model, task_index in assigned.items():
+            task_estimates = estimates[task_index]
+            means = {years: {metric: estimate['mean'] for metric, estimate in by_metric.items()} for years, by_metric in task_estimates.items()}
+            result.update(sweep_job_result(model, means, num_years))
+            by_metric = task_estimates[num_years]
+            result[f'{model}_replicates'] = {
+                'replicates': len(samples[task_index]),
+                'runs': by_metric['final_price']['n_runs'],
+                'converged': converged[task_index],
+                'half_width': {metric: by_metric[metric]['half_width'] for metric in REPLICATE_TOLERANCE if metric in by_metric},
+                'variance_reduction': {metric: by_metric[metric]['variance_reduction'] for metric in REPLICATE_TOLERANCE if metric in by_metric},
+            }
+        results.append((job_index, result))
+    results.sort(key=lambda item: item[0])
+    return [result for _, result in results]
+
 # --- Print Results ---
 def print_market_results_table(results_list):
+    """Prints the sweep results: a list of result dicts or an already flat DataFrame (run_sweep_to_frame)."""
     print("\n--- Parameter Sweep with Market Trends Results ---")
-    if not results_list:
+    if len(results_list) == 0:
         print("No results to display.")
         return
+    if isinstance(results_list, pd.DataFrame):
+        print_results_frame(results_list)
+        return
 
     # Create a flat list of dicts for DataFrame conversion
     flat_results = []
@@ -383,10 +1503,12 @@ def print_market_results_table(results_list):
 
         flat_results.append(row)
     
-    results_df = pd.DataFrame(flat_results)
-    
+    print_results_frame(pd.DataFrame(flat_results))
+
+def print_results_frame(results_df):
+    """Prints a flat results DataFrame (parameter, market_scenario and '<Sim>_<metric>' columns)."""
     # Reorder columns for better readability: params, scenario, then metrics
-    param_cols = list(PARAM_SWEEP_CONFIG.keys())
+    param_cols = [col for col in sweep_param_names() if col in results_df.columns]
     scenario_col = ['market_scenario']
     metric_cols = [col for col in results_df.columns if col not in param_cols and col not in scenario_col]
     
@@ -577,15 +1699,21 @@ def plot_scenario_comparison(results_df):
     plt.savefig('output/scenario_comparison_barplot.png', bbox_inches='tight')
     plt.close()
 
-def plot_parameter_sensitivity(results_df, param_sweep_config):
-    key_params = [k for k in param_sweep_config.keys() if k != 'market_scenario']
+SENSITIVITY_MAX_LEVELS = 12  # Parameters with more distinct values (sampled designs) are grouped into SENSITIVITY_BINS quantile bins
+SENSITIVITY_BINS = 10
+
+def plot_parameter_sensitivity(results_df, param_names):
+    key_params = [k for k in param_names if k != 'market_scenario']
     models = ['Sim1_final_price', 'Sim2_final_price', 'Sim3_final_price']
     for param in key_params:
         if param not in results_df.columns:
             continue
+        levels = results_df[param]
+        if levels.nunique() > SENSITIVITY_MAX_LEVELS:
+            levels = pd.qcut(levels, SENSITIVITY_BINS, duplicates='drop').map(lambda interval: interval.mid).astype(float)
         plt.figure(figsize=(10,6))
         for model in models:
-            grouped = results_df.groupby(param)[model].mean()
+            grouped = results_df.groupby(levels)[model].mean()
             plt.plot(grouped.index, grouped.values, marker='o', label=model.replace('_final_price',''))
         plt.xlabel(param)
         plt.ylabel('Mean Final Price')
@@ -641,7 +1769,7 @@ def plot_failure_case_analysis(results_df, price_threshold=0.1, node_threshold=1
         failure = fail_price | fail_node
         failure_counts[label] = failure.sum()
         if failure.any():
-            fail_table = results_df.loc[failure, ['market_scenario', price_col, node_col] + [c for c in results_df.columns if c in PARAM_SWEEP_CONFIG.keys()]]
+            fail_table = results_df.loc[failure, ['market_scenario', price_col, node_col] + [c for c in results_df.columns if c in sweep_param_names()]]
             fail_table.to_csv(f'output/failure_cases_{label}.csv', index=False)
             failure_tables[label] = fail_table
     plt.figure(figsize=(7,5))
@@ -736,6 +1864,10 @@ def plot_time_series_snapshots(all_run_results, scenario='Baseline'):
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--queue-worker':
+        completed = run_queue_worker(sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"Queue worker done: {completed} job ranges completed")
+        sys.exit(0)
     print("Starting market-aware simulation comparison...")
 
     # 1. Fetch and process market data (with caching)
@@ -761,77 +1893,43 @@ if __name__ == "__main__":
     depin_trend_monthly_pct_change = depin_features['trend_index'].resample('MS').mean().pct_change(fill_method=None).fillna(0)
 
     # 4. Run simulations with market trends
-    # Ensure engines are modified to accept and use market_trend_series from initial_state
+    # Engines read the scenario's MarketTimeline from initial_state
     print("\nEnsure your simulation engines (simulation_engine.py, etc.) are updated to:")
-    print("1. Accept 'market_trend_monthly_pct_change', 'base_usd_demand_growth_rate', 'market_trend_impact_factor' in initial_state.")
-    print("2. In their monthly loop, get the current month's trend value from 'market_trend_monthly_pct_change'.")
+    print("1. Accept 'market_timeline', 'base_usd_demand_growth_rate', 'market_trend_impact_factor' in initial_state.")
+    print("2. In their monthly loop, get the current month's trend value from the 'market_timeline' arrays.")
     print("3. Modulate the demand growth: new_growth = base_growth * (1 + trend_value_for_month * impact_factor).")
     print("   (Ensure trend_value_for_month is correctly indexed from the series based on simulation month).")
 
-    # Placeholder: Actual run needs engine modifications
-    # For now, we'll pass dummy trends if real ones are empty to avoid crashing the batch runner structure.
+    # Align both trends to the simulation horizon once (zero-padded / truncated); every
+    # scenario and sweep job then shares these read-only timelines.
     num_sim_months = BASE_SHARED_PARAMS['SIMULATION_YEARS'] * 12
     if general_trend_monthly_pct_change.empty:
-        print("Using DUMMY general trend for simulation structure.")
-        dummy_dates = pd.date_range(start=pd.Timestamp.today().replace(day=1), periods=num_sim_months, freq='MS')
-        general_trend_monthly_pct_change = pd.Series(np.zeros(num_sim_months), index=pd.PeriodIndex(dummy_dates, freq='M'))
-        general_trend_monthly_pct_change = general_trend_monthly_pct_change.sort_index()
-
+        print("Using neutral general trend for simulation structure.")
     if depin_trend_monthly_pct_change.empty:
-        print("Using DUMMY DePIN trend for simulation structure.")
-        dummy_dates = pd.date_range(start=pd.Timestamp.today().replace(day=1), periods=num_sim_months, freq='MS')
-        depin_trend_monthly_pct_change = pd.Series(np.zeros(num_sim_months), index=pd.PeriodIndex(dummy_dates, freq='M'))
-        depin_trend_monthly_pct_change = depin_trend_monthly_pct_change.sort_index()
-
-    # Check alignment of trends with simulation duration
-    if len(general_trend_monthly_pct_change) < num_sim_months:
-        print(f"Padding general trend (len {len(general_trend_monthly_pct_change)}) to {num_sim_months} months.")
-        
-        # Get the last timestamp in the index
-        last_ts = general_trend_monthly_pct_change.index[-1]
-        # Calculate the start of the next month
-        start_next_month = last_ts + pd.offsets.MonthBegin(1)
-        # Create a date range for the padding periods
-        next_dates = pd.date_range(
-            start=start_next_month,
-            periods=num_sim_months - len(general_trend_monthly_pct_change), 
-            freq='MS' # Use Month Start frequency
-        )
-        
-        padding = pd.Series(np.zeros(len(next_dates)), index=next_dates)
-        general_trend_monthly_pct_change = pd.concat([general_trend_monthly_pct_change, padding])
-
-    if len(depin_trend_monthly_pct_change) < num_sim_months:
-        print(f"Padding DePIN trend (len {len(depin_trend_monthly_pct_change)}) to {num_sim_months} months.")
-
-        # Get the last timestamp in the index
-        last_ts = depin_trend_monthly_pct_change.index[-1]
-        # Calculate the start of the next month
-        start_next_month = last_ts + pd.offsets.MonthBegin(1)
-        # Create a date range for the padding periods
-        next_dates = pd.date_range(
-            start=start_next_month,
-            periods=num_sim_months - len(depin_trend_monthly_pct_change), 
-            freq='MS' # Use Month Start frequency
-        )
-        
-        padding = pd.Series(np.zeros(len(next_dates)), index=next_dates)
-        depin_trend_monthly_pct_change = pd.concat([depin_trend_monthly_pct_change, padding])
-
-    # Truncate if trends are longer than simulation period
-    general_trend_monthly_pct_change = general_trend_monthly_pct_change.iloc[:num_sim_months]
-    depin_trend_monthly_pct_change = depin_trend_monthly_pct_change.iloc[:num_sim_months]
+        print("Using neutral DePIN trend for simulation structure.")
+    general_timeline = MarketTimeline.from_trend_series(general_trend_monthly_pct_change, num_sim_months)
+    depin_timeline = MarketTimeline.from_trend_series(depin_trend_monthly_pct_change, num_sim_months)
+    print(f"Market timelines: general {general_timeline}, DePIN {depin_timeline}")
 
-    all_run_results = run_batch_with_market_trends(general_trend_monthly_pct_change, depin_trend_monthly_pct_change)
+    results_df = None
+    results_buffer = None
+    if USE_BATCHED_ENGINES:
+        all_run_results = run_batched_engines_with_market_trends(general_timeline, depin_timeline)
+    elif SWEEP_REPLICATES:
+        all_run_results = run_replicated_sweep(general_timeline)
+    elif SWEEP_RESULTS_IN_SHARED_MEMORY and not SWEEP_JOURNAL_PATH:
+        results_df, results_buffer = run_sweep_to_frame(general_timeline)
+        all_run_results = []
+    else:
+        all_run_results = run_batch_with_market_trends(general_timeline, depin_timeline)
     # 5. Print results
-    print_market_results_table(all_run_results)
+    print_market_results_table(results_df if results_df is not None else all_run_results)
 
     print("\nMarket-aware simulation comparison script finished.")
     print("Reminder: Ensure simulation engines are adapted to use the market trend data passed in initial_state.")
 
     # --- PLOTTING: Step 1 ---
     # Convert all_run_results to DataFrame if not already
-    results_df = pd.DataFrame(flat_results) if 'flat_results' in locals() else None
     if results_df is None or results_df.empty:
         # Try to reconstruct from all_run_results
         flat_results = []
@@ -849,7 +1947,7 @@ if __name__ == "__main__":
         plot_final_price_distributions(results_df)
         plot_robustness_consistency(results_df)
         plot_scenario_comparison(results_df)
-        plot_parameter_sensitivity(results_df, PARAM_SWEEP_CONFIG)
+        plot_parameter_sensitivity(results_df, sweep_param_names())
         plot_pairwise_scatter(results_df)
         plot_failure_case_analysis(results_df)
         plot_comparative_bars(results_df, scenario='Baseline', max_sets=10)
@@ -860,4 +1958,6 @@ if __name__ == "__main__":
     # def plot_robustness(...):
     # def plot_scenario_comparison(...):
     # def plot_parameter_sensitivity(...):
-    # ... 
\ No newline at end of file
+    # ... 
+    if results_buffer is not None:
+        results_buffer.close() # Frees the shared-memory results table behind results_df
@@ -0,0 +1,151 @@
+# sim/demand_paths.py
+# Whole-horizon demand-driver paths. Demand only depends on constant growth rates, the
+# market series and (proposal model) random churn/shock events, never on price or supply,
+# so each engine builds its full N-month paths up front and the step loop indexes into them.
+# Paths are arrays of shape (num_months, N) for a list of N initial states. Random draws come
+# from rng (see batch_utils.random_source; None: the global np.random).
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from batch_utils import stack_state_field, stack_market_inputs, effective_growth_and_churn, random_source, split_random_source
+
+PATH_CACHE_SIZE = 64  # Memoized path sets kept (each is (num_months, N) arrays); least recently used ones are dropped first
+_PATH_CACHE = OrderedDict()
+
+# State keys each engine takes from its precomputed paths every month
+DEMAND_KEYS_ORIGINAL = ("current_usd_credit_purchase_per_month", "current_dria_earned_by_on_prem_users_per_month",
+                        "current_oracle_requests_per_month", "current_compute_demand_gflops_monthly")
+DEMAND_KEYS_PROPOSAL = ("current_usd_demand_per_month_proposal", "current_dria_demand_per_month_proposal",
+                        "user_churn_event", "demand_shock_event")
+DEMAND_KEYS_BME = ("usd_demand_per_month", "dria_demand_per_month")
+
+def clear_demand_path_cache():
+    """Drops all memoized demand paths."""
+    _PATH_CACHE.clear()
+
+def growth_path(initial_value, growth_factors):
+    """
+    Value after each month of `value *= factor`. Accumulates left to right from the initial
+    value, so the rounding is identical to the step loop's repeated in-place multiply.
+    growth_factors has shape (num_months, N); initial_value has shape (N,).
+    """
+    factors = np.asarray(growth_factors, dtype=np.float64)
+    start = np.broadcast_to(np.asarray(initial_value, dtype=np.float64), factors.shape[1:])[np.newaxis]
+    return np.multiply.accumulate(np.concatenate([start, factors]), axis=0)[1:]
+
+def demand_streams(rng=None):
+    """(extreme_source, event_source): children of a demand-path stream. Every model draws its
+    extreme-event shocks from the first, so they line up across models given the same seed."""
+    return split_random_source(random_source(rng), 2)
+
+def market_growth(states, market, default_base_growth_rate, rng=None):
+    """Per-month effective USD demand growth rate and churn multiplier, each (num_months, N),
+    from the stacked market inputs of stack_market_inputs."""
+    base_growth_rate = stack_state_field(states, 'base_usd_demand_growth_rate', default_base_growth_rate)
+    impact_factor = stack_state_field(states, 'market_trend_impact_factor', 0.5)
+    effective_growth_rate, churn_multiplier = effective_growth_and_churn(
+        base_growth_rate[:, np.newaxis], impact_factor[:, np.newaxis],
+        market['trend'], market['volatility_30d'], market['drawdown'], market['regime'], market['extreme_event'], rng)
+    return effective_growth_rate.T, np.broadcast_to(churn_multiplier, market['trend'].shape).T
+
+def _cached(kind, states, market, keys, extra, build):
+    """Memoizes deterministic paths (no extreme-event draws) by a hash of every input they depend on,
+    keeping the PATH_CACHE_SIZE most recently used."""
+    if market['extreme_event'].any():
+        return build()
+    digest = hashlib.sha1(repr((kind, extra)).encode())
+    for name in ('trend', 'volatility_30d', 'drawdown', 'regime'):
+        digest.update(np.ascontiguousarray(market[name]).tobytes())
+    for key in keys:
+        digest.update(stack_state_field(states, key).tobytes())
+    key = digest.hexdigest()
+    paths = _PATH_CACHE.get(key)
+    if paths is not None:
+        _PATH_CACHE.move_to_end(key)
+        return paths
+    paths = build()
+    for values in paths.values():
+        values.setflags(write=False) # Shared across jobs
+    _PATH_CACHE[key] = paths
+    while len(_PATH_CACHE) > PATH_CACHE_SIZE:
+        _PATH_CACHE.popitem(last=False)
+    return paths
+
+def precompute_demand_paths_original(states, p, num_months, rng=None):
+    """
+    Demand paths for the original model. run_simulation updates demand before advancing the
+    month, so step t reads market position t - 1 relative to the first simulated month.
+    """
+    first = states[0]
+    month_offset = (first["current_year"] - 1) * 12 + (first["current_month"] - 1)
+    n = len(states)
+    market = stack_market_inputs(states, num_months, month_offset)
+    def build():
+        effective_growth_rate, _ = market_growth(states, market, p.USD_CREDIT_PURCHASE_GROWTH_RATE_MONTHLY, demand_streams(rng)[0])
+        constant = lambda rate: np.full((num_months, n), 1 + rate)
+        return {
+            "current_usd_credit_purchase_per_month": growth_path(stack_state_field(states, "current_usd_credit_purchase_per_month"), 1 + effective_growth_rate),
+            "current_dria_earned_by_on_prem_users_per_month": growth_path(stack_state_field(states, "current_dria_earned_by_on_prem_users_per_month"), constant(p.ON_PREM_USER_EARNINGS_GROWTH_RATE_MONTHLY)),
+            "current_oracle_requests_per_month": growth_path(stack_state_field(states, "current_oracle_requests_per_month"), constant(p.ORACLE_REQUESTS_GROWTH_RATE_MONTHLY)),
+            "current_compute_demand_gflops_monthly": growth_path(stack_state_field(states, "current_compute_demand_gflops_monthly"), constant(p.COMPUTE_DEMAND_GROWTH_RATE_MONTHLY)),
+        }
+    keys = ("base_usd_demand_growth_rate", "market_trend_impact_factor", "current_usd_credit_purchase_per_month",
+            "current_dria_earned_by_on_prem_users_per_month", "current_oracle_requests_per_month", "current_compute_demand_gflops_monthly")
+    extra = (num_months, p.USD_CREDIT_PURCHASE_GROWTH_RATE_MONTHLY, p.ON_PREM_USER_EARNINGS_GROWTH_RATE_MONTHLY,
+             p.ORACLE_REQUESTS_GROWTH_RATE_MONTHLY, p.COMPUTE_DEMAND_GROWTH_RATE_MONTHLY)
+    return _cached('original', states, market, keys, extra, build)
+
+def precompute_demand_paths_bme(states, p, num_months, rng=None):
+    """Demand paths for the BME model, plus the per-month effective growth rate and churn multiplier
+    (both also feed node growth and the price update)."""
+    market = stack_market_inputs(states, num_months, 0)
+    def build():
+        effective_growth_rate, churn_multiplier = market_growth(states, market, p.BME_USD_DEMAND_GROWTH_RATE_MONTHLY, demand_streams(rng)[0])
+        return {
+            "usd_demand_per_month": growth_path(stack_state_field(states, "usd_demand_per_month"), 1 + effective_growth_rate),
+            "dria_demand_per_month": growth_path(stack_state_field(states, "dria_demand_per_month"), np.full((num_months, len(states)), 1 + p.BME_DRIA_DEMAND_GROWTH_RATE_MONTHLY)),
+            "effective_growth_rate": np.ascontiguousarray(effective_growth_rate),
+            "churn_multiplier": np.ascontiguousarray(churn_multiplier),
+        }
+    keys = ("base_usd_demand_growth_rate", "market_trend_impact_factor", "usd_demand_per_month", "dria_demand_per_month")
+    extra = (num_months, p.BME_USD_DEMAND_GROWTH_RATE_MONTHLY, p.BME_DRIA_DEMAND_GROWTH_RATE_MONTHLY)
+    return _cached('bme', states, market, keys, extra, build)
+
+def precompute_demand_paths_proposal(states, p, num_months, rng=None):
+    """
+    Demand paths for the proposal model, with the monthly user-churn and demand-shock events
+    drawn up front. Growth, churn and shock factors are applied as three successive multiplies
+    per month (a factor of 1.0 when no event fires), matching the step loop's rounding.
+    Not cached, since the events are random.
+    """
+    n = len(states)
+    market = stack_market_inputs(states, num_months, 0)
+    extreme_source, event_source = demand_streams(rng)
+    effective_growth_rate, churn_multiplier = market_growth(states, market, p.USD_DEMAND_GROWTH_RATE_MONTHLY_PROPOSAL, extreme_source)
+    # Month-major (month, event, run) block: a shorter horizon draws a prefix of the same numbers
+    draws = event_source.random((num_months, 3, n))
+    churn_event = draws[:, 0] < p.USER_CHURN_PROBABILITY * churn_multiplier
+    shock_event = draws[:, 1] < p.DEMAND_SHOCK_PROBABILITY
+    shock = np.where(draws[:, 2] < 0.5, 1 + p.DEMAND_SHOCK_MAGNITUDE, 1 - p.DEMAND_SHOCK_MAGNITUDE)
+    churn_factor = np.where(churn_event, 1 - p.USER_CHURN_MAGNITUDE, 1.0)
+    shock_factor = np.where(shock_event, shock, 1.0)
+    def event_path(initial_value, growth_factor):
+        factors = np.stack([growth_factor, churn_factor, shock_factor], axis=1).reshape(num_months * 3, n)
+        return growth_path(initial_value, factors)[2::3]
+    return {
+        "current_usd_demand_per_month_proposal": event_path(stack_state_field(states, "current_usd_demand_per_month_proposal"), 1 + effective_growth_rate),
+        "current_dria_demand_per_month_proposal": event_path(stack_state_field(states, "current_dria_demand_per_month_proposal"), np.full((num_months, n), 1 + p.DRIA_DEMAND_GROWTH_RATE_MONTHLY_PROPOSAL)),
+        "user_churn_event": churn_event,
+        "demand_shock_event": np.where(shock_event, shock, 0.0),
+    }
+
+def single_run_paths(paths, keys):
+    """Column 0 of each path as a plain list, for the scalar engines' per-month dict updates."""
+    return {key: paths[key][:, 0].tolist() for key in keys}
+
+def apply_demand_paths(state, run_paths, t):
+    """Writes month t of each precomputed path into the state dict."""
+    for key, values in run_paths.items():
+        state[key] = values[t]
+    return state
@@ -0,0 +1,167 @@
+# sim/history_recorder.py
+# Columnar history for the single-run engines. Instead of a list of per-month state dicts,
+# a HistoryRecorder preallocates one column per recorded scalar field for the whole horizon
+# and the engine writes each month's values by month index.
+
+import operator
+import numpy as np
+
+class HistoryRecorder:
+    """
+    Preallocated (num_months, num_fields) float64 buffer; column j holds fields[j].
+    fields=None records every scalar field of the engine's state record. Pass a recorder
+    as `recorder=` to run_simulation / run_simulation_proposal / run_simulation_bme; the
+    engine calls start() and record(), then returns the recorder.
+    """
+
+    def __init__(self, fields=None):
+        self.requested_fields = tuple(fields) if fields is not None else None
+        self.fields = ()
+        self.data = np.empty((0, 0))
+        self.num_recorded = 0
+        self._dtypes = {}
+
+    def start(self, record_cls, num_months):
+        """Allocates the columns for a run of num_months with the given state record class."""
+        scalar_fields = record_cls.scalar_fields()
+        if self.requested_fields is None:
+            fields = scalar_fields
+        else:
+            fields = tuple(dict.fromkeys(f for f in self.requested_fields if f)) # Drop blanks/duplicates, keep order
+            unknown = [f for f in fields if f not in scalar_fields]
+            if unknown:
+                raise ValueError(f"Cannot record {unknown}: not scalar fields of {record_cls.__name__}")
+        self.fields = fields
+        self.data = np.full((num_months, len(fields)), np.nan)
+        self.num_recorded = 0
+        self._index = {f: j for j, f in enumerate(fields)}
+        self._dtypes = {f: np.int64 if f in record_cls.INTEGER_FIELDS else (bool if f in record_cls.BOOLEAN_FIELDS else np.float64) for f in fields}
+        getter = operator.attrgetter(*fields) if fields else (lambda state: ())
+        self._values = getter if len(fields) != 1 else (lambda state: (getter(state),))
+        return self
+
+    def record(self, month_index, state):
+        """Writes the state's recorded fields into row month_index."""
+        self.data[month_index] = self._values(state)
+        self.num_recorded = max(self.num_recorded, month_index + 1)
+
+    def __len__(self):
+        return self.num_recorded
+
+    def __contains__(self, field):
+        return field in self._index
+
+    def column(self, field):
+        """Recorded values of one field (months recorded so far), in the field's dtype."""
+        values = self.data[:self.num_recorded, self._index[field]]
+        dtype = self._dtypes[field]
+        return values if dtype is np.float64 else values.astype(dtype)
+
+    def columns(self, fields=None):
+        """{field: column} for the given fields (default: all recorded fields)."""
+        return {f: self.column(f) for f in (self.fields if fields is None else fields)}
+
+    def to_frame(self, fields=None):
+        """Recorded history as a DataFrame (one row per month)."""
+        import pandas as pd
+        return pd.DataFrame(self.columns(fields))
+
+    def to_records(self):
+        """Recorded history as a NumPy structured array."""
+        records = np.empty(self.num_recorded, dtype=[(f, self._dtypes[f]) for f in self.fields])
+        for f in self.fields:
+            records[f] = self.column(f)
+        return records
+
+class MetricsRecorder:
+    """
+    Metrics-only alternative to HistoryRecorder: keeps running accumulators for the
+    calc_metrics_market KPIs (final value, min/max, Welford mean/std of the price, sums,
+    node-count growth) and no history, so memory per run is O(number of KPIs).
+    Takes the same arguments as calc_metrics_market; metrics() returns its dict.
+    horizons (month counts) also snapshots metrics() as each horizon is reached, so one run
+    gives the metrics of every shorter run with the same inputs (see horizon_metrics).
+    """
+
+    def __init__(self, price_col, node_col, horizons=(), **kpi_columns):
+        self.price_col = price_col
+        self.node_col = node_col
+        self.horizons = frozenset(horizons)
+        self.kpi_columns = kpi_columns
+
+    def start(self, record_cls, num_months):
+        from batch_utils import kpi_reduction
+        fields = set(record_cls.scalar_fields())
+        self._price = self.price_col if self.price_col in fields else None
+        self._nodes = self.node_col if self.node_col in fields else None
+        self._reductions = {kpi_name: kpi_reduction(kpi_name) for kpi_name, col in self.kpi_columns.items() if col in fields}
+        self._accumulated = [col for col in dict.fromkeys(self.kpi_columns[k] for k, r in self._reductions.items() if r != 'final')]
+        self._finals = [col for col in dict.fromkeys(self.kpi_columns[k] for k, r in self._reductions.items() if r == 'final')]
+        self.count = 0
+        self.price_final = self.price_min = np.nan
+        self.price_mean = self.price_m2 = 0.0
+        self.nodes_first = self.nodes_final = self.nodes_peak = np.nan
+        self.totals = [0.0] * len(self._accumulated)
+        self.finals = {}
+        self.by_horizon = {}
+        return self
+
+    def record(self, month_index, state):
+        """Folds one month into the accumulators (month_index is unused; months arrive in order)."""
+        self.count += 1
+        if self._price is not None:
+            price = getattr(state, self._price)
+            self.price_final = price
+            self.price_min = price if self.count == 1 else min(self.price_min, price)
+            delta = price - self.price_mean
+            self.price_mean += delta / self.count
+            self.price_m2 += delta * (price - self.price_mean)
+        if self._nodes is not None:
+            nodes = getattr(state, self._nodes)
+            if self.count == 1:
+                self.nodes_first = self.nodes_peak = nodes
+            self.nodes_final = nodes
+            self.nodes_peak = max(self.nodes_peak, nodes)
+        totals = self.totals
+        for j, col in enumerate(self._accumulated):
+            totals[j] += getattr(state, col)
+        for col in self._finals:
+            self.finals[col] = getattr(state, col)
+        if self.count in self.horizons:
+            self.by_horizon[self.count] = self.metrics()
+
+    def metrics(self):
+        """The calc_metrics_market dict for the months recorded so far."""
+        if self._price is None:
+            print(f"Warning: Price column '{self.price_col}' not found in state fields.")
+            return {}
+        if self._nodes is None:
+            print(f"Warning: Node column '{self.node_col}' not found in state fields.")
+        count = self.count
+        metrics = {
+            'final_price': self.price_final,
+            'lowest_price': self.price_min,
+            'price_std_dev': float(np.sqrt(self.price_m2 / (count - 1))) if count > 1 else np.nan,
+            'final_node_count': self.nodes_final,
+            'peak_node_count': self.nodes_peak,
+            # The mean of month-over-month differences telescopes to (last - first) / (count - 1)
+            'avg_node_growth': (self.nodes_final - self.nodes_first) / (count - 1) if count > 1 else np.nan,
+        }
+        totals = dict(zip(self._accumulated, self.totals))
+        for kpi_name, col in self.kpi_columns.items():
+            reduction = self._reductions.get(kpi_name)
+            if reduction == 'sum':
+                metrics[kpi_name] = totals[col]
+            elif reduction == 'mean':
+                metrics[kpi_name] = totals[col] / count if count else np.nan
+            elif reduction == 'final':
+                metrics[kpi_name] = self.finals.get(col, np.nan)
+            else:
+                metrics[kpi_name] = np.nan
+                if col:
+                    print(f"Warning: Optional KPI column '{col}' for '{kpi_name}' not found.")
+        return metrics
+
+    def horizon_metrics(self):
+        """{num_months: metrics} for each requested horizon reached so far."""
+        return dict(sorted(self.by_horizon.items()))
@@ -4,8 +4,8 @@ import model_parameters as p_orig
 import simulation_engine as engine_orig
 import model_parameters_proposal as p_prop
 import simulation_engine_proposal as engine_prop
+from history_recorder import HistoryRecorder
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 import inspect # For fetching parameters
@@ -50,8 +50,8 @@ def run_original_simulation():
         'current_quarter_ecosystem_release_pool': 0,
         'current_quarter_ecosystem_released_so_far': 0
     }
-    history = engine_orig.run_simulation(initial_state_orig, p_orig.SIMULATION_YEARS)
-    return pd.DataFrame(history), p_orig
+    recorder = engine_orig.run_simulation(initial_state_orig, p_orig.SIMULATION_YEARS, recorder=HistoryRecorder())
+    return recorder.to_frame(), p_orig
 
 def run_proposal_simulation():
     """Runs the proposal simulation and returns its history and parameters."""
@@ -80,8 +80,8 @@ def run_proposal_simulation():
         "monthly_profit_per_node_usd": 0,
         "node_growth_rate": 0
     }
-    history = engine_prop.run_simulation_proposal(initial_state_prop, p_prop, p_prop.SIMULATION_YEARS)
-    return pd.DataFrame(history), p_prop
+    recorder = engine_prop.run_simulation_proposal(initial_state_prop, p_prop, p_prop.SIMULATION_YEARS, recorder=HistoryRecorder())
+    return recorder.to_frame(), p_prop
 
 # --- Functions to generate HTML content ---
 
@@ -181,7 +181,8 @@ def format_y_axis_for_plot(ax):
         ax.legend()
 
 def generate_plots_original(df_orig, params_module, filename="original_model_plots.png"): # Added params_module
-    """Generates and saves plots for the original simulation model."""
+    """Generates and saves plots for the original simulation model (DataFrame or HistoryRecorder)."""
+    if isinstance(df_orig, HistoryRecorder): df_orig = df_orig.to_frame()
     if df_orig.empty: return None
     df_orig['simulation_month_abs'] = range(1, len(df_orig) + 1)
     
@@ -252,7 +253,8 @@ def generate_plots_original(df_orig, params_module, filename="original_model_plo
     return filename
 
 def generate_plots_proposal(df_prop, filename="proposal_model_plots.png"):
-    """Generates and saves plots for the proposal simulation model."""
+    """Generates and saves plots for the proposal simulation model (DataFrame or HistoryRecorder)."""
+    if isinstance(df_prop, HistoryRecorder): df_prop = df_prop.to_frame()
     if df_prop.empty: return None
     df_prop['simulation_month_abs'] = range(1, len(df_prop) + 1)
 
@@ -0,0 +1,124 @@
+# sim/market_timeline.py
+# Market inputs aligned to simulation months. A MarketTimeline is built once per scenario
+# from the market features DataFrame and/or the monthly trend series, and then shared
+# read-only by every run (and sweep worker) that uses that scenario.
+
+import hashlib
+import numpy as np
+
+# Integer codes for the market regime labels produced by extract_market_features
+REGIME_SIDEWAYS = 0
+REGIME_BULL = 1
+REGIME_BEAR = 2
+
+def _frozen(values, dtype):
+    array = np.ascontiguousarray(values, dtype=dtype)
+    if array is values and array.flags.writeable:
+        array = array.copy() # Don't freeze the caller's array
+    array.setflags(write=False)
+    return array
+
+def _lookup(length, num_months, month_offset):
+    """Returns (valid_mask, index) for a per-month lookup into a series of the given length.
+    Mirrors the engines' `len(series) > idx` check followed by positional `.iloc[idx]`."""
+    idx = np.arange(num_months) + month_offset
+    valid = length > idx
+    if length > 0:
+        idx = np.where(idx < 0, idx % length, idx) # Negative positions wrap like .iloc[-1]
+    idx = np.where(valid, idx, 0)
+    return valid, idx
+
+class MarketTimeline:
+    """
+    Per-month market inputs as contiguous arrays: float64 trend / volatility_30d / drawdown,
+    int8 regime codes (REGIME_*) and a bool extreme-event flag. Month i holds the inputs
+    for simulation month index i; months without market data are neutral (zero trend,
+    sideways, no extreme event).
+    """
+
+    FIELDS = ('trend', 'volatility_30d', 'drawdown', 'regime', 'extreme_event')
+
+    def __init__(self, trend, volatility_30d=None, drawdown=None, regime=None, extreme_event=None):
+        num_months = len(trend)
+        self.trend = _frozen(trend, np.float64)
+        self.volatility_30d = _frozen(np.zeros(num_months) if volatility_30d is None else volatility_30d, np.float64)
+        self.drawdown = _frozen(np.zeros(num_months) if drawdown is None else drawdown, np.float64)
+        self.regime = _frozen(np.full(num_months, REGIME_SIDEWAYS) if regime is None else regime, np.int8)
+        self.extreme_event = _frozen(np.zeros(num_months) if extreme_event is None else extreme_event, bool)
+        digest = hashlib.sha1()
+        for name in self.FIELDS:
+            digest.update(getattr(self, name).tobytes())
+        self.key = digest.hexdigest() # Content hash, for caches keyed by market inputs
+
+    def __len__(self):
+        return len(self.trend)
+
+    def __repr__(self):
+        return f"MarketTimeline(months={len(self)}, key={self.key[:10]})"
+
+    @classmethod
+    def from_market_data(cls, features_df=None, trend_series=None, num_months=None):
+        """
+        Aligns a features DataFrame (columns trend_index, volatility_30d, drawdown, regime,
+        extreme_event) and/or a monthly trend series by position. Each month uses the
+        features row when there is one, else the trend series value. num_months pads with
+        neutral months or truncates; by default the longer source sets the length.
+        """
+        features_len = len(features_df) if features_df is not None else 0
+        trend_len = len(trend_series) if trend_series is not None else 0
+        if num_months is None:
+            num_months = max(features_len, trend_len)
+        month = np.arange(num_months)
+        from_features = month < features_len
+        trend = np.zeros(num_months)
+        volatility = np.zeros(num_months)
+        drawdown = np.zeros(num_months)
+        regime = np.full(num_months, REGIME_SIDEWAYS, dtype=np.int8)
+        extreme = np.zeros(num_months, dtype=bool)
+        if features_len:
+            rows = month[from_features]
+            def column(name, default):
+                if name in features_df.columns:
+                    return features_df[name].to_numpy()[rows]
+                return np.full(len(rows), default)
+            trend[rows] = column('trend_index', 0.0)
+            volatility[rows] = column('volatility_30d', 0.0)
+            drawdown[rows] = column('drawdown', 0.0)
+            labels = column('regime', 'sideways')
+            regime[rows] = np.where(labels == 'bull', REGIME_BULL, np.where(labels == 'bear', REGIME_BEAR, REGIME_SIDEWAYS))
+            extreme[rows] = column('extreme_event', False).astype(bool)
+        if trend_len:
+            rows = month[~from_features & (month < trend_len)]
+            trend[rows] = np.asarray(trend_series, dtype=np.float64)[rows]
+        return cls(trend, volatility, drawdown, regime, extreme)
+
+    @classmethod
+    def from_trend_series(cls, trend_series, num_months=None):
+        """Timeline from a monthly trend series alone, padded with zeros / truncated to num_months."""
+        return cls.from_market_data(trend_series=trend_series, num_months=num_months)
+
+    @classmethod
+    def from_state(cls, state):
+        """The state's 'market_timeline', or one built from its 'market_features_df' / 'market_trend_monthly_pct_change'."""
+        timeline = state.get('market_timeline')
+        if timeline is not None:
+            return timeline
+        return cls.from_market_data(state.get('market_features_df'), state.get('market_trend_monthly_pct_change'))
+
+    def map_trend(self, trend_modifier):
+        """New timeline with trend_modifier applied to the trend array (e.g. a market scenario)."""
+        return MarketTimeline(trend_modifier(self.trend), self.volatility_30d, self.drawdown, self.regime, self.extreme_event)
+
+    def window(self, num_months, month_offset=0):
+        """
+        Inputs for num_months simulation steps where step t reads month t + month_offset, as a
+        dict of arrays. Months past the end are neutral and negative months wrap from the end,
+        the same as the engines' positional lookups.
+        """
+        if month_offset >= 0 and month_offset + num_months <= len(self):
+            return {name: getattr(self, name)[month_offset:month_offset + num_months] for name in self.FIELDS}
+        valid, idx = _lookup(len(self), num_months, month_offset)
+        neutral = {'trend': 0.0, 'volatility_30d': 0.0, 'drawdown': 0.0, 'regime': REGIME_SIDEWAYS, 'extreme_event': False}
+        if len(self) == 0:
+            return {name: np.full(num_months, neutral[name], dtype=getattr(self, name).dtype) for name in self.FIELDS}
+        return {name: np.where(valid, getattr(self, name)[idx], neutral[name]).astype(getattr(self, name).dtype) for name in self.FIELDS}
@@ -57,6 +57,11 @@ ECOSYSTEM_FUND_MONTHLY_RELEASE_PROPOSAL = ECOSYSTEM_FUND_TOKENS_TOTAL_PROPOSAL /
 
 # --- Performance-Based Reward Parameters (Proposal) ---
 PROPOSAL_UPTIME_THRESHOLD_FOR_FULL_REWARDS = 0.95 # 95% uptime for full eligibility multiplier
+# How per-contributor scores are drawn each month:
+# "loop" (per-node Python loop, the original behaviour), "vectorized" (per-node NumPy arrays), "aggregate" (totals only, no per-node arrays).
+# The opt-in modes draw from a separate np.random.Generator (PROPOSAL_REWARD_SCORING_SEED) instead of the random module, so their outputs differ from "loop"
+PROPOSAL_REWARD_SCORING_MODE = "loop"
+PROPOSAL_REWARD_SCORING_SEED = None # Seed for the scoring np.random.Generator each unseeded run creates (None = fresh entropy)
 
 # --- Staking & Slashing Parameters (Proposal) ---
 PROPOSAL_MIN_VALIDATOR_STAKE_DRIA = 5000 # Example min stake for a validator
@@ -64,6 +69,8 @@ PROPOSAL_MIN_CONTRIBUTOR_STAKE_DRIA = 100 # Example min stake for a FLOPs/Uptime
 PROPOSAL_SLASHING_PERCENTAGE_VALIDATOR_DOWNTIME = 0.005 # Small slash for validator downtime
 PROPOSAL_SLASHING_PERCENTAGE_VALIDATOR_MALFEASANCE = 0.05 # Major slash for cheating
 PROPOSAL_SLASHING_PERCENTAGE_CONTRIBUTOR_FAILURE = 0.01 # Slash for consistently failing to provide promised Uptime/FLOPs
+PROPOSAL_SLASHING_LEDGER = False # Also record which node indices were slashed each month (state["slashing_ledger_proposal"])
+PROPOSAL_SLASHING_SEED = None # Seed for the slashing np.random.Generator each unseeded run creates (None = fresh entropy)
 
 # --- Token Utility & Fees (Proposal) ---
 PROPOSAL_AVG_TX_FEE_DRIA = 0.01 # Average transaction fee in DRIA
@@ -0,0 +1,86 @@
+# sim/result_cache.py
+# On-disk, content-addressed store of per-run sweep metrics. Entries are keyed by a hash of
+# everything a run's metrics depend on (see compare_with_market.sweep_cache_key), so a
+# re-run of the sweep only recomputes runs whose inputs or engine sources changed.
+
+import hashlib
+import inspect
+import json
+import sqlite3
+import numpy as np
+
+_SOURCE_DIGESTS = {}
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot store {type(value).__name__} in the result cache")
+
+def source_fingerprint(*objects):
+    """
+    Hash of the source code of the given modules / functions / classes (for a module, its
+    whole file). Changing any of them changes the fingerprint and so every key built from it.
+    """
+    digest = hashlib.sha1()
+    for obj in objects:
+        name = f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', getattr(obj, '__name__', ''))}"
+        source = _SOURCE_DIGESTS.get(name)
+        if source is None:
+            source = _SOURCE_DIGESTS[name] = hashlib.sha1(inspect.getsource(obj).encode()).hexdigest()
+        digest.update(f"{name}:{source};".encode())
+    return digest.hexdigest()
+
+class ResultCache:
+    """
+    SQLite table of key -> metrics (JSON). NaN values round-trip; NumPy scalars are stored
+    as plain numbers. Use as a context manager or call close().
+    """
+
+    BATCH_SIZE = 500 # Keys per SELECT ... IN (...) query (below SQLite's parameter limit)
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, metrics TEXT NOT NULL)")
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key):
+        """Cached metrics for key, or None."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """{key: metrics} for the keys that are cached."""
+        keys = list(keys)
+        found = {}
+        for start in range(0, len(keys), self.BATCH_SIZE):
+            batch = keys[start:start + self.BATCH_SIZE]
+            rows = self.connection.execute(
+                f"SELECT key, metrics FROM results WHERE key IN ({','.join('?' * len(batch))})", batch)
+            found.update((key, json.loads(metrics)) for key, metrics in rows)
+        return found
+
+    def put(self, key, metrics):
+        self.put_many([(key, metrics)])
+
+    def put_many(self, items):
+        """Stores (key, metrics) pairs, replacing existing entries, in one transaction."""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results (key, metrics) VALUES (?, ?)",
+                [(key, json.dumps(metrics, default=_json_default)) for key, metrics in items])
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM results")
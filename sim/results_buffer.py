@@ -0,0 +1,70 @@
+# sim/results_buffer.py
+# Fixed-schema sweep results in shared memory: a (num_rows, num_columns) float64 array that
+# pool workers attach to by name and write their metrics into directly, and that the parent
+# wraps as a DataFrame without copying. Saves pickling a dict per job back to the parent
+# and flattening it into rows afterwards.
+
+from multiprocessing import shared_memory
+import numpy as np
+
+class SharedResultsBuffer:
+    """
+    Shared-memory float64 table, NaN until written. Create it in the parent with
+    SharedResultsBuffer(columns, num_rows); pass spec() to workers, which attach with
+    SharedResultsBuffer.attach(*spec). The creator unlinks the segment on close(); keep the
+    buffer open for as long as frames from to_frame() are in use.
+    """
+
+    def __init__(self, columns, num_rows, name=None):
+        self.columns = tuple(columns)
+        self.num_rows = num_rows
+        self._column_index = {column: j for j, column in enumerate(self.columns)}
+        size = max(num_rows * len(self.columns) * 8, 1)
+        self.owner = name is None
+        # Pool workers share the creating process's resource tracker, so attaching doesn't
+        # hand the segment's lifetime to the worker; the creator unlinks it in close()
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size if self.owner else 0)
+        self.array = np.ndarray((num_rows, len(self.columns)), dtype=np.float64, buffer=self.shm.buf)
+        if self.owner:
+            self.array.fill(np.nan)
+
+    @classmethod
+    def attach(cls, name, columns, num_rows):
+        return cls(columns, num_rows, name=name)
+
+    def spec(self):
+        """(name, columns, num_rows): what a worker needs to attach()."""
+        return self.shm.name, self.columns, self.num_rows
+
+    def write(self, row, values, prefix=''):
+        """Writes {name: value} into row; prefix + name selects the column, unknown names are skipped."""
+        array_row = self.array[row]
+        for name, value in values.items():
+            j = self._column_index.get(prefix + name)
+            if j is not None:
+                array_row[j] = value
+
+    def read(self, row, names, prefix=''):
+        """{name: value} of row for the given names (prefix + name columns)."""
+        array_row = self.array[row]
+        return {name: float(array_row[self._column_index[prefix + name]]) for name in names}
+
+    def to_frame(self, index=None):
+        """DataFrame over the shared array (no copy)."""
+        import pandas as pd
+        return pd.DataFrame(self.array, columns=list(self.columns), index=index, copy=False)
+
+    def close(self):
+        self.array = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass # Frames still view the mapping; it is released when they are
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
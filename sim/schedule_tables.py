@@ -0,0 +1,120 @@
+# sim/schedule_tables.py
+# Precompiled per-month schedule tables (vesting unlocks, yearly emission budget, halving
+# targets). None of these depend on dynamic state, so each table is built once per set of
+# schedule inputs and cached; engines index into the arrays instead of re-deriving the
+# schedule every month. The cache keeps the SCHEDULE_CACHE_SIZE most recently used tables.
+
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+SCHEDULE_CACHE_SIZE = 256  # Tables kept; least recently used ones are dropped first
+_SCHEDULE_CACHE = OrderedDict()
+
+def _schedule_key(*inputs):
+    """Hash of the schedule inputs, used as the memo key."""
+    return hashlib.sha1(repr(inputs).encode()).hexdigest()
+
+def _memoized(key, build):
+    table = _SCHEDULE_CACHE.get(key)
+    if table is not None:
+        _SCHEDULE_CACHE.move_to_end(key)
+        return table
+    table = build()
+    for values in table.values():
+        values.setflags(write=False) # Shared across runs/jobs
+    _SCHEDULE_CACHE[key] = table
+    while len(_SCHEDULE_CACHE) > SCHEDULE_CACHE_SIZE:
+        _SCHEDULE_CACHE.popitem(last=False)
+    return table
+
+def clear_schedule_cache():
+    """Drops all memoized tables (e.g. after editing schedule parameters in place)."""
+    _SCHEDULE_CACHE.clear()
+
+def vesting_table(total_tokens, cliff_months, linear_vesting_months, num_months):
+    """
+    Per-month unlocks for one vesting category, starting from nothing vested.
+    Returns {'unlocked': ..., 'vested_before': ...}, both indexed by sim month - 1, using the
+    same arithmetic (and float accumulation) as calculate_monthly_unlock.
+    """
+    def build():
+        unlocked = np.zeros(num_months)
+        vested_before = np.zeros(num_months)
+        vested_to_date = 0
+        for m in range(1, num_months + 1):
+            tokens_unlocked_this_month = 0
+            if linear_vesting_months <= 0:
+                if m > cliff_months and vested_to_date == 0:
+                    tokens_unlocked_this_month = total_tokens
+            elif m > cliff_months and m <= (cliff_months + linear_vesting_months):
+                monthly_unlock_amount = total_tokens / linear_vesting_months
+                if vested_to_date + monthly_unlock_amount > total_tokens:
+                    tokens_unlocked_this_month = total_tokens - vested_to_date
+                else:
+                    tokens_unlocked_this_month = monthly_unlock_amount
+            vested_before[m - 1] = vested_to_date
+            unlocked[m - 1] = tokens_unlocked_this_month
+            vested_to_date += tokens_unlocked_this_month
+        return {'unlocked': unlocked, 'vested_before': vested_before}
+    return _memoized(_schedule_key('vesting', total_tokens, cliff_months, linear_vesting_months, num_months), build)
+
+def yearly_emission_table(yearly_emission_schedule, num_months):
+    """Scheduled (pre-cap) monthly emission for each sim month, from a {year: annual amount} table."""
+    def build():
+        years = np.arange(num_months) // 12 + 1
+        monthly = np.array([yearly_emission_schedule[int(y)] / 12 if int(y) in yearly_emission_schedule else 0 for y in years], dtype=np.float64)
+        return {'monthly_emission': monthly}
+    return _memoized(_schedule_key('yearly_emission', sorted(yearly_emission_schedule.items()), num_months), build)
+
+def halving_table(initial_monthly_emission, halving_period_months, buffer_percent, num_months):
+    """Halvings, base and buffered emission targets for each absolute month index."""
+    def build():
+        months = np.arange(num_months)
+        num_halvings = months // halving_period_months if halving_period_months > 0 else np.zeros(num_months, dtype=np.int64)
+        base = np.array([initial_monthly_emission / (2**int(h)) for h in num_halvings], dtype=np.float64)
+        return {
+            'num_halvings': num_halvings.astype(np.int64),
+            'base_emission': base,
+            'buffered_emission': base * (1 + buffer_percent),
+        }
+    return _memoized(_schedule_key('halving', initial_monthly_emission, halving_period_months, buffer_percent, num_months), build)
+
+def compile_schedules_original(p, num_months):
+    """Vesting tables (by state key) and the yearly emission table for the original model."""
+    return {
+        'vesting': {
+            "vested_team_tokens": vesting_table(p.TEAM_TOKENS_TOTAL, p.TEAM_VESTING["cliff"], p.TEAM_VESTING["linear_months"], num_months),
+            "vested_advisors_tokens": vesting_table(p.ADVISORS_TOKENS_TOTAL, p.ADVISORS_VESTING["cliff"], p.ADVISORS_VESTING["linear_months"], num_months),
+            "vested_private_round_tokens": vesting_table(p.PRIVATE_ROUND_INVESTORS_TOKENS_TOTAL, p.PRIVATE_ROUND_VESTING["cliff"], p.PRIVATE_ROUND_VESTING["linear_months"], num_months),
+            "vested_current_round_tokens": vesting_table(p.CURRENT_INVESTMENT_ROUND_TOKENS_TOTAL, p.CURRENT_ROUND_VESTING["cliff"], p.CURRENT_ROUND_VESTING["linear_months"], num_months),
+        },
+        'emission': yearly_emission_table(p.YEARLY_EMISSION_SCHEDULE_ABSOLUTE, num_months),
+    }
+
+def compile_schedules_proposal(p, num_months):
+    """Vesting tables (by state key) and the halving table for the proposal model."""
+    return {
+        'vesting': {
+            "vested_team_tokens_proposal": vesting_table(p.TEAM_TOKENS_TOTAL_PROPOSAL, p.TEAM_VESTING_PROPOSAL["cliff"], p.TEAM_VESTING_PROPOSAL["linear_months"], num_months),
+            "vested_advisors_tokens_proposal": vesting_table(p.ADVISORS_TOKENS_TOTAL_PROPOSAL, p.ADVISORS_VESTING_PROPOSAL["cliff"], p.ADVISORS_VESTING_PROPOSAL["linear_months"], num_months),
+            "vested_investors_tokens_proposal": vesting_table(p.INVESTORS_TOKENS_TOTAL_PROPOSAL, p.INVESTORS_VESTING_PROPOSAL["cliff"], p.INVESTORS_VESTING_PROPOSAL["linear_months"], num_months),
+        },
+        'halving': halving_table(p.PROPOSAL_INITIAL_MONTHLY_EMISSION, p.PROPOSAL_HALVING_PERIOD_MONTHS, p.EMISSION_BUFFER_PERCENT, num_months),
+    }
+
+def scheduled_unlock(table, current_sim_month, vested_to_date):
+    """Table lookup for one category, or None when the month is outside the table or the
+    category's vested amount has diverged from the from-zero schedule (caller falls back)."""
+    if 1 <= current_sim_month <= len(table['unlocked']) and vested_to_date == table['vested_before'][current_sim_month - 1]:
+        return float(table['unlocked'][current_sim_month - 1])
+    return None
+
+def scheduled_unlock_batch(table, current_sim_month, vested_to_date, fallback):
+    """Array version of scheduled_unlock: the table value for runs still on the from-zero
+    schedule, fallback() (the per-run unlock rule) for the rest."""
+    unlocked = table['unlocked'][current_sim_month - 1]
+    on_schedule = vested_to_date == table['vested_before'][current_sim_month - 1]
+    if on_schedule.all():
+        return np.full(vested_to_date.shape, unlocked)
+    return np.where(on_schedule, unlocked, fallback())
@@ -0,0 +1,231 @@
+# sim/simulation_engine_batch.py
+# Batched original-model engine: advances N independent runs per month with one array
+# per state field. Month-for-month equivalent to simulation_engine.run_simulation for
+# runs starting at year 1, month 0 (as every caller does).
+
+import numpy as np
+import model_parameters as params
+from batch_utils import stack_state_field, engine_streams
+from demand_paths import precompute_demand_paths_original, DEMAND_KEYS_ORIGINAL
+from schedule_tables import compile_schedules_original, scheduled_unlock_batch
+
+# Numeric state fields recorded in the batched history (apy_history is replaced by a ring buffer)
+HISTORY_COLUMNS = [
+    "current_year", "current_month", "circulating_supply", "total_tokens_burned", "total_dria_staked",
+    "current_node_count", "simulated_dria_price_usd", "remaining_node_rewards_pool_tokens",
+    "remaining_ecosystem_fund_tokens", "vested_team_tokens", "vested_advisors_tokens",
+    "vested_private_round_tokens", "vested_current_round_tokens", "current_usd_credit_purchase_per_month",
+    "current_dria_earned_by_on_prem_users_per_month", "current_oracle_requests_per_month",
+    "current_compute_demand_gflops_monthly", "current_network_capacity_gflops_monthly",
+    "newly_staked_dria_monthly", "actual_node_apy_monthly_percentage", "node_runner_revenue_monthly_usd",
+    "newly_vested_total_monthly", "emitted_node_rewards_monthly", "ecosystem_fund_released_monthly",
+    "burned_from_usd_monthly", "burned_from_onprem_monthly", "burned_from_oracle_monthly",
+    "average_apy_for_decision", "current_adjusted_base_staking_yield_annual", "network_utilization_rate",
+    "current_quarter_ecosystem_release_pool", "current_quarter_ecosystem_released_so_far", "treasury_balance",
+]
+INTEGER_COLUMNS = ("current_year", "current_month", "current_node_count")
+
+def monthly_unlock_batch(total_tokens, cliff_months, linear_vesting_months, current_simulation_month, vested_to_date):
+    """Array version of simulation_engine.calculate_monthly_unlock (vested_to_date is per run)."""
+    if linear_vesting_months == 0:
+        if current_simulation_month > cliff_months:
+            return np.where(vested_to_date == 0, total_tokens, 0.0)
+        return np.zeros_like(vested_to_date)
+    monthly_unlock_amount = total_tokens / linear_vesting_months
+    if current_simulation_month > cliff_months and current_simulation_month <= (cliff_months + linear_vesting_months):
+        return np.where(vested_to_date + monthly_unlock_amount > total_tokens, total_tokens - vested_to_date, monthly_unlock_amount)
+    return np.zeros_like(vested_to_date)
+
+class ApyRingBuffer:
+    """Fixed-size per-run ring buffer replacing the apy_history list and its pop(0)."""
+
+    def __init__(self, num_runs, window, initial_histories=None):
+        self.window = max(int(window), 1)
+        self.values = np.zeros((num_runs, self.window))
+        self.count = np.zeros(num_runs, dtype=np.int64)
+        self.head = np.zeros(num_runs, dtype=np.int64) # Next slot to write
+        if initial_histories is not None:
+            for i, apy_history in enumerate(initial_histories):
+                recent = list(apy_history)[-self.window:]
+                self.values[i, :len(recent)] = recent
+                self.count[i] = len(recent)
+                self.head[i] = len(recent) % self.window
+
+    def append(self, apy):
+        rows = np.arange(len(apy))
+        self.values[rows, self.head] = apy
+        self.head = (self.head + 1) % self.window
+        self.count = np.minimum(self.count + 1, self.window)
+
+    def mean(self):
+        """Moving average over the stored entries, summed oldest-first like sum(apy_history)."""
+        rows = np.arange(len(self.count))
+        oldest = (self.head - self.count) % self.window
+        total = np.zeros(len(self.count))
+        for k in range(self.window):
+            value = self.values[rows, (oldest + k) % self.window]
+            total = total + np.where(k < self.count, value, 0.0)
+        return np.divide(total, self.count, out=np.zeros(len(self.count)), where=self.count > 0)
+
+def run_simulation_batch(initial_states, num_years, p=params, rng=None):
+    """
+    Runs the original model for a list of initial state dicts (same keys as run_simulation)
+    and returns the history as a dict of column -> array of shape (num_years * 12, N).
+    Extreme-event shocks are drawn from rng (see batch_utils.engine_streams).
+    """
+    n = len(initial_states)
+    timesteps = num_years * 12
+    s = {col: stack_state_field(initial_states, col) for col in HISTORY_COLUMNS}
+    s["treasury_balance"] = stack_state_field(initial_states, "treasury_balance", 0.0)
+    demand_paths = precompute_demand_paths_original(initial_states, p, timesteps, engine_streams(rng)[0])
+    apy_buffer = ApyRingBuffer(n, p.APY_MOVING_AVERAGE_MONTHS, [st.get('apy_history', []) for st in initial_states])
+
+    history = {col: np.empty((timesteps, n), dtype=np.int64 if col in INTEGER_COLUMNS else np.float64) for col in HISTORY_COLUMNS}
+    vesting_categories = [
+        ("vested_team_tokens", p.TEAM_TOKENS_TOTAL, p.TEAM_VESTING),
+        ("vested_advisors_tokens", p.ADVISORS_TOKENS_TOTAL, p.ADVISORS_VESTING),
+        ("vested_private_round_tokens", p.PRIVATE_ROUND_INVESTORS_TOKENS_TOTAL, p.PRIVATE_ROUND_VESTING),
+        ("vested_current_round_tokens", p.CURRENT_INVESTMENT_ROUND_TOKENS_TOTAL, p.CURRENT_ROUND_VESTING),
+    ]
+    zeros = np.zeros(n)
+    schedules = compile_schedules_original(p, timesteps)
+    lag = max(p.NODE_COUNT_ADJUSTMENT_LAG_MONTHS, 1)
+
+    for t in range(timesteps):
+        # 0. Demand drivers (precomputed for the whole horizon)
+        for key in DEMAND_KEYS_ORIGINAL:
+            s[key] = demand_paths[key][t]
+
+        current_year = t // 12 + 1
+        current_month = t % 12 + 1
+        current_sim_month = t + 1
+
+        # 1. Vesting
+        newly_vested_total = zeros
+        for key, total_tokens, schedule in vesting_categories:
+            unlocked = scheduled_unlock_batch(
+                schedules['vesting'][key], current_sim_month, s[key],
+                lambda: monthly_unlock_batch(total_tokens, schedule["cliff"], schedule["linear_months"], current_sim_month, s[key]))
+            s[key] = s[key] + unlocked
+            newly_vested_total = newly_vested_total + unlocked
+        s["circulating_supply"] += newly_vested_total
+        s["newly_vested_total_monthly"] = newly_vested_total
+
+        # 2. Emissions
+        potential_monthly_emission_from_schedule = schedules['emission']['monthly_emission'][t]
+        remaining_pool = s["remaining_node_rewards_pool_tokens"]
+        max_emission_this_month = np.minimum(potential_monthly_emission_from_schedule, remaining_pool)
+        capacity = s["current_network_capacity_gflops_monthly"]
+        compute_demand = s["current_compute_demand_gflops_monthly"]
+        utilization = np.divide(compute_demand, capacity, out=np.zeros(n), where=capacity > 0)
+        s["network_utilization_rate"] = np.where(capacity > 0, np.minimum(utilization, 1.0), 0.0)
+        emitted_from_schedule = (max_emission_this_month * p.SCHEDULE_DRIVEN_EMISSION_FACTOR) * s["network_utilization_rate"]
+        usage_driven_budget_share = max_emission_this_month * p.USAGE_DRIVEN_EMISSION_FACTOR
+        emitted_from_usage = np.minimum(compute_demand * p.EMISSION_RATE_PER_GFLOP_DRIA, usage_driven_budget_share)
+        final_emission = np.minimum(emitted_from_schedule + emitted_from_usage, remaining_pool)
+        final_emission = np.minimum(final_emission, max_emission_this_month)
+        treasury_cut = final_emission * p.TREASURY_TAX_RATE_FROM_EMISSIONS
+        emission_to_circulation = final_emission - treasury_cut
+        emitting = final_emission > 0
+        s["remaining_node_rewards_pool_tokens"] = np.where(emitting, remaining_pool - final_emission, remaining_pool)
+        s["circulating_supply"] = np.where(emitting, s["circulating_supply"] + emission_to_circulation, s["circulating_supply"])
+        s["emitted_node_rewards_monthly"] = np.where(emitting, emission_to_circulation, 0.0)
+        s["treasury_balance"] = np.where(emitting, s["treasury_balance"] + treasury_cut, s["treasury_balance"])
+
+        # 2.b. Ecosystem fund release (quarterly pool, released in monthly fractions)
+        if t % 3 == 0:
+            quarterly_release_percent = p.ECOSYSTEM_FUND_QUARTERLY_RELEASE_SCHEDULE_YEARLY.get(current_year, p.DEFAULT_ECOSYSTEM_FUND_QUARTERLY_RELEASE_PERCENT)
+            s['current_quarter_ecosystem_release_pool'] = s['remaining_ecosystem_fund_tokens'] * quarterly_release_percent
+            s['current_quarter_ecosystem_released_so_far'] = np.zeros(n)
+        pool = s['current_quarter_ecosystem_release_pool']
+        releasing = pool > 0
+        target_monthly_release = pool * p.ECOSYSTEM_FUND_MONTHLY_RELEASE_FRACTION_OF_QUARTERLY
+        remaining_in_quarter_pool = pool - s['current_quarter_ecosystem_released_so_far']
+        release = np.where(target_monthly_release > remaining_in_quarter_pool, remaining_in_quarter_pool, target_monthly_release)
+        release = np.where(release > s['remaining_ecosystem_fund_tokens'], s['remaining_ecosystem_fund_tokens'], release)
+        release = np.where(releasing, release, 0.0)
+        s['circulating_supply'] = np.where(releasing, s['circulating_supply'] + release, s['circulating_supply'])
+        s['remaining_ecosystem_fund_tokens'] = np.where(releasing, s['remaining_ecosystem_fund_tokens'] - release, s['remaining_ecosystem_fund_tokens'])
+        s['current_quarter_ecosystem_released_so_far'] = np.where(releasing, s['current_quarter_ecosystem_released_so_far'] + release, s['current_quarter_ecosystem_released_so_far'])
+        s['ecosystem_fund_released_monthly'] = release
+        if (t + 1) % 3 == 0:
+            s['current_quarter_ecosystem_release_pool'] = np.zeros(n)
+            s['current_quarter_ecosystem_released_so_far'] = np.zeros(n)
+
+        # 2.c. Node economics (revenue, cost, APY)
+        price = s['simulated_dria_price_usd']
+        nodes = s["current_node_count"]
+        has_nodes = nodes > 0
+        s["node_runner_revenue_monthly_usd"] = s['emitted_node_rewards_monthly'] * price
+        total_network_operating_cost = np.where(has_nodes, nodes * p.AVG_NODE_OPERATING_COST_USD_MONTHLY, 0.0)
+        net_profit_all_nodes = s["node_runner_revenue_monthly_usd"] - total_network_operating_cost
+        avg_profit_per_node = np.divide(net_profit_all_nodes, nodes, out=np.zeros(n), where=has_nodes)
+        annualized_profit_per_node = avg_profit_per_node * 12
+        value_staked_per_node = p.MINIMUM_NODE_STAKE_DRIA * price
+        compute_apy_percentage = np.divide(annualized_profit_per_node, value_staked_per_node, out=np.zeros(n), where=value_staked_per_node > 0) * 100
+        compute_apy_percentage = np.where(value_staked_per_node > 0, compute_apy_percentage, 0.0)
+        adjusted_base_yield = np.where(
+            price < p.ADAPTIVE_YIELD_PRICE_THRESHOLD_LOW,
+            min(p.BASE_STAKING_YIELD_RATE_ANNUAL * p.BASE_YIELD_BOOST_FACTOR, p.MAX_ADAPTIVE_BASE_YIELD_ANNUAL),
+            np.where(price > p.ADAPTIVE_YIELD_PRICE_THRESHOLD_HIGH,
+                     max(p.BASE_STAKING_YIELD_RATE_ANNUAL * p.BASE_YIELD_REDUCTION_FACTOR, p.MIN_ADAPTIVE_BASE_YIELD_ANNUAL),
+                     p.BASE_STAKING_YIELD_RATE_ANNUAL))
+        s['current_adjusted_base_staking_yield_annual'] = adjusted_base_yield
+        s["actual_node_apy_monthly_percentage"] = compute_apy_percentage + (adjusted_base_yield * 100)
+
+        # 2.d. Staking and node count (APY moving average)
+        previous_total_staked = s["total_dria_staked"]
+        previous_node_count = nodes
+        apy_buffer.append(s["actual_node_apy_monthly_percentage"])
+        average_apy_for_decision = apy_buffer.mean()
+        s['average_apy_for_decision'] = average_apy_for_decision
+        node_growth_factor = (average_apy_for_decision - p.TARGET_NODE_APY_PERCENTAGE) * p.NODE_ADOPTION_CHURN_SENSITIVITY
+        node_growth_factor = np.maximum(np.minimum(node_growth_factor, 0.20), -0.20)
+        target_node_count = previous_node_count * (1 + node_growth_factor)
+        new_node_count = previous_node_count + (target_node_count - previous_node_count) / lag
+        s["current_node_count"] = np.where(
+            previous_node_count > 0,
+            np.maximum(np.rint(new_node_count), 0),
+            np.where(average_apy_for_decision > p.TARGET_NODE_APY_PERCENTAGE, 1.0, 0.0))
+        s["total_dria_staked"] = s["current_node_count"] * p.MINIMUM_NODE_STAKE_DRIA
+        newly_staked = s["total_dria_staked"] - previous_total_staked
+        s["newly_staked_dria_monthly"] = newly_staked
+        circulating = s["circulating_supply"]
+        s["circulating_supply"] = np.where(newly_staked > 0, circulating - np.minimum(newly_staked, circulating),
+                                           np.where(newly_staked < 0, circulating - newly_staked, circulating))
+        s["current_network_capacity_gflops_monthly"] = s["current_node_count"] * p.AVG_GFLOPS_PER_NODE
+
+        # 4. Burns (each source capped by what is still circulating)
+        circulating = s["circulating_supply"]
+        positive_price = price > 0
+        dria_bought_for_burn_usd = np.divide(s["current_usd_credit_purchase_per_month"], price, out=np.zeros(n), where=positive_price)
+        burned_usd = np.where(positive_price, np.minimum(dria_bought_for_burn_usd, circulating), 0.0)
+        total_burned_this_month = zeros + burned_usd
+        onprem_potential = (s["current_dria_earned_by_on_prem_users_per_month"] * p.INITIAL_ON_PREM_CREDIT_CONVERSION_RATE) * p.ON_PREM_CONVERSION_BURN_RATE
+        burned_onprem = np.minimum(onprem_potential, circulating - total_burned_this_month)
+        total_burned_this_month = total_burned_this_month + burned_onprem
+        oracle_potential = (s["current_oracle_requests_per_month"] * p.DRIA_COST_PER_ORACLE_REQUEST) * p.ORACLE_USAGE_BURN_RATE
+        burned_oracle = np.minimum(oracle_potential, circulating - total_burned_this_month)
+        total_burned_this_month = total_burned_this_month + burned_oracle
+        s["burned_from_usd_monthly"] = burned_usd
+        s["burned_from_onprem_monthly"] = burned_onprem
+        s["burned_from_oracle_monthly"] = burned_oracle
+        s["circulating_supply"] = circulating - total_burned_this_month
+        s["total_tokens_burned"] = s["total_tokens_burned"] + total_burned_this_month
+
+        # 4.b. Price update
+        effective_demand_pressure = burned_usd + p.INITIAL_ORACLE_REQUESTS_PER_MONTH * p.DRIA_COST_PER_ORACLE_REQUEST
+        effective_supply_pressure = (s['newly_vested_total_monthly'] + s['emitted_node_rewards_monthly'] + s['ecosystem_fund_released_monthly']) - newly_staked
+        demand_supply_ratio = np.divide(effective_demand_pressure, effective_supply_pressure, out=np.zeros(n), where=effective_supply_pressure > 0)
+        new_price = np.where(
+            effective_supply_pressure > 0,
+            price * (1 + (demand_supply_ratio - 1) * p.PRICE_ADJUSTMENT_SENSITIVITY),
+            np.where(effective_demand_pressure > 0, price * (1 + p.PRICE_ADJUSTMENT_SENSITIVITY), price))
+        s['simulated_dria_price_usd'] = np.maximum(new_price, p.MIN_SIMULATED_DRIA_PRICE_USD)
+
+        # Record month
+        s["current_year"] = np.full(n, current_year)
+        s["current_month"] = np.full(n, current_month)
+        for col in HISTORY_COLUMNS:
+            history[col][t] = s[col]
+    return history
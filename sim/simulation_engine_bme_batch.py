@@ -0,0 +1,99 @@
+# sim/simulation_engine_bme_batch.py
+# Batched BME engine: steps N independent runs (parameter sets / scenarios) together,
+# with every state field held as an array over runs. Month-for-month equivalent to
+# simulation_engine_bme.run_simulation_bme.
+
+import numpy as np
+from batch_utils import stack_state_field, engine_streams
+from demand_paths import precompute_demand_paths_bme
+
+def run_simulation_bme_batch(initial_states, p, num_years, rng=None):
+    """
+    Runs the BME model for a list of initial state dicts (same keys as run_simulation_bme)
+    and returns the history as a dict of column -> array of shape (num_years * 12, N).
+    Extreme-event shocks are drawn from rng (see batch_utils.engine_streams).
+    """
+    n = len(initial_states)
+    timesteps = num_years * 12
+
+    circulating_supply = stack_state_field(initial_states, "circulating_supply")
+    total_tokens_burned = stack_state_field(initial_states, "total_tokens_burned")
+    total_tokens_emitted = stack_state_field(initial_states, "total_tokens_emitted")
+    dria_price_usd = stack_state_field(initial_states, "dria_price_usd")
+    node_count = stack_state_field(initial_states, "node_count")
+    demand_paths = precompute_demand_paths_bme(initial_states, p, timesteps, engine_streams(rng)[0])
+
+    columns = ["current_year", "current_month", "circulating_supply", "total_tokens_burned", "total_tokens_emitted",
+               "dria_price_usd", "node_count", "usd_demand_per_month", "dria_demand_per_month",
+               "burned_from_usd_monthly", "burned_from_dria_fees_monthly", "emitted_rewards_monthly",
+               "monthly_profit_per_node_usd", "node_growth_rate"]
+    history = {col: np.empty((timesteps, n)) for col in columns}
+    history["current_year"] = np.empty((timesteps, n), dtype=np.int64)
+    history["current_month"] = np.empty((timesteps, n), dtype=np.int64)
+    history["node_count"] = np.empty((timesteps, n), dtype=np.int64)
+
+    emission_this_month = p.BME_FIXED_EMISSION_PER_MONTH
+    lag = max(p.BME_NODE_COUNT_ADJUSTMENT_LAG_MONTHS, 1)
+
+    for t in range(timesteps):
+        # --- Market features -> demand growth (precomputed for the whole horizon) ---
+        effective_growth_rate = demand_paths["effective_growth_rate"][t]
+        churn_multiplier = demand_paths["churn_multiplier"][t]
+        usd_demand_per_month = demand_paths["usd_demand_per_month"][t]
+        dria_demand_per_month = demand_paths["dria_demand_per_month"][t]
+
+        # --- Burn USD Income (Buy-and-Burn) ---
+        positive_price = dria_price_usd > 0
+        dria_bought_for_burn = np.divide(usd_demand_per_month, dria_price_usd, out=np.zeros(n), where=positive_price)
+        burned_from_usd = dria_bought_for_burn * p.BME_BURN_PERCENT_OF_USD_INCOME
+        circulating_supply -= burned_from_usd
+        total_tokens_burned += burned_from_usd
+
+        # --- Burn DRIA Service Fees ---
+        burned_from_dria_fees = dria_demand_per_month * p.BME_BURN_PERCENT_OF_DRIA_FEES
+        circulating_supply -= burned_from_dria_fees
+        total_tokens_burned += burned_from_dria_fees
+
+        # --- Emit Fixed Rewards ---
+        circulating_supply += emission_this_month
+        total_tokens_emitted += emission_this_month
+
+        # --- Node Economics (Growth/Churn) ---
+        avg_rewards_per_node = np.divide(emission_this_month, node_count, out=np.zeros(n), where=node_count > 0)
+        profit_per_node = avg_rewards_per_node - p.BME_AVG_NODE_OPERATING_COST_USD_MONTHLY
+        growth_rate = np.where(
+            profit_per_node > p.BME_MIN_MONTHLY_PROFIT_USD_FOR_GROWTH,
+            np.minimum(p.BME_MAX_MONTHLY_NODE_GROWTH_RATE * (profit_per_node / p.BME_MIN_MONTHLY_PROFIT_USD_FOR_GROWTH), p.BME_MAX_MONTHLY_NODE_GROWTH_RATE),
+            np.maximum(-p.BME_MAX_MONTHLY_NODE_DECLINE_RATE * (np.abs(profit_per_node) / p.BME_MIN_MONTHLY_PROFIT_USD_FOR_GROWTH), -p.BME_MAX_MONTHLY_NODE_DECLINE_RATE))
+        growth_rate *= (1 - 0.5 * (churn_multiplier - 1))
+        target_node_count = node_count * (1 + growth_rate)
+        new_node_count = node_count + (target_node_count - node_count) / lag
+        node_count = np.maximum(np.rint(new_node_count), 1)
+
+        # --- Price Update Based on Supply/Demand ---
+        total_burned_this_month = burned_from_usd + burned_from_dria_fees
+        net_supply_change = emission_this_month - total_burned_this_month
+        supply_pressure = np.divide(net_supply_change, circulating_supply, out=np.zeros(n), where=circulating_supply > 0)
+        demand_pressure = effective_growth_rate * 0.5
+        price_change_factor = demand_pressure - supply_pressure
+        price_adjustment = price_change_factor * p.BME_PRICE_ADJUSTMENT_SENSITIVITY
+        price_adjustment = np.maximum(np.minimum(price_adjustment, 0.2), -0.2) # Cap at +/- 20% per month
+        dria_price_usd *= (1 + price_adjustment)
+        dria_price_usd = np.maximum(dria_price_usd, p.BME_MIN_DRIA_PRICE_USD)
+
+        # --- Record month ---
+        history["current_year"][t] = t // 12 + 1
+        history["current_month"][t] = t % 12 + 1
+        history["circulating_supply"][t] = circulating_supply
+        history["total_tokens_burned"][t] = total_tokens_burned
+        history["total_tokens_emitted"][t] = total_tokens_emitted
+        history["dria_price_usd"][t] = dria_price_usd
+        history["node_count"][t] = node_count
+        history["usd_demand_per_month"][t] = usd_demand_per_month
+        history["dria_demand_per_month"][t] = dria_demand_per_month
+        history["burned_from_usd_monthly"][t] = burned_from_usd
+        history["burned_from_dria_fees_monthly"][t] = burned_from_dria_fees
+        history["emitted_rewards_monthly"][t] = emission_this_month
+        history["monthly_profit_per_node_usd"][t] = profit_per_node
+        history["node_growth_rate"][t] = growth_rate
+    return history
@@ -3,6 +3,10 @@ import math
 import random
 import model_parameters_proposal as params
 import numpy as np
+from schedule_tables import compile_schedules_proposal, scheduled_unlock
+from demand_paths import precompute_demand_paths_proposal, single_run_paths, apply_demand_paths, DEMAND_KEYS_PROPOSAL
+from batch_utils import engine_streams
+from state_records import ProposalState
 
 def calculate_monthly_unlock(total_tokens, cliff_months, linear_vesting_months, current_simulation_month, vested_to_date):
     """Calculates tokens unlocked for a single category in the current month."""
@@ -20,96 +24,122 @@ def calculate_monthly_unlock(total_tokens, cliff_months, linear_vesting_months,
             tokens_unlocked_this_month = monthly_unlock_amount
     return tokens_unlocked_this_month
 
-def handle_vesting_proposal(state, p):
-    current_sim_month = (state["current_year"] -1) * 12 + state["current_month"]
+def vesting_unlock_proposal(state, key, total_tokens, vesting, current_simulation_month, schedules=None):
+    """Unlock for one category: precompiled schedule table when available, else calculate_monthly_unlock."""
+    if schedules is not None:
+        unlocked = scheduled_unlock(schedules['vesting'][key], current_simulation_month, getattr(state, key))
+        if unlocked is not None:
+            return unlocked
+    return calculate_monthly_unlock(total_tokens, vesting["cliff"], vesting["linear_months"], current_simulation_month, getattr(state, key))
+
+def handle_vesting_proposal(state, p, schedules=None):
+    current_sim_month = (state.current_year -1) * 12 + state.current_month
     newly_vested_total = 0
-    state['newly_vested_total_monthly_proposal'] = 0
+    state.newly_vested_total_monthly_proposal = 0
 
     # Team Vesting
-    team_unlocked = calculate_monthly_unlock(
-        p.TEAM_TOKENS_TOTAL_PROPOSAL,
-        p.TEAM_VESTING_PROPOSAL["cliff"],
-        p.TEAM_VESTING_PROPOSAL["linear_months"],
-        current_sim_month,
-        state["vested_team_tokens_proposal"]
-    )
-    state["vested_team_tokens_proposal"] += team_unlocked
+    team_unlocked = vesting_unlock_proposal(state, "vested_team_tokens_proposal", p.TEAM_TOKENS_TOTAL_PROPOSAL, p.TEAM_VESTING_PROPOSAL, current_sim_month, schedules)
+    state.vested_team_tokens_proposal += team_unlocked
     newly_vested_total += team_unlocked
 
     # Advisors Vesting
-    advisors_unlocked = calculate_monthly_unlock(
-        p.ADVISORS_TOKENS_TOTAL_PROPOSAL,
-        p.ADVISORS_VESTING_PROPOSAL["cliff"],
-        p.ADVISORS_VESTING_PROPOSAL["linear_months"],
-        current_sim_month,
-        state["vested_advisors_tokens_proposal"]
-    )
-    state["vested_advisors_tokens_proposal"] += advisors_unlocked
+    advisors_unlocked = vesting_unlock_proposal(state, "vested_advisors_tokens_proposal", p.ADVISORS_TOKENS_TOTAL_PROPOSAL, p.ADVISORS_VESTING_PROPOSAL, current_sim_month, schedules)
+    state.vested_advisors_tokens_proposal += advisors_unlocked
     newly_vested_total += advisors_unlocked
 
     # Investors Vesting
-    investors_unlocked = calculate_monthly_unlock(
-        p.INVESTORS_TOKENS_TOTAL_PROPOSAL,
-        p.INVESTORS_VESTING_PROPOSAL["cliff"],
-        p.INVESTORS_VESTING_PROPOSAL["linear_months"],
-        current_sim_month,
-        state["vested_investors_tokens_proposal"]
-    )
-    state["vested_investors_tokens_proposal"] += investors_unlocked
+    investors_unlocked = vesting_unlock_proposal(state, "vested_investors_tokens_proposal", p.INVESTORS_TOKENS_TOTAL_PROPOSAL, p.INVESTORS_VESTING_PROPOSAL, current_sim_month, schedules)
+    state.vested_investors_tokens_proposal += investors_unlocked
     newly_vested_total += investors_unlocked
     
     # Ecosystem Fund Monthly Release
     ecosystem_released_this_month = 0
-    if state["remaining_ecosystem_fund_tokens_proposal"] > 0:
-        ecosystem_released_this_month = min(p.ECOSYSTEM_FUND_MONTHLY_RELEASE_PROPOSAL, state["remaining_ecosystem_fund_tokens_proposal"])
-        state["remaining_ecosystem_fund_tokens_proposal"] -= ecosystem_released_this_month
-        state["ecosystem_fund_released_monthly_proposal"] = ecosystem_released_this_month
+    if state.remaining_ecosystem_fund_tokens_proposal > 0:
+        ecosystem_released_this_month = min(p.ECOSYSTEM_FUND_MONTHLY_RELEASE_PROPOSAL, state.remaining_ecosystem_fund_tokens_proposal)
+        state.remaining_ecosystem_fund_tokens_proposal -= ecosystem_released_this_month
+        state.ecosystem_fund_released_monthly_proposal = ecosystem_released_this_month
         newly_vested_total += ecosystem_released_this_month
 
-    state["circulating_supply_proposal"] += newly_vested_total
-    state['newly_vested_total_monthly_proposal'] = newly_vested_total
+    state.circulating_supply_proposal += newly_vested_total
+    state.newly_vested_total_monthly_proposal = newly_vested_total
     return state
 
-def handle_emissions_proposal(state, p):
+def handle_emissions_proposal(state, p, schedules=None):
     """Handles monthly emissions based on a halving schedule."""
-    absolute_month_index = (state["current_year"] - 1) * 12 + (state["current_month"] -1) 
-
-    num_halvings = 0
-    if p.PROPOSAL_HALVING_PERIOD_MONTHS > 0:
-        num_halvings = absolute_month_index // p.PROPOSAL_HALVING_PERIOD_MONTHS
-    
-    base_monthly_emission_target = p.PROPOSAL_INITIAL_MONTHLY_EMISSION / (2**num_halvings)
-    state["halvings_occurred"] = num_halvings
+    absolute_month_index = (state.current_year - 1) * 12 + (state.current_month -1) 
 
-    # Add buffer
-    buffered_monthly_emission_target = base_monthly_emission_target * (1 + p.EMISSION_BUFFER_PERCENT)
+    if schedules is not None and 0 <= absolute_month_index < len(schedules['halving']['base_emission']):
+        halving = schedules['halving']
+        num_halvings = int(halving['num_halvings'][absolute_month_index])
+        base_monthly_emission_target = float(halving['base_emission'][absolute_month_index])
+        buffered_monthly_emission_target = float(halving['buffered_emission'][absolute_month_index])
+    else:
+        num_halvings = 0
+        if p.PROPOSAL_HALVING_PERIOD_MONTHS > 0:
+            num_halvings = absolute_month_index // p.PROPOSAL_HALVING_PERIOD_MONTHS
+        base_monthly_emission_target = p.PROPOSAL_INITIAL_MONTHLY_EMISSION / (2**num_halvings)
+        # Add buffer
+        buffered_monthly_emission_target = base_monthly_emission_target * (1 + p.EMISSION_BUFFER_PERCENT)
+    state.halvings_occurred = num_halvings
 
     emitted_this_timestep = 0
-    if state["remaining_emission_pool_proposal"] > 0:
+    if state.remaining_emission_pool_proposal > 0:
         # Ensure we don't emit more than what's left, even with the buffer
-        actual_emission_this_month = min(buffered_monthly_emission_target, state["remaining_emission_pool_proposal"])
+        actual_emission_this_month = min(buffered_monthly_emission_target, state.remaining_emission_pool_proposal)
         emitted_this_timestep = actual_emission_this_month
         # We will subtract the *actually distributed* amount later, after demand scaling
-        # state["remaining_emission_pool_proposal"] -= actual_emission_this_month # Deferred
+        # state.remaining_emission_pool_proposal -= actual_emission_this_month # Deferred
     else:
         emitted_this_timestep = 0
 
     # Treasury tax from emissions
     treasury_cut_emissions = emitted_this_timestep * p.PROPOSAL_TREASURY_TAX_RATE_FROM_EMISSIONS
-    # state["treasury_balance_proposal"] += treasury_cut_emissions # Will be added in main loop after actual emission
+    # state.treasury_balance_proposal += treasury_cut_emissions # Will be added in main loop after actual emission
     
     reward_pool_for_distribution_potential = emitted_this_timestep - treasury_cut_emissions
-    # state["emitted_rewards_monthly_proposal"] = reward_pool_for_distribution_potential # This will be the *actual* distributed
-    # state["circulating_supply_proposal"] += reward_pool_for_distribution_potential # Adjusted later
+    # state.emitted_rewards_monthly_proposal = reward_pool_for_distribution_potential # This will be the *actual* distributed
+    # state.circulating_supply_proposal += reward_pool_for_distribution_potential # Adjusted later
 
-    state["current_epoch_reward_after_halving"] = base_monthly_emission_target # Store the base target for logging
-    state["total_emitted_this_timestep_before_treasury"] = emitted_this_timestep # Potential emission
+    state.current_epoch_reward_after_halving = base_monthly_emission_target # Store the base target for logging
+    state.total_emitted_this_timestep_before_treasury = emitted_this_timestep # Potential emission
 
     # Return the potential pool and the treasury cut; actual distribution and circulation impact handled in main loop
     return state, reward_pool_for_distribution_potential, treasury_cut_emissions, emitted_this_timestep
 
-def distribute_epoch_rewards_proposal(state, p, monthly_reward_pool_potential):
-    """Distributes the monthly_reward_pool_potential to contributors and validators based on Uptime, FLOPs, and stake, scaled by demand."""
+def score_contributors(num_contributors, p, rng):
+    """Draws per-contributor uptime and GFLOPs as arrays. Returns (scores, utilized_gflops)."""
+    uptime = np.clip(rng.normal(p.PROPOSAL_AVG_UPTIME_PER_CONTRIBUTOR, 0.05, num_contributors), 0, 1)
+    gflops = np.maximum(rng.normal(p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY,
+                                   p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY * 0.1, num_contributors), 0)
+    scores = np.where(gflops > 0, uptime * np.log(1 + gflops), uptime * 0.001)
+    return scores, gflops
+
+def score_contributors_in_turn(num_contributors, p, rng):
+    """The "loop" mode's draws (uptime, then GFLOPs, for each contributor in turn) taken from rng
+    in one call instead of two rng.normal calls per contributor. Returns (scores, utilized_gflops)."""
+    draws = rng.normal(0.0, 1.0, (num_contributors, 2)) # normal(): also mirrored by an AntitheticGenerator
+    uptime = np.clip(p.PROPOSAL_AVG_UPTIME_PER_CONTRIBUTOR + 0.05 * draws[:, 0], 0, 1)
+    gflops = np.maximum(p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY
+                        + p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY * 0.1 * draws[:, 1], 0)
+    scores = np.where(gflops > 0, uptime * np.log(1 + gflops), uptime * 0.001)
+    return scores, gflops
+
+def aggregate_contributor_gflops(num_contributors, p, rng):
+    """Total utilized GFLOPs over all contributors, drawn from the distribution of the sum (no per-node arrays)."""
+    if num_contributors <= 0:
+        return 0.0
+    mean = num_contributors * p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY
+    std = math.sqrt(num_contributors) * p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY * 0.1
+    return max(0.0, rng.normal(mean, std))
+
+def distribute_epoch_rewards_proposal(state, p, monthly_reward_pool_potential, rng=None, scoring_rng=None):
+    """Distributes the monthly_reward_pool_potential to contributors and validators based on Uptime, FLOPs, and stake, scaled by demand.
+    Scores are drawn from rng (the "loop" mode: as arrays, see score_contributors_in_turn); without one,
+    from scoring_rng (the "loop" mode: per node from the random module). run_simulation_proposal makes
+    scoring_rng per run from p.PROPOSAL_REWARD_SCORING_SEED; None: the global np.random."""
+    scoring_mode = getattr(p, "PROPOSAL_REWARD_SCORING_MODE", "loop")
+    per_node_arrays = scoring_mode == "vectorized" or (scoring_mode == "loop" and rng is not None)
+    rng = rng if rng is not None else (scoring_rng if scoring_rng is not None else np.random)
     total_performance_score_contributors = 0
     performance_scores_contributors = []
     total_simulated_utilized_gflops_this_month = 0
@@ -117,31 +147,41 @@ def distribute_epoch_rewards_proposal(state, p, monthly_reward_pool_potential):
     actual_distributed_to_validators = 0 # Initialize
 
     # --- Contributor Rewards ---
-    for i in range(state["current_contributor_nodes"]):
-        uptime_i = max(0, min(1, random.gauss(p.PROPOSAL_AVG_UPTIME_PER_CONTRIBUTOR, 0.05)))
-        gflops_i_monthly = max(0, random.gauss(p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY, 
-                                   p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY * 0.1))
-        total_simulated_utilized_gflops_this_month += gflops_i_monthly
-        score_i = uptime_i * math.log(1 + gflops_i_monthly) if gflops_i_monthly > 0 else uptime_i * 0.001 
-        performance_scores_contributors.append(score_i)
-        total_performance_score_contributors += score_i
-
-    total_available_gflops = state["current_contributor_nodes"] * p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY
-    state["total_available_gflops_monthly"] = total_available_gflops
-    state["total_utilized_gflops_monthly"] = total_simulated_utilized_gflops_this_month
+    if per_node_arrays:
+        score = score_contributors if scoring_mode == "vectorized" else score_contributors_in_turn
+        performance_scores_contributors, gflops = score(state.current_contributor_nodes, p, rng)
+        total_simulated_utilized_gflops_this_month = float(gflops.sum())
+        total_performance_score_contributors = float(performance_scores_contributors.sum())
+    elif scoring_mode == "aggregate":
+        # Every node's score is positive, so the proportional shares always sum to the full pool
+        total_simulated_utilized_gflops_this_month = aggregate_contributor_gflops(state.current_contributor_nodes, p, rng)
+        total_performance_score_contributors = 1.0 if state.current_contributor_nodes > 0 else 0
+    else:
+        for i in range(state.current_contributor_nodes):
+            uptime_i = max(0, min(1, random.gauss(p.PROPOSAL_AVG_UPTIME_PER_CONTRIBUTOR, 0.05)))
+            gflops_i_monthly = max(0, random.gauss(p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY, 
+                                       p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY * 0.1))
+            total_simulated_utilized_gflops_this_month += gflops_i_monthly
+            score_i = uptime_i * math.log(1 + gflops_i_monthly) if gflops_i_monthly > 0 else uptime_i * 0.001 
+            performance_scores_contributors.append(score_i)
+            total_performance_score_contributors += score_i
+
+    total_available_gflops = state.current_contributor_nodes * p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY
+    state.total_available_gflops_monthly = total_available_gflops
+    state.total_utilized_gflops_monthly = total_simulated_utilized_gflops_this_month
 
     demand_supply_ratio = 0
     if total_available_gflops > 0:
         demand_supply_ratio = total_simulated_utilized_gflops_this_month / total_available_gflops
-    state["demand_supply_ratio_monthly"] = demand_supply_ratio
+    state.demand_supply_ratio_monthly = demand_supply_ratio
 
     reward_scaling_factor = 1.0
     if p.TARGET_UTILIZATION_FOR_FULL_REWARDS > 0:
         reward_scaling_factor = min(1.0, demand_supply_ratio / p.TARGET_UTILIZATION_FOR_FULL_REWARDS)
-    state["reward_scaling_factor_monthly"] = reward_scaling_factor
+    state.reward_scaling_factor_monthly = reward_scaling_factor
 
     rewards_to_distribute_after_scaling = monthly_reward_pool_potential * reward_scaling_factor
-    state["rewards_to_distribute_after_scaling_monthly"] = rewards_to_distribute_after_scaling
+    state.rewards_to_distribute_after_scaling_monthly = rewards_to_distribute_after_scaling
 
     # Split rewards between contributors and validators (e.g., 80/20 or based on stake weight)
     # For now, let's assume all of this scaled pool goes to contributors, and validators get rewards from fees/fixed APY.
@@ -149,11 +189,17 @@ def distribute_epoch_rewards_proposal(state, p, monthly_reward_pool_potential):
     contributor_share_of_scaled_rewards = rewards_to_distribute_after_scaling 
 
     if total_performance_score_contributors > 0 and contributor_share_of_scaled_rewards > 0:
-        for score_i in performance_scores_contributors:
-            node_reward = (score_i / total_performance_score_contributors) * contributor_share_of_scaled_rewards
-            actual_distributed_to_contributors += node_reward
+        if per_node_arrays:
+            node_rewards = (performance_scores_contributors / total_performance_score_contributors) * contributor_share_of_scaled_rewards
+            actual_distributed_to_contributors = float(node_rewards.sum())
+        elif scoring_mode == "aggregate":
+            actual_distributed_to_contributors = contributor_share_of_scaled_rewards
+        else:
+            for score_i in performance_scores_contributors:
+                node_reward = (score_i / total_performance_score_contributors) * contributor_share_of_scaled_rewards
+                actual_distributed_to_contributors += node_reward
     
-    state["total_distributed_to_contributors_monthly"] = actual_distributed_to_contributors
+    state.total_distributed_to_contributors_monthly = actual_distributed_to_contributors
     
     # --- Validator Rewards (from emissions - placeholder, if any) ---
     # If validators also get a share of this `monthly_reward_pool_potential`:
@@ -164,58 +210,78 @@ def distribute_epoch_rewards_proposal(state, p, monthly_reward_pool_potential):
 
     return actual_distributed_to_contributors, actual_distributed_to_validators # Return the numbers, not state
 
-def handle_staking_and_slashing_proposal(state, p):
-    """Handles staking by validators and contributors, and potential slashing."""
+# Monthly per-node slashing event probabilities: category -> (node type, probability)
+SLASHING_EVENT_PROBABILITIES = {
+    "validator_downtime": ("validators", 0.01),      # 1% chance of downtime slash event for a validator
+    "validator_malfeasance": ("validators", 0.001),  # 0.1% chance of malfeasance slash
+    "contributor_failure": ("contributors", 0.005),  # 0.5% chance of major failure for a contributor
+}
+
+def draw_slashing_events(num_validators, num_contributors, rng, ledger=False):
+    """
+    Draws the number of slashing events per category from a binomial over the node count,
+    which has the same statistics as one Bernoulli draw per node. Returns (counts, indices);
+    indices is None unless ledger=True, in which case it maps each category to the sorted
+    indices of the slashed nodes.
+    """
+    node_counts = {"validators": max(int(num_validators), 0), "contributors": max(int(num_contributors), 0)}
+    counts = {}
+    indices = {} if ledger else None
+    for category, (node_type, probability) in SLASHING_EVENT_PROBABILITIES.items():
+        n = node_counts[node_type]
+        counts[category] = int(rng.binomial(n, probability))
+        if ledger:
+            indices[category] = np.sort(rng.choice(n, size=counts[category], replace=False))
+    return counts, indices
+
+def handle_staking_and_slashing_proposal(state, p, rng=None):
+    """Handles staking by validators and contributors, and potential slashing. Slashing events are
+    drawn from rng (run_simulation_proposal's, or one seeded from p.PROPOSAL_SLASHING_SEED per
+    run; None: the global np.random)."""
     # Simplified: Assume fixed number of validators and contributors who stake the minimum.
     # Can be made dynamic based on profitability.
     
     # Validator Staking
-    total_validator_stake = state["current_validator_nodes"] * p.PROPOSAL_MIN_VALIDATOR_STAKE_DRIA
+    total_validator_stake = state.current_validator_nodes * p.PROPOSAL_MIN_VALIDATOR_STAKE_DRIA
     
     # Contributor Staking (if required by the model)
-    total_contributor_stake = state["current_contributor_nodes"] * p.PROPOSAL_MIN_CONTRIBUTOR_STAKE_DRIA
+    total_contributor_stake = state.current_contributor_nodes * p.PROPOSAL_MIN_CONTRIBUTOR_STAKE_DRIA
     
     total_staked_now = total_validator_stake + total_contributor_stake
     
     # Net change in staked DRIA (if nodes join/leave or stake amounts change)
     # For this simplified version, assume stable node counts for now.
     # If node counts change, then:
-    # newly_staked_this_month = total_staked_now - state["total_dria_staked_proposal"]
-    # state["circulating_supply_proposal"] -= newly_staked_this_month # if positive, reduces; if negative, increases
-    # state["total_dria_staked_proposal"] = total_staked_now
+    # newly_staked_this_month = total_staked_now - state.total_dria_staked_proposal
+    # state.circulating_supply_proposal -= newly_staked_this_month # if positive, reduces; if negative, increases
+    # state.total_dria_staked_proposal = total_staked_now
 
-    state["total_dria_staked_proposal"] = total_staked_now # For now, just set it based on current nodes
+    state.total_dria_staked_proposal = total_staked_now # For now, just set it based on current nodes
     # Assume initial staking happened at T0 and is subtracted from circulating supply there.
     # Or, if we want to model dynamic staking's impact on circ supply each month:
     # Calculate change_in_stake = total_staked_now - state.get("previous_total_dria_staked_proposal", 0)
-    # state["circulating_supply_proposal"] -= change_in_stake
+    # state.circulating_supply_proposal -= change_in_stake
     # state["previous_total_dria_staked_proposal"] = total_staked_now
 
 
-    # Slashing
-    slashed_this_month = 0
-    # Validator Slashing (example: 1% chance of downtime event for a validator per month)
-    for _ in range(state["current_validator_nodes"]):
-        if random.random() < 0.01: # 1% chance of downtime slash event for a validator
-            slash_amount = p.PROPOSAL_MIN_VALIDATOR_STAKE_DRIA * p.PROPOSAL_SLASHING_PERCENTAGE_VALIDATOR_DOWNTIME
-            slashed_this_month += slash_amount
-        if random.random() < 0.001: # 0.1% chance of malfeasance slash
-            slash_amount = p.PROPOSAL_MIN_VALIDATOR_STAKE_DRIA * p.PROPOSAL_SLASHING_PERCENTAGE_VALIDATOR_MALFEASANCE
-            slashed_this_month += slash_amount
-
-    # Contributor Slashing (example: 0.5% chance of major failure for a contributor)
-    for _ in range(state["current_contributor_nodes"]):
-        if random.random() < 0.005:
-            slash_amount = p.PROPOSAL_MIN_CONTRIBUTOR_STAKE_DRIA * p.PROPOSAL_SLASHING_PERCENTAGE_CONTRIBUTOR_FAILURE
-            slashed_this_month += slash_amount
+    # Slashing (event counts per category drawn as binomials; see draw_slashing_events)
+    slashing_counts, slashing_ledger = draw_slashing_events(
+        state.current_validator_nodes, state.current_contributor_nodes,
+        rng if rng is not None else np.random, ledger=getattr(p, "PROPOSAL_SLASHING_LEDGER", False))
+    slashed_this_month = (
+        slashing_counts["validator_downtime"] * p.PROPOSAL_MIN_VALIDATOR_STAKE_DRIA * p.PROPOSAL_SLASHING_PERCENTAGE_VALIDATOR_DOWNTIME
+        + slashing_counts["validator_malfeasance"] * p.PROPOSAL_MIN_VALIDATOR_STAKE_DRIA * p.PROPOSAL_SLASHING_PERCENTAGE_VALIDATOR_MALFEASANCE
+        + slashing_counts["contributor_failure"] * p.PROPOSAL_MIN_CONTRIBUTOR_STAKE_DRIA * p.PROPOSAL_SLASHING_PERCENTAGE_CONTRIBUTOR_FAILURE)
+    if slashing_ledger is not None:
+        state["slashing_ledger_proposal"] = slashing_ledger
             
     if slashed_this_month > 0:
-        state["circulating_supply_proposal"] -= slashed_this_month # Slashed tokens removed from circ
-        state["total_tokens_slashed_proposal"] += slashed_this_month
-        state["total_dria_staked_proposal"] -= slashed_this_month # Also remove from total stake pool
+        state.circulating_supply_proposal -= slashed_this_month # Slashed tokens removed from circ
+        state.total_tokens_slashed_proposal += slashed_this_month
+        state.total_dria_staked_proposal -= slashed_this_month # Also remove from total stake pool
         # Slashed tokens could go to treasury or be burned. Assuming burned (removed from circ).
 
-    state["slashed_dria_monthly_proposal"] = slashed_this_month
+    state.slashed_dria_monthly_proposal = slashed_this_month
     
     # Validator Staking Rewards (Placeholder - can be a simple APY or share of emissions)
     # For now, let's assume validators get a base APY on their stake, funded by the overall ecosystem
@@ -223,34 +289,34 @@ def handle_staking_and_slashing_proposal(state, p):
     # If it's from general circulating supply (like an interest rate):
     validator_staking_rewards_apy = 0.05 # Example: 5% annual
     monthly_validator_rewards = (total_validator_stake * validator_staking_rewards_apy) / 12
-    state["circulating_supply_proposal"] += monthly_validator_rewards # Added to circulation
-    state["validator_staking_rewards_monthly_proposal"] = monthly_validator_rewards
+    state.circulating_supply_proposal += monthly_validator_rewards # Added to circulation
+    state.validator_staking_rewards_monthly_proposal = monthly_validator_rewards
     
     return state
 
 def handle_treasury_outflows(state, p):
     """Simulate ecosystem funding/governance by spending a portion of the treasury each month."""
-    if 'treasury_balance_proposal' in state and state['treasury_balance_proposal'] > 0:
-        outflow = state['treasury_balance_proposal'] * p.TREASURY_OUTFLOW_RATE_MONTHLY
-        state['treasury_balance_proposal'] -= outflow
-        state['circulating_supply_proposal'] += outflow  # Grants, etc. enter circulation
-        state['treasury_outflow_monthly_proposal'] = outflow
+    if state.treasury_balance_proposal > 0:
+        outflow = state.treasury_balance_proposal * p.TREASURY_OUTFLOW_RATE_MONTHLY
+        state.treasury_balance_proposal -= outflow
+        state.circulating_supply_proposal += outflow  # Grants, etc. enter circulation
+        state.treasury_outflow_monthly_proposal = outflow
     else:
-        state['treasury_outflow_monthly_proposal'] = 0
+        state.treasury_outflow_monthly_proposal = 0
     return state
 
 def update_validator_contributor_churn(state, p):
     """Update validator and contributor node counts separately based on profitability/APY."""
     # Contributors (existing logic)
-    current_contributors = state["current_contributor_nodes"]
+    current_contributors = state.current_contributor_nodes
     if not isinstance(current_contributors, int):
         print(f"DEBUG: current_contributor_nodes is not int! Got {type(current_contributors)}: {current_contributors}")
         current_contributors = 100
-        state["current_contributor_nodes"] = current_contributors
-    total_monthly_rewards = state.get("total_distributed_to_contributors_monthly", 0)
+        state.current_contributor_nodes = current_contributors
+    total_monthly_rewards = state.total_distributed_to_contributors_monthly
     if current_contributors > 0:
         avg_rewards_per_contributor_dria = total_monthly_rewards / current_contributors
-        avg_rewards_per_contributor_usd = avg_rewards_per_contributor_dria * state["simulated_dria_price_usd_proposal"]
+        avg_rewards_per_contributor_usd = avg_rewards_per_contributor_dria * state.simulated_dria_price_usd_proposal
         monthly_profit_usd = avg_rewards_per_contributor_usd - p.AVG_NODE_OPERATING_COST_USD_MONTHLY
         if monthly_profit_usd > p.MIN_MONTHLY_PROFIT_USD_FOR_GROWTH:
             profit_ratio = monthly_profit_usd / p.MIN_MONTHLY_PROFIT_USD_FOR_GROWTH
@@ -271,19 +337,19 @@ def update_validator_contributor_churn(state, p):
             print(f"DEBUG: new_contributor_count is not int! Got {type(new_contributor_count)}: {new_contributor_count}")
             new_contributor_count = 100
         new_contributor_count = max(new_contributor_count, 100)
-        state["current_contributor_nodes"] = int(new_contributor_count)
-        state["monthly_profit_per_contributor_usd"] = monthly_profit_usd
-        state["contributor_growth_rate"] = growth_rate
+        state.current_contributor_nodes = int(new_contributor_count)
+        state.monthly_profit_per_contributor_usd = monthly_profit_usd
+        state.contributor_growth_rate = growth_rate
     # Validators (new logic)
-    current_validators = state["current_validator_nodes"]
+    current_validators = state.current_validator_nodes
     if not isinstance(current_validators, int):
         print(f"DEBUG: current_validator_nodes is not int! Got {type(current_validators)}: {current_validators}")
         current_validators = 1
-        state["current_validator_nodes"] = current_validators
-    total_validator_rewards = state.get("validator_staking_rewards_monthly_proposal", 0) + state.get("fee_rewards_for_validators_monthly_proposal", 0)
+        state.current_validator_nodes = current_validators
+    total_validator_rewards = state.validator_staking_rewards_monthly_proposal + state.fee_rewards_for_validators_monthly_proposal
     if current_validators > 0:
         avg_rewards_per_validator_dria = total_validator_rewards / current_validators
-        avg_rewards_per_validator_usd = avg_rewards_per_validator_dria * state["simulated_dria_price_usd_proposal"]
+        avg_rewards_per_validator_usd = avg_rewards_per_validator_dria * state.simulated_dria_price_usd_proposal
         monthly_profit_usd = avg_rewards_per_validator_usd - p.VALIDATOR_OPERATING_COST_USD_MONTHLY
         if monthly_profit_usd > p.VALIDATOR_MIN_MONTHLY_PROFIT_USD_FOR_GROWTH:
             profit_ratio = monthly_profit_usd / p.VALIDATOR_MIN_MONTHLY_PROFIT_USD_FOR_GROWTH
@@ -304,108 +370,47 @@ def update_validator_contributor_churn(state, p):
             print(f"DEBUG: new_validator_count is not int! Got {type(new_validator_count)}: {new_validator_count}")
             new_validator_count = 1
         new_validator_count = max(new_validator_count, 1)
-        state["current_validator_nodes"] = int(new_validator_count)
-        state["monthly_profit_per_validator_usd"] = monthly_profit_usd
-        state["validator_growth_rate"] = growth_rate
+        state.current_validator_nodes = int(new_validator_count)
+        state.monthly_profit_per_validator_usd = monthly_profit_usd
+        state.validator_growth_rate = growth_rate
     return state
 
 def handle_service_fees_proposal(state, p):
     """Handles service fees paid by users, their distribution, and potential burns, with validator fee share."""
-    total_service_value_usd_this_month = state["current_usd_demand_per_month_proposal"]
-    total_service_value_dria_this_month = state["current_dria_demand_per_month_proposal"]
-    if state['simulated_dria_price_usd_proposal'] > 0:
-        service_value_from_usd_in_dria = total_service_value_usd_this_month / state['simulated_dria_price_usd_proposal']
+    total_service_value_usd_this_month = state.current_usd_demand_per_month_proposal
+    total_service_value_dria_this_month = state.current_dria_demand_per_month_proposal
+    if state.simulated_dria_price_usd_proposal > 0:
+        service_value_from_usd_in_dria = total_service_value_usd_this_month / state.simulated_dria_price_usd_proposal
     else:
         service_value_from_usd_in_dria = 0
     total_service_value_in_dria_equivalent = service_value_from_usd_in_dria + total_service_value_dria_this_month
     total_fees_generated_dria = total_service_value_in_dria_equivalent * p.PROPOSAL_SERVICE_FEE_PERCENT_OF_VALUE
-    num_transactions_proxy = (state["current_contributor_nodes"] + state["current_validator_nodes"]) * 10
+    num_transactions_proxy = (state.current_contributor_nodes + state.current_validator_nodes) * 10
     total_tx_fees_dria = num_transactions_proxy * p.PROPOSAL_AVG_TX_FEE_DRIA
     total_fees_generated_dria += total_tx_fees_dria
-    state["total_fees_generated_dria_monthly"] = total_fees_generated_dria
+    state.total_fees_generated_dria_monthly = total_fees_generated_dria
     # Distribute fees
     treasury_cut_fees = total_fees_generated_dria * p.PROPOSAL_TREASURY_TAX_RATE_FROM_FEES
     validator_cut_fees = total_fees_generated_dria * p.VALIDATOR_FEE_SHARE
     fees_after_treasury_and_validators = total_fees_generated_dria - treasury_cut_fees - validator_cut_fees
     fees_to_burn = fees_after_treasury_and_validators * 0.5
     fees_for_rewards = fees_after_treasury_and_validators - fees_to_burn
-    state["treasury_balance_proposal"] += treasury_cut_fees
-    state["fee_rewards_for_validators_monthly_proposal"] = validator_cut_fees
-    state["circulating_supply_proposal"] -= fees_to_burn
-    state["total_tokens_burned_proposal"] += fees_to_burn
-    state["burned_from_fees_monthly_proposal"] = fees_to_burn
-    state["circulating_supply_proposal"] += fees_for_rewards
+    state.treasury_balance_proposal += treasury_cut_fees
+    state.fee_rewards_for_validators_monthly_proposal = validator_cut_fees
+    state.circulating_supply_proposal -= fees_to_burn
+    state.total_tokens_burned_proposal += fees_to_burn
+    state.burned_from_fees_monthly_proposal = fees_to_burn
+    state.circulating_supply_proposal += fees_for_rewards
     # USD buy-and-burn
-    if p.USD_TO_DRIA_BURN_ACTIVE_PROPOSAL and state['simulated_dria_price_usd_proposal'] > 0:
-        usd_value_to_buy_burn = state["current_usd_demand_per_month_proposal"] * (1 - p.USD_TO_CREDIT_FX_FEE_PROPOSAL)
-        dria_bought_for_burn = usd_value_to_buy_burn / state['simulated_dria_price_usd_proposal']
-        actual_burn_from_usd = min(dria_bought_for_burn, state["circulating_supply_proposal"] - state.get("burned_from_fees_monthly_proposal",0) - state.get("slashed_dria_monthly_proposal",0) )
-        state["circulating_supply_proposal"] -= actual_burn_from_usd
-        state["total_tokens_burned_proposal"] += actual_burn_from_usd
-        state["burned_from_usd_payments_monthly_proposal"] = actual_burn_from_usd
+    if p.USD_TO_DRIA_BURN_ACTIVE_PROPOSAL and state.simulated_dria_price_usd_proposal > 0:
+        usd_value_to_buy_burn = state.current_usd_demand_per_month_proposal * (1 - p.USD_TO_CREDIT_FX_FEE_PROPOSAL)
+        dria_bought_for_burn = usd_value_to_buy_burn / state.simulated_dria_price_usd_proposal
+        actual_burn_from_usd = min(dria_bought_for_burn, state.circulating_supply_proposal - state.burned_from_fees_monthly_proposal - state.slashed_dria_monthly_proposal)
+        state.circulating_supply_proposal -= actual_burn_from_usd
+        state.total_tokens_burned_proposal += actual_burn_from_usd
+        state.burned_from_usd_payments_monthly_proposal = actual_burn_from_usd
     return state
 
-def update_demand_drivers_proposal(state, p):
-    """Update demand drivers with user churn, demand shocks, and market features."""
-    # --- Market Feature Extraction ---
-    market_trend_series = state.get('market_trend_monthly_pct_change')
-    base_growth_rate = state.get('base_usd_demand_growth_rate', p.USD_DEMAND_GROWTH_RATE_MONTHLY_PROPOSAL)
-    impact_factor = state.get('market_trend_impact_factor', 0.5)
-    market_features_df = state.get('market_features_df')
-    current_sim_month_index = (state["current_year"] - 1) * 12 + (state["current_month"] - 1)
-    trend_influence = 0.0
-    volatility_30d = 0.0
-    drawdown = 0.0
-    regime = 'sideways'
-    extreme_event = False
-    if market_features_df is not None and len(market_features_df) > current_sim_month_index:
-        features_row = market_features_df.iloc[current_sim_month_index]
-        trend_influence = features_row.get('trend_index', 0.0)
-        volatility_30d = features_row.get('volatility_30d', 0.0)
-        drawdown = features_row.get('drawdown', 0.0)
-        regime = features_row.get('regime', 'sideways')
-        extreme_event = features_row.get('extreme_event', False)
-    else:
-        if market_trend_series is not None and not isinstance(market_trend_series, type(None)) and len(market_trend_series) > current_sim_month_index:
-            trend_influence = market_trend_series.iloc[current_sim_month_index]
-    # --- Trend: modulate growth rate ---
-    effective_growth_rate = base_growth_rate * (1 + trend_influence * impact_factor)
-    # --- Regime: switch between optimistic/pessimistic growth ---
-    if regime == 'bull':
-        effective_growth_rate *= 1.2
-    elif regime == 'bear':
-        effective_growth_rate *= 0.8
-    # --- Volatility: modulate churn/staking (example: increase churn if high volatility) ---
-    churn_multiplier = 1.0
-    if volatility_30d > 0.08:
-        churn_multiplier += 0.05
-    # --- Drawdown: trigger panic events ---
-    if drawdown < -0.3:
-        effective_growth_rate *= 0.5
-        churn_multiplier += 0.10
-    # --- Extreme event: apply random demand shock ---
-    if extreme_event:
-        effective_growth_rate *= np.random.uniform(0.7, 1.3)
-    # --- Apply to demand drivers ---
-    state["current_usd_demand_per_month_proposal"] *= (1 + effective_growth_rate)
-    state["current_dria_demand_per_month_proposal"] *= (1 + p.DRIA_DEMAND_GROWTH_RATE_MONTHLY_PROPOSAL)
-    # User churn event (original logic, can be modulated by churn_multiplier)
-    if np.random.random() < p.USER_CHURN_PROBABILITY * churn_multiplier:
-        state["current_usd_demand_per_month_proposal"] *= (1 - p.USER_CHURN_MAGNITUDE)
-        state["current_dria_demand_per_month_proposal"] *= (1 - p.USER_CHURN_MAGNITUDE)
-        state["user_churn_event"] = True
-    else:
-        state["user_churn_event"] = False
-    # Demand shock event (original logic)
-    if np.random.random() < p.DEMAND_SHOCK_PROBABILITY:
-        shock = 1 + (p.DEMAND_SHOCK_MAGNITUDE if np.random.random() < 0.5 else -p.DEMAND_SHOCK_MAGNITUDE)
-        state["current_usd_demand_per_month_proposal"] *= shock
-        state["current_dria_demand_per_month_proposal"] *= shock
-        state["demand_shock_event"] = shock
-    else:
-        state["demand_shock_event"] = 0
-    return state
-    
 def update_simulated_price_proposal(state, p):
     # Simplified price model: Reacts to net change in circulating supply vs. demand proxies
     # More sophisticated models could use order book depth, velocity, etc.
@@ -421,14 +426,14 @@ def update_simulated_price_proposal(state, p):
     # - Newly emitted tokens (rewards)
 
     # Proxy for net buy pressure this month:
-    buy_pressure = state.get("burned_from_fees_monthly_proposal", 0) + \
-                   state.get("burned_from_usd_payments_monthly_proposal", 0) + \
-                   state.get("slashed_dria_monthly_proposal", 0) + \
-                   (state["current_dria_demand_per_month_proposal"] * 0.1) # Small fraction of DRIA service payments acting as buy pressure
+    buy_pressure = state.burned_from_fees_monthly_proposal + \
+                   state.burned_from_usd_payments_monthly_proposal + \
+                   state.slashed_dria_monthly_proposal + \
+                   (state.current_dria_demand_per_month_proposal * 0.1) # Small fraction of DRIA service payments acting as buy pressure
 
     # Proxy for net sell pressure this month:
-    sell_pressure = state.get("newly_vested_total_monthly_proposal", 0) + \
-                    state.get("emitted_rewards_monthly_proposal", 0) # Net rewards after treasury cut
+    sell_pressure = state.newly_vested_total_monthly_proposal + \
+                    state.emitted_rewards_monthly_proposal # Net rewards after treasury cut
 
     # Simple ratio - can be refined
     if buy_pressure > 0: # Avoid division by zero if no buy pressure
@@ -444,8 +449,8 @@ def update_simulated_price_proposal(state, p):
     # Cap adjustment to prevent extreme swings, e.g. +/- 20% per month from this factor
     price_adjustment = max(min(price_adjustment, 0.2), -0.2)
 
-    state["simulated_dria_price_usd_proposal"] *= (1 + price_adjustment)
-    state["simulated_dria_price_usd_proposal"] = max(state["simulated_dria_price_usd_proposal"], p.MIN_SIMULATED_DRIA_PRICE_USD_PROPOSAL)
+    state.simulated_dria_price_usd_proposal *= (1 + price_adjustment)
+    state.simulated_dria_price_usd_proposal = max(state.simulated_dria_price_usd_proposal, p.MIN_SIMULATED_DRIA_PRICE_USD_PROPOSAL)
     
     return state
 
@@ -453,13 +458,13 @@ def calculate_node_profitability_and_growth(state, p):
     """Calculates node profitability and adjusts node counts based on economic incentives."""
     
     # Calculate average rewards per node
-    total_monthly_rewards = state.get("total_distributed_to_contributors_monthly", 0)
-    current_nodes = state["current_contributor_nodes"]
+    total_monthly_rewards = state.total_distributed_to_contributors_monthly
+    current_nodes = state.current_contributor_nodes
     
     if current_nodes > 0:
         avg_rewards_per_node_dria = total_monthly_rewards / current_nodes
         # Convert to USD using current price
-        avg_rewards_per_node_usd = avg_rewards_per_node_dria * state["simulated_dria_price_usd_proposal"]
+        avg_rewards_per_node_usd = avg_rewards_per_node_dria * state.simulated_dria_price_usd_proposal
         
         # Calculate profit/loss
         monthly_profit_usd = avg_rewards_per_node_usd - p.AVG_NODE_OPERATING_COST_USD_MONTHLY
@@ -483,54 +488,76 @@ def calculate_node_profitability_and_growth(state, p):
         # Ensure we don't go below a minimum threshold
         new_node_count = max(new_node_count, 100)  # Maintain at least 100 nodes
         
-        state["current_contributor_nodes"] = new_node_count
-        state["monthly_profit_per_node_usd"] = monthly_profit_usd
-        state["node_growth_rate"] = growth_rate
+        state.current_contributor_nodes = new_node_count
+        state.monthly_profit_per_node_usd = monthly_profit_usd
+        state.node_growth_rate = growth_rate
     
     return state
 
-def run_simulation_proposal(initial_state, p, num_years):
-    state = initial_state.copy()
+def run_simulation_proposal(initial_state, p, num_years, recorder=None, rng=None):
+    """Runs the proposal model. Returns the list of monthly state dicts, or the filled-in
+    recorder when a HistoryRecorder is passed. With rng (a np.random.Generator, SeedSequence
+    or seed) every draw comes from it; without, from the global np.random, the random module
+    ("loop" scoring) and scoring / slashing Generators seeded from p.PROPOSAL_REWARD_SCORING_SEED
+    and p.PROPOSAL_SLASHING_SEED for this run."""
+    demand_rng = None
+    scoring_rng = None
+    if rng is not None:
+        demand_rng, rng = engine_streams(rng)
+        slashing_rng = rng
+    else:
+        scoring_rng = np.random.default_rng(getattr(p, "PROPOSAL_REWARD_SCORING_SEED", None))
+        slashing_rng = np.random.default_rng(getattr(p, "PROPOSAL_SLASHING_SEED", None))
+    state = ProposalState.from_dict(initial_state)
     history = []
+    if recorder is not None:
+        recorder.start(ProposalState, num_years * 12)
+    schedules = compile_schedules_proposal(p, num_years * 12)
+    demand_paths = single_run_paths(precompute_demand_paths_proposal([initial_state], p, num_years * 12, demand_rng), DEMAND_KEYS_PROPOSAL)
     for year in range(1, num_years + 1):
-        state["current_year"] = year
+        state.current_year = year
         for month in range(1, 13):
-            state["current_month"] = month
+            state.current_month = month
             # --- Monthly Updates ---
-            state = handle_vesting_proposal(state, p)
-            state, monthly_reward_pool_potential, treasury_cut_emissions, emitted_this_timestep = handle_emissions_proposal(state, p)
-            actual_distributed_to_contributors, actual_distributed_to_validators = distribute_epoch_rewards_proposal(state, p, monthly_reward_pool_potential)
-            state["total_distributed_to_contributors_monthly"] = actual_distributed_to_contributors
-            state["validator_staking_rewards_monthly_proposal"] = actual_distributed_to_validators
+            state = handle_vesting_proposal(state, p, schedules)
+            state, monthly_reward_pool_potential, treasury_cut_emissions, emitted_this_timestep = handle_emissions_proposal(state, p, schedules)
+            actual_distributed_to_contributors, actual_distributed_to_validators = distribute_epoch_rewards_proposal(state, p, monthly_reward_pool_potential, rng, scoring_rng)
+            state.total_distributed_to_contributors_monthly = actual_distributed_to_contributors
+            state.validator_staking_rewards_monthly_proposal = actual_distributed_to_validators
 
             # Update treasury and circulating supply based on actual distributions from EMISSIONS
-            state["treasury_balance_proposal"] += treasury_cut_emissions 
-            state["circulating_supply_proposal"] += actual_distributed_to_contributors + treasury_cut_emissions
+            state.treasury_balance_proposal += treasury_cut_emissions 
+            state.circulating_supply_proposal += actual_distributed_to_contributors + treasury_cut_emissions
             
             # Update the remaining emission pool
             amount_deducted_from_pool = actual_distributed_to_contributors + treasury_cut_emissions
-            state["remaining_emission_pool_proposal"] -= amount_deducted_from_pool
+            state.remaining_emission_pool_proposal -= amount_deducted_from_pool
             
             # Log the actual emissions that were distributed to nodes for this month
-            state["emitted_rewards_monthly_proposal"] = actual_distributed_to_contributors
+            state.emitted_rewards_monthly_proposal = actual_distributed_to_contributors
             
             # Log the portion of emissions that went to treasury
-            state["emissions_to_treasury_monthly_proposal"] = treasury_cut_emissions
+            state.emissions_to_treasury_monthly_proposal = treasury_cut_emissions
 
             state = handle_service_fees_proposal(state, p)
             state = handle_treasury_outflows(state, p)
             state = update_validator_contributor_churn(state, p)
-            state = update_demand_drivers_proposal(state, p)
+            state = apply_demand_paths(state, demand_paths, (year - 1) * 12 + (month - 1)) # Precomputed demand drivers (see demand_paths)
             
             # ADD MISSING PRICE UPDATE AND NODE GROWTH CALCULATIONS
             state = update_simulated_price_proposal(state, p)
             state = calculate_node_profitability_and_growth(state, p)
             
             # Add missing staking and slashing handling
-            state = handle_staking_and_slashing_proposal(state, p)
+            state = handle_staking_and_slashing_proposal(state, p, slashing_rng)
             
-            history.append(state.copy())
-    return history
+            if recorder is not None:
+                recorder.record((year - 1) * 12 + (month - 1), state)
+            else:
+                history.append(state.snapshot())
+    if recorder is not None:
+        return recorder
+    return ProposalState.history_to_dicts(history)
 
 # Example of how to initialize and run (would typically be in main_proposal.py)
 if __name__ == '__main__':
@@ -0,0 +1,247 @@
+# sim/simulation_engine_proposal_batch.py
+# Batched proposal engine: steps N independent proposal-model runs together with one array
+# per state field. Follows the handler order of simulation_engine.run_simulation_proposal.
+# The deterministic flows match the scalar engine exactly; the per-node random loops
+# (contributor GFLOPs, slashing) are replaced by draws with the same distribution of totals.
+
+import numpy as np
+from batch_utils import stack_state_field, engine_streams
+from demand_paths import precompute_demand_paths_proposal, DEMAND_KEYS_PROPOSAL
+from schedule_tables import compile_schedules_proposal, scheduled_unlock_batch
+from simulation_engine_proposal import SLASHING_EVENT_PROBABILITIES
+
+HISTORY_COLUMNS = [
+    "current_year", "current_month", "circulating_supply_proposal", "total_tokens_burned_proposal",
+    "total_tokens_slashed_proposal", "simulated_dria_price_usd_proposal", "remaining_emission_pool_proposal",
+    "remaining_ecosystem_fund_tokens_proposal", "treasury_balance_proposal", "vested_team_tokens_proposal",
+    "vested_advisors_tokens_proposal", "vested_investors_tokens_proposal", "current_usd_demand_per_month_proposal",
+    "current_dria_demand_per_month_proposal", "current_contributor_nodes", "current_validator_nodes",
+    "total_dria_staked_proposal", "halvings_occurred", "newly_vested_total_monthly_proposal",
+    "ecosystem_fund_released_monthly_proposal", "emitted_rewards_monthly_proposal",
+    "total_distributed_to_contributors_monthly", "slashed_dria_monthly_proposal",
+    "validator_staking_rewards_monthly_proposal", "total_fees_generated_dria_monthly",
+    "burned_from_fees_monthly_proposal", "burned_from_usd_payments_monthly_proposal",
+    "current_epoch_reward_after_halving", "total_emitted_this_timestep_before_treasury",
+    "fee_rewards_for_validators_monthly_proposal", "total_available_gflops_monthly",
+    "total_utilized_gflops_monthly", "demand_supply_ratio_monthly", "reward_scaling_factor_monthly",
+    "rewards_to_distribute_after_scaling_monthly", "emissions_to_treasury_monthly_proposal",
+    "treasury_outflow_monthly_proposal", "user_churn_event", "demand_shock_event",
+    "monthly_profit_per_validator_usd", "validator_growth_rate", "monthly_profit_per_contributor_usd",
+    "contributor_growth_rate", "monthly_profit_per_node_usd", "node_growth_rate",
+]
+INTEGER_COLUMNS = ("current_year", "current_month", "current_contributor_nodes", "current_validator_nodes", "halvings_occurred")
+BOOLEAN_COLUMNS = ("user_churn_event",)
+
+def monthly_unlock_batch(total_tokens, cliff_months, linear_vesting_months, current_simulation_month, vested_to_date):
+    """Array version of simulation_engine_proposal.calculate_monthly_unlock."""
+    if linear_vesting_months <= 0:
+        if current_simulation_month > cliff_months:
+            return np.where(vested_to_date == 0, total_tokens, 0.0)
+        return np.zeros_like(vested_to_date)
+    monthly_unlock_amount = total_tokens / linear_vesting_months
+    if current_simulation_month > cliff_months and current_simulation_month <= (cliff_months + linear_vesting_months):
+        return np.where(vested_to_date + monthly_unlock_amount > total_tokens, total_tokens - vested_to_date, monthly_unlock_amount)
+    return np.zeros_like(vested_to_date)
+
+def profitability_growth_rate(monthly_profit_usd, min_profit_for_growth, sensitivity, max_growth, max_decline):
+    """Masked version of the profit-ratio growth rule used for contributors and validators."""
+    ratio = monthly_profit_usd / min_profit_for_growth
+    return np.where(
+        monthly_profit_usd > min_profit_for_growth,
+        np.minimum(sensitivity * ratio, max_growth),
+        np.maximum(sensitivity * ratio, -max_decline))
+
+def lagged_node_count(current, growth_rate, lag_months, minimum):
+    """Moves node counts a 1/lag fraction toward the target, truncating to int like the scalar engine."""
+    target = current * (1 + growth_rate)
+    adjustment_factor = 1 / lag_months
+    return np.maximum(np.trunc(current + (target - current) * adjustment_factor), minimum)
+
+def run_simulation_proposal_batch(initial_states, p, num_years, rng=None):
+    """
+    Runs the proposal model for a list of initial state dicts (same keys as run_simulation_proposal)
+    and returns the history as a dict of column -> array of shape (num_years * 12, N).
+    All random draws come from rng (see batch_utils.engine_streams).
+    """
+    n = len(initial_states)
+    timesteps = num_years * 12
+    demand_source, source = engine_streams(rng)
+    s = {col: stack_state_field(initial_states, col) for col in HISTORY_COLUMNS}
+    demand_paths = precompute_demand_paths_proposal(initial_states, p, timesteps, demand_source)
+
+    history = {}
+    for col in HISTORY_COLUMNS:
+        dtype = np.int64 if col in INTEGER_COLUMNS else (bool if col in BOOLEAN_COLUMNS else np.float64)
+        history[col] = np.empty((timesteps, n), dtype=dtype)
+    vesting_categories = [
+        ("vested_team_tokens_proposal", p.TEAM_TOKENS_TOTAL_PROPOSAL, p.TEAM_VESTING_PROPOSAL),
+        ("vested_advisors_tokens_proposal", p.ADVISORS_TOKENS_TOTAL_PROPOSAL, p.ADVISORS_VESTING_PROPOSAL),
+        ("vested_investors_tokens_proposal", p.INVESTORS_TOKENS_TOTAL_PROPOSAL, p.INVESTORS_VESTING_PROPOSAL),
+    ]
+    zeros = np.zeros(n)
+    schedules = compile_schedules_proposal(p, timesteps)
+    gflops_std_per_node = p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY * 0.1
+    validator_downtime_slash = p.PROPOSAL_MIN_VALIDATOR_STAKE_DRIA * p.PROPOSAL_SLASHING_PERCENTAGE_VALIDATOR_DOWNTIME
+    validator_malfeasance_slash = p.PROPOSAL_MIN_VALIDATOR_STAKE_DRIA * p.PROPOSAL_SLASHING_PERCENTAGE_VALIDATOR_MALFEASANCE
+    contributor_failure_slash = p.PROPOSAL_MIN_CONTRIBUTOR_STAKE_DRIA * p.PROPOSAL_SLASHING_PERCENTAGE_CONTRIBUTOR_FAILURE
+
+    for t in range(timesteps):
+        current_sim_month = t + 1
+
+        # --- Vesting and ecosystem fund release ---
+        newly_vested_total = zeros
+        for key, total_tokens, schedule in vesting_categories:
+            unlocked = scheduled_unlock_batch(
+                schedules['vesting'][key], current_sim_month, s[key],
+                lambda: monthly_unlock_batch(total_tokens, schedule["cliff"], schedule["linear_months"], current_sim_month, s[key]))
+            s[key] = s[key] + unlocked
+            newly_vested_total = newly_vested_total + unlocked
+        eco_remaining = s["remaining_ecosystem_fund_tokens_proposal"]
+        eco_releasing = eco_remaining > 0
+        eco_released = np.where(eco_releasing, np.minimum(p.ECOSYSTEM_FUND_MONTHLY_RELEASE_PROPOSAL, eco_remaining), 0.0)
+        s["remaining_ecosystem_fund_tokens_proposal"] = eco_remaining - eco_released
+        s["ecosystem_fund_released_monthly_proposal"] = np.where(eco_releasing, eco_released, s["ecosystem_fund_released_monthly_proposal"])
+        newly_vested_total = newly_vested_total + eco_released
+        s["circulating_supply_proposal"] = s["circulating_supply_proposal"] + newly_vested_total
+        s["newly_vested_total_monthly_proposal"] = newly_vested_total
+
+        # --- Halving emissions ---
+        num_halvings = schedules['halving']['num_halvings'][t]
+        base_monthly_emission_target = schedules['halving']['base_emission'][t]
+        buffered_monthly_emission_target = schedules['halving']['buffered_emission'][t]
+        remaining_pool = s["remaining_emission_pool_proposal"]
+        emitted_this_timestep = np.where(remaining_pool > 0, np.minimum(buffered_monthly_emission_target, remaining_pool), 0.0)
+        treasury_cut_emissions = emitted_this_timestep * p.PROPOSAL_TREASURY_TAX_RATE_FROM_EMISSIONS
+        reward_pool_potential = emitted_this_timestep - treasury_cut_emissions
+        s["halvings_occurred"] = np.full(n, num_halvings)
+        s["current_epoch_reward_after_halving"] = np.full(n, base_monthly_emission_target)
+        s["total_emitted_this_timestep_before_treasury"] = emitted_this_timestep
+
+        # --- Demand-scaled reward pool (total of per-contributor GFLOPs drawn in aggregate) ---
+        contributors = s["current_contributor_nodes"]
+        utilized_gflops = np.maximum(source.normal(
+            contributors * p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY,
+            np.sqrt(np.maximum(contributors, 0)) * gflops_std_per_node), 0.0)
+        utilized_gflops = np.where(contributors > 0, utilized_gflops, 0.0)
+        available_gflops = contributors * p.PROPOSAL_AVG_GFLOPS_PER_CONTRIBUTOR_MONTHLY
+        demand_supply_ratio = np.divide(utilized_gflops, available_gflops, out=np.zeros(n), where=available_gflops > 0)
+        if p.TARGET_UTILIZATION_FOR_FULL_REWARDS > 0:
+            reward_scaling_factor = np.minimum(1.0, demand_supply_ratio / p.TARGET_UTILIZATION_FOR_FULL_REWARDS)
+        else:
+            reward_scaling_factor = np.ones(n)
+        rewards_to_distribute = reward_pool_potential * reward_scaling_factor
+        distributed_to_contributors = np.where((contributors > 0) & (rewards_to_distribute > 0), rewards_to_distribute, 0.0)
+        s["total_available_gflops_monthly"] = available_gflops
+        s["total_utilized_gflops_monthly"] = utilized_gflops
+        s["demand_supply_ratio_monthly"] = demand_supply_ratio
+        s["reward_scaling_factor_monthly"] = reward_scaling_factor
+        s["rewards_to_distribute_after_scaling_monthly"] = rewards_to_distribute
+        s["total_distributed_to_contributors_monthly"] = distributed_to_contributors
+        s["validator_staking_rewards_monthly_proposal"] = zeros
+        s["treasury_balance_proposal"] = s["treasury_balance_proposal"] + treasury_cut_emissions
+        s["circulating_supply_proposal"] = s["circulating_supply_proposal"] + (distributed_to_contributors + treasury_cut_emissions)
+        s["remaining_emission_pool_proposal"] = remaining_pool - (distributed_to_contributors + treasury_cut_emissions)
+        s["emitted_rewards_monthly_proposal"] = distributed_to_contributors
+        s["emissions_to_treasury_monthly_proposal"] = treasury_cut_emissions
+
+        # --- Service fees: treasury / validator / burn / reward split, then USD buy-and-burn ---
+        price = s['simulated_dria_price_usd_proposal']
+        positive_price = price > 0
+        service_value_from_usd_in_dria = np.divide(s["current_usd_demand_per_month_proposal"], price, out=np.zeros(n), where=positive_price)
+        total_fees = (service_value_from_usd_in_dria + s["current_dria_demand_per_month_proposal"]) * p.PROPOSAL_SERVICE_FEE_PERCENT_OF_VALUE
+        total_fees = total_fees + ((contributors + s["current_validator_nodes"]) * 10) * p.PROPOSAL_AVG_TX_FEE_DRIA
+        treasury_cut_fees = total_fees * p.PROPOSAL_TREASURY_TAX_RATE_FROM_FEES
+        validator_cut_fees = total_fees * p.VALIDATOR_FEE_SHARE
+        fees_after_treasury_and_validators = total_fees - treasury_cut_fees - validator_cut_fees
+        fees_to_burn = fees_after_treasury_and_validators * 0.5
+        fees_for_rewards = fees_after_treasury_and_validators - fees_to_burn
+        s["total_fees_generated_dria_monthly"] = total_fees
+        s["treasury_balance_proposal"] = s["treasury_balance_proposal"] + treasury_cut_fees
+        s["fee_rewards_for_validators_monthly_proposal"] = validator_cut_fees
+        s["circulating_supply_proposal"] = s["circulating_supply_proposal"] - fees_to_burn
+        s["total_tokens_burned_proposal"] = s["total_tokens_burned_proposal"] + fees_to_burn
+        s["burned_from_fees_monthly_proposal"] = fees_to_burn
+        s["circulating_supply_proposal"] = s["circulating_supply_proposal"] + fees_for_rewards
+        if p.USD_TO_DRIA_BURN_ACTIVE_PROPOSAL:
+            dria_bought_for_burn = np.divide(s["current_usd_demand_per_month_proposal"] * (1 - p.USD_TO_CREDIT_FX_FEE_PROPOSAL), price, out=np.zeros(n), where=positive_price)
+            burn_cap = s["circulating_supply_proposal"] - fees_to_burn - s["slashed_dria_monthly_proposal"]
+            burned_from_usd = np.minimum(dria_bought_for_burn, burn_cap)
+            s["circulating_supply_proposal"] = np.where(positive_price, s["circulating_supply_proposal"] - burned_from_usd, s["circulating_supply_proposal"])
+            s["total_tokens_burned_proposal"] = np.where(positive_price, s["total_tokens_burned_proposal"] + burned_from_usd, s["total_tokens_burned_proposal"])
+            s["burned_from_usd_payments_monthly_proposal"] = np.where(positive_price, burned_from_usd, s["burned_from_usd_payments_monthly_proposal"])
+
+        # --- Treasury outflows ---
+        treasury = s['treasury_balance_proposal']
+        outflow = np.where(treasury > 0, treasury * p.TREASURY_OUTFLOW_RATE_MONTHLY, 0.0)
+        s['treasury_balance_proposal'] = treasury - outflow
+        s['circulating_supply_proposal'] = s['circulating_supply_proposal'] + outflow
+        s['treasury_outflow_monthly_proposal'] = outflow
+
+        # --- Validator / contributor churn with lag ---
+        has_contributors = contributors > 0
+        avg_rewards_per_contributor_usd = np.divide(distributed_to_contributors, contributors, out=np.zeros(n), where=has_contributors) * price
+        contributor_profit = avg_rewards_per_contributor_usd - p.AVG_NODE_OPERATING_COST_USD_MONTHLY
+        contributor_growth = profitability_growth_rate(contributor_profit, p.MIN_MONTHLY_PROFIT_USD_FOR_GROWTH, p.NODE_GROWTH_SENSITIVITY, p.MAX_MONTHLY_NODE_GROWTH_RATE, p.MAX_MONTHLY_NODE_DECLINE_RATE)
+        s["current_contributor_nodes"] = np.where(has_contributors, lagged_node_count(contributors, contributor_growth, p.NODE_COUNT_ADJUSTMENT_LAG_MONTHS, 100), contributors)
+        s["monthly_profit_per_contributor_usd"] = np.where(has_contributors, contributor_profit, s["monthly_profit_per_contributor_usd"])
+        s["contributor_growth_rate"] = np.where(has_contributors, contributor_growth, s["contributor_growth_rate"])
+        validators = s["current_validator_nodes"]
+        has_validators = validators > 0
+        total_validator_rewards = s["validator_staking_rewards_monthly_proposal"] + validator_cut_fees
+        avg_rewards_per_validator_usd = np.divide(total_validator_rewards, validators, out=np.zeros(n), where=has_validators) * price
+        validator_profit = avg_rewards_per_validator_usd - p.VALIDATOR_OPERATING_COST_USD_MONTHLY
+        validator_growth = profitability_growth_rate(validator_profit, p.VALIDATOR_MIN_MONTHLY_PROFIT_USD_FOR_GROWTH, p.VALIDATOR_GROWTH_SENSITIVITY, p.VALIDATOR_MAX_MONTHLY_GROWTH_RATE, p.VALIDATOR_MAX_MONTHLY_DECLINE_RATE)
+        s["current_validator_nodes"] = np.where(has_validators, lagged_node_count(validators, validator_growth, p.VALIDATOR_COUNT_ADJUSTMENT_LAG_MONTHS, 1), validators)
+        s["monthly_profit_per_validator_usd"] = np.where(has_validators, validator_profit, s["monthly_profit_per_validator_usd"])
+        s["validator_growth_rate"] = np.where(has_validators, validator_growth, s["validator_growth_rate"])
+
+        # --- Demand drivers: market features, user churn, demand shocks (precomputed for the whole horizon) ---
+        for key in DEMAND_KEYS_PROPOSAL:
+            s[key] = demand_paths[key][t]
+
+        # --- Price update ---
+        buy_pressure = s["burned_from_fees_monthly_proposal"] + s["burned_from_usd_payments_monthly_proposal"] + \
+                       s["slashed_dria_monthly_proposal"] + (s["current_dria_demand_per_month_proposal"] * 0.1)
+        sell_pressure = s["newly_vested_total_monthly_proposal"] + s["emitted_rewards_monthly_proposal"]
+        price_change_factor = np.where(
+            buy_pressure > 0, (buy_pressure / (sell_pressure + 1)) - 1,
+            np.where(sell_pressure > 0, -(sell_pressure / (buy_pressure + 1)), 0.0))
+        price_adjustment = np.maximum(np.minimum(price_change_factor * p.PRICE_ADJUSTMENT_SENSITIVITY_PROPOSAL, 0.2), -0.2)
+        price = np.maximum(price * (1 + price_adjustment), p.MIN_SIMULATED_DRIA_PRICE_USD_PROPOSAL)
+        s["simulated_dria_price_usd_proposal"] = price
+
+        # --- Contributor profitability and growth (second adjustment, at the new price) ---
+        contributors = s["current_contributor_nodes"]
+        has_contributors = contributors > 0
+        avg_rewards_per_node_usd = np.divide(distributed_to_contributors, contributors, out=np.zeros(n), where=has_contributors) * price
+        node_profit = avg_rewards_per_node_usd - p.AVG_NODE_OPERATING_COST_USD_MONTHLY
+        node_growth = profitability_growth_rate(node_profit, p.MIN_MONTHLY_PROFIT_USD_FOR_GROWTH, p.NODE_GROWTH_SENSITIVITY, p.MAX_MONTHLY_NODE_GROWTH_RATE, p.MAX_MONTHLY_NODE_DECLINE_RATE)
+        s["current_contributor_nodes"] = np.where(has_contributors, lagged_node_count(contributors, node_growth, p.NODE_COUNT_ADJUSTMENT_LAG_MONTHS, 100), contributors)
+        s["monthly_profit_per_node_usd"] = np.where(has_contributors, node_profit, s["monthly_profit_per_node_usd"])
+        s["node_growth_rate"] = np.where(has_contributors, node_growth, s["node_growth_rate"])
+
+        # --- Staking and slashing (event counts drawn per category) ---
+        contributors = s["current_contributor_nodes"]
+        validators = s["current_validator_nodes"]
+        total_validator_stake = validators * p.PROPOSAL_MIN_VALIDATOR_STAKE_DRIA
+        total_staked_now = total_validator_stake + contributors * p.PROPOSAL_MIN_CONTRIBUTOR_STAKE_DRIA
+        node_counts = {"validators": validators.astype(np.int64), "contributors": contributors.astype(np.int64)}
+        event_counts = {category: source.binomial(node_counts[node_type], probability)
+                        for category, (node_type, probability) in SLASHING_EVENT_PROBABILITIES.items()}
+        slashed = (event_counts["validator_downtime"] * validator_downtime_slash
+                   + event_counts["validator_malfeasance"] * validator_malfeasance_slash
+                   + event_counts["contributor_failure"] * contributor_failure_slash)
+        s["circulating_supply_proposal"] = s["circulating_supply_proposal"] - slashed
+        s["total_tokens_slashed_proposal"] = s["total_tokens_slashed_proposal"] + slashed
+        s["total_dria_staked_proposal"] = total_staked_now - slashed
+        s["slashed_dria_monthly_proposal"] = slashed
+        monthly_validator_rewards = (total_validator_stake * 0.05) / 12
+        s["circulating_supply_proposal"] = s["circulating_supply_proposal"] + monthly_validator_rewards
+        s["validator_staking_rewards_monthly_proposal"] = monthly_validator_rewards
+
+        # Record month
+        s["current_year"] = np.full(n, t // 12 + 1)
+        s["current_month"] = np.full(n, t % 12 + 1)
+        for col in HISTORY_COLUMNS:
+            history[col][t] = s[col]
+    return history
@@ -0,0 +1,159 @@
+# sim/state_records.py
+# Slotted per-model simulation state. The engines' handlers read and write these fields as
+# attributes; run_* still take and return plain dicts (via from_dict / to_dict), so main*.py
+# and the comparison scripts are unchanged. Keys an engine doesn't use directly (market
+# inputs, caller extras) ride along in `_extra` and are kept in every history row.
+
+import operator
+
+class StateRecord:
+    """
+    Base class: subclasses list their fields in FIELDS (also their __slots__) and any
+    non-zero defaults in DEFAULTS. INTEGER_FIELDS / BOOLEAN_FIELDS / NON_SCALAR_FIELDS give
+    the column types used by history_recorder. Supports dict-style access (state["key"],
+    .get, `in`) for code that still treats the state as a mapping.
+    """
+
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    DEFAULTS = {}
+    INTEGER_FIELDS = ()
+    BOOLEAN_FIELDS = ()
+    NON_SCALAR_FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+        cls._values = operator.attrgetter(*cls.FIELDS) if len(cls.FIELDS) > 1 else (lambda state: (getattr(state, cls.FIELDS[0]),))
+
+    def __init__(self, **values):
+        self._extra = {}
+        for field in self.FIELDS:
+            setattr(self, field, values.pop(field, self.DEFAULTS.get(field, 0)))
+        self._extra.update(values)
+
+    @classmethod
+    def from_dict(cls, state):
+        """Record from a state dict (or another record); missing fields take their defaults."""
+        if isinstance(state, StateRecord):
+            state = state.to_dict()
+        return cls(**state)
+
+    def to_dict(self):
+        """Plain dict with every field, followed by the extra keys."""
+        state = dict(zip(self.FIELDS, self._values(self)))
+        state.update(self._extra)
+        return state
+
+    def snapshot(self):
+        """Compact, shallow copy of the current values for the history (see history_to_dicts).
+        The extras dict is shared between snapshots; __setitem__ replaces it rather than mutating it."""
+        return self._values(self), self._extra
+
+    @classmethod
+    def history_to_dicts(cls, snapshots):
+        """Expands snapshot() tuples into the list of state dicts the engines return."""
+        history = []
+        for values, extra in snapshots:
+            row = dict(zip(cls.FIELDS, values))
+            if extra:
+                row.update(extra)
+            history.append(row)
+        return history
+
+    def copy(self):
+        return self.from_dict(self)
+
+    @classmethod
+    def scalar_fields(cls):
+        """Fields that can be recorded as numeric columns (everything but NON_SCALAR_FIELDS)."""
+        return tuple(f for f in cls.FIELDS if f not in cls.NON_SCALAR_FIELDS)
+
+    # --- Mapping compatibility ---
+    def __getitem__(self, key):
+        if key in self._field_set:
+            return getattr(self, key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self._field_set:
+            setattr(self, key, value)
+        else:
+            self._extra = {**self._extra, key: value}
+
+    def __contains__(self, key):
+        return key in self._field_set or key in self._extra
+
+    def get(self, key, default=None):
+        if key in self._field_set:
+            return getattr(self, key)
+        return self._extra.get(key, default)
+
+    def keys(self):
+        return list(self.FIELDS) + list(self._extra)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()})"
+
+class OriginalState(StateRecord):
+    """State for simulation_engine.run_simulation."""
+    FIELDS = (
+        "current_year", "current_month", "circulating_supply", "total_tokens_burned", "total_dria_staked",
+        "current_node_count", "simulated_dria_price_usd", "remaining_node_rewards_pool_tokens",
+        "remaining_ecosystem_fund_tokens", "vested_team_tokens", "vested_advisors_tokens",
+        "vested_private_round_tokens", "vested_current_round_tokens", "current_usd_credit_purchase_per_month",
+        "current_dria_earned_by_on_prem_users_per_month", "current_oracle_requests_per_month",
+        "current_compute_demand_gflops_monthly", "current_network_capacity_gflops_monthly",
+        "newly_staked_dria_monthly", "actual_node_apy_monthly_percentage", "node_runner_revenue_monthly_usd",
+        "newly_vested_total_monthly", "emitted_node_rewards_monthly", "ecosystem_fund_released_monthly",
+        "burned_from_usd_monthly", "burned_from_onprem_monthly", "burned_from_oracle_monthly",
+        "apy_history", "average_apy_for_decision", "current_adjusted_base_staking_yield_annual",
+        "network_utilization_rate", "current_quarter_ecosystem_release_pool",
+        "current_quarter_ecosystem_released_so_far", "treasury_balance",
+    )
+    __slots__ = FIELDS
+    DEFAULTS = {"simulated_dria_price_usd": None} # None: update_simulated_price starts from the params' initial price
+    INTEGER_FIELDS = ("current_year", "current_month", "current_node_count")
+    NON_SCALAR_FIELDS = ("apy_history",)
+
+    def __init__(self, **values):
+        values.setdefault("apy_history", [])
+        super().__init__(**values)
+
+class ProposalState(StateRecord):
+    """State for simulation_engine_proposal.run_simulation_proposal."""
+    FIELDS = (
+        "current_year", "current_month", "circulating_supply_proposal", "total_tokens_burned_proposal",
+        "total_tokens_slashed_proposal", "simulated_dria_price_usd_proposal", "remaining_emission_pool_proposal",
+        "remaining_ecosystem_fund_tokens_proposal", "treasury_balance_proposal", "vested_team_tokens_proposal",
+        "vested_advisors_tokens_proposal", "vested_investors_tokens_proposal",
+        "current_usd_demand_per_month_proposal", "current_dria_demand_per_month_proposal",
+        "current_contributor_nodes", "current_validator_nodes", "total_dria_staked_proposal", "halvings_occurred",
+        "newly_vested_total_monthly_proposal", "ecosystem_fund_released_monthly_proposal",
+        "emitted_rewards_monthly_proposal", "total_distributed_to_contributors_monthly",
+        "slashed_dria_monthly_proposal", "validator_staking_rewards_monthly_proposal",
+        "total_fees_generated_dria_monthly", "burned_from_fees_monthly_proposal",
+        "burned_from_usd_payments_monthly_proposal", "current_epoch_reward_after_halving",
+        "total_emitted_this_timestep_before_treasury", "fee_rewards_for_validators_monthly_proposal",
+        "total_available_gflops_monthly", "total_utilized_gflops_monthly", "demand_supply_ratio_monthly",
+        "reward_scaling_factor_monthly", "rewards_to_distribute_after_scaling_monthly",
+        "emissions_to_treasury_monthly_proposal", "treasury_outflow_monthly_proposal", "user_churn_event",
+        "demand_shock_event", "monthly_profit_per_validator_usd", "validator_growth_rate",
+        "monthly_profit_per_contributor_usd", "contributor_growth_rate", "monthly_profit_per_node_usd",
+        "node_growth_rate",
+    )
+    __slots__ = FIELDS
+    DEFAULTS = {"user_churn_event": False}
+    INTEGER_FIELDS = ("current_year", "current_month", "current_contributor_nodes", "current_validator_nodes", "halvings_occurred")
+    BOOLEAN_FIELDS = ("user_churn_event",)
+
+class BmeState(StateRecord):
+    """State for simulation_engine_bme.run_simulation_bme."""
+    FIELDS = (
+        "current_year", "current_month", "circulating_supply", "total_tokens_burned", "total_tokens_emitted",
+        "dria_price_usd", "node_count", "usd_demand_per_month", "dria_demand_per_month",
+        "burned_from_usd_monthly", "burned_from_dria_fees_monthly", "emitted_rewards_monthly",
+        "monthly_profit_per_node_usd", "node_growth_rate",
+    )
+    __slots__ = FIELDS
+    INTEGER_FIELDS = ("current_year", "current_month", "node_count")
@@ -0,0 +1,94 @@
+# sim/sweep_journal.py
+# Append-only progress log for long sweeps. Each completed job is written as one JSON line
+# (job index + its metrics) and fsync'd, so a killed or preempted sweep can be restarted
+# with the same journal and only runs the jobs that are not in it yet.
+
+import json
+import os
+import numpy as np
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot write {type(value).__name__} to the sweep journal")
+
+def _int_keys(mapping):
+    """JSON object keys are strings; horizon tables are keyed by years."""
+    return {int(key): value for key, value in mapping.items()}
+
+def restore_job_metrics(metrics):
+    """A job's metrics ({'sim1_metrics': ..., ...}) as read back from JSON, with int horizon keys."""
+    for name, value in metrics.items():
+        if name.endswith('_by_horizon'):
+            metrics[name] = _int_keys(value)
+    return metrics
+
+class SweepJournal:
+    """
+    JSONL journal. The first line identifies the sweep ({"sweep": fingerprint}); every later
+    line is {"job": job_index, "metrics": {...}}. Opening an existing journal reads the jobs
+    already completed; a torn last line (crash mid-write) is ignored and overwritten.
+    Opening a journal written for a different sweep fingerprint raises ValueError.
+    """
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.completed = {}
+        valid_bytes = self._load()
+        self.file = open(path, 'r+b' if os.path.exists(path) else 'wb')
+        self.file.truncate(valid_bytes)
+        self.file.seek(valid_bytes)
+        if valid_bytes == 0:
+            self._write({'sweep': fingerprint})
+
+    def _load(self):
+        """Reads the completed jobs; returns the byte length of the intact part of the file."""
+        if not os.path.exists(self.path):
+            return 0
+        valid_bytes = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                if valid_bytes == 0:
+                    if entry.get('sweep') != self.fingerprint:
+                        raise ValueError(f"Sweep journal {self.path} was written for a different sweep "
+                                         f"(parameters, scenarios or engine sources changed); use a new path or delete it")
+                else:
+                    self.completed[entry['job']] = restore_job_metrics(entry['metrics'])
+                valid_bytes += len(line)
+        return valid_bytes
+
+    def _write(self, entry):
+        self.file.write((json.dumps(entry, default=_json_default) + '\n').encode())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def append(self, job_index, metrics):
+        """Durably records a completed job's metrics ({'sim1_metrics': ..., ...})."""
+        self._write({'job': job_index, 'metrics': metrics})
+        self.completed[job_index] = metrics
+
+    def remaining(self, job_indices):
+        """The job indices not yet in the journal, in the given order."""
+        return [job_index for job_index in job_indices if job_index not in self.completed]
+
+    def __len__(self):
+        return len(self.completed)
+
+    def __contains__(self, job_index):
+        return job_index in self.completed
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,122 @@
+# sim/sweep_sampling.py
+# Space-filling designs for continuous parameter sweeps. Instead of a full factorial grid,
+# draw N points from per-parameter ranges with a Sobol, Halton or Latin hypercube sampler;
+# every point varies every parameter, so N runs cover the space far better than a grid of
+# N cells. Uses scipy.stats.qmc when it is installed, otherwise the numpy implementations
+# below (a design is reproducible from its seed with either, but they differ).
+
+import numpy as np
+from sweep_space import PointSpace, ProductSpace, SweepSpace
+
+try:
+    from scipy.stats import qmc
+except ImportError:
+    qmc = None
+
+SAMPLERS = ('sobol', 'halton', 'lhs')
+QMC_BACKEND = 'scipy' if qmc is not None else 'numpy'
+
+# Sobol direction-number parameters (s, a, m_1..m_s) for dimensions 2.. (Joe & Kuo); the
+# first dimension is the van der Corput sequence
+SOBOL_PARAMETERS = (
+    (1, 0, (1,)), (2, 1, (1, 3)), (3, 1, (1, 3, 1)), (3, 2, (1, 1, 1)), (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)), (5, 2, (1, 1, 5, 5, 17)), (5, 4, (1, 1, 5, 5, 5)), (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)), (5, 13, (1, 1, 1, 3, 11)), (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)), (6, 13, (1, 1, 1, 15, 21, 21)), (6, 16, (1, 3, 1, 13, 27, 49)),
+)
+SOBOL_BITS = 32
+HALTON_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47, 53)
+
+# --- numpy samplers ---
+def _sobol_directions(d):
+    """(d, SOBOL_BITS) direction numbers V[j, k] as integers scaled to SOBOL_BITS bits."""
+    if d > len(SOBOL_PARAMETERS) + 1:
+        raise ValueError(f"The numpy Sobol sampler supports up to {len(SOBOL_PARAMETERS) + 1} parameters (install scipy for more)")
+    directions = np.zeros((d, SOBOL_BITS), dtype=np.uint64)
+    directions[0] = [1 << (SOBOL_BITS - 1 - k) for k in range(SOBOL_BITS)]
+    for j in range(1, d):
+        s, a, m = SOBOL_PARAMETERS[j - 1]
+        v = [m[k] << (SOBOL_BITS - 1 - k) for k in range(s)]
+        for k in range(s, SOBOL_BITS):
+            value = v[k - s] ^ (v[k - s] >> s)
+            for i in range(1, s):
+                if (a >> (s - 1 - i)) & 1:
+                    value ^= v[k - i]
+            v.append(value)
+        directions[j] = v
+    return directions
+
+def sobol_points(n, d, rng):
+    """First n points of the d-dimensional Sobol sequence (Gray-code order) with a random digital shift."""
+    directions = _sobol_directions(d)
+    gray = np.arange(n, dtype=np.uint64)
+    gray ^= gray >> np.uint64(1)
+    points = np.zeros((n, d), dtype=np.uint64)
+    for k in range(SOBOL_BITS):
+        bit = ((gray >> np.uint64(k)) & np.uint64(1)).astype(bool)
+        points[bit] ^= directions[:, k]
+    points ^= rng.integers(0, 1 << SOBOL_BITS, size=d, dtype=np.uint64)
+    return points.astype(np.float64) / float(1 << SOBOL_BITS)
+
+def halton_points(n, d, rng):
+    """First n points of the d-dimensional Halton sequence with a random shift modulo 1."""
+    if d > len(HALTON_PRIMES):
+        raise ValueError(f"The numpy Halton sampler supports up to {len(HALTON_PRIMES)} parameters (install scipy for more)")
+    points = np.zeros((n, d))
+    for j, base in enumerate(HALTON_PRIMES[:d]):
+        index = np.arange(n)
+        scale = 1.0
+        while index.any():
+            scale /= base
+            index, digit = np.divmod(index, base)
+            points[:, j] += digit * scale
+    return (points + rng.random(d)) % 1.0
+
+def latin_hypercube_points(n, d, rng):
+    """n points with exactly one in each of the n equal slices of every dimension."""
+    slices = np.argsort(rng.random((d, n)), axis=1).T
+    return (slices + rng.random((n, d))) / n
+
+# --- Designs ---
+def unit_sample(sampler, n, d, seed=None):
+    """(n, d) points in [0, 1)^d from sampler ('sobol', 'halton' or 'lhs'), scrambled / permuted from seed."""
+    if sampler not in SAMPLERS:
+        raise ValueError(f"Unknown sampler {sampler!r}; expected one of {SAMPLERS}")
+    if d == 0:
+        return np.zeros((n, 0))
+    rng = np.random.default_rng(seed)
+    if qmc is not None:
+        engines = {'sobol': qmc.Sobol, 'halton': qmc.Halton, 'lhs': qmc.LatinHypercube}
+        return engines[sampler](d, seed=rng).random(n)
+    return {'sobol': sobol_points, 'halton': halton_points, 'lhs': latin_hypercube_points}[sampler](n, d, rng)
+
+def is_range(spec):
+    """A continuous range: (low, high) or (low, high, 'log'); anything else is a list of values."""
+    return isinstance(spec, tuple) and len(spec) in (2, 3) and (len(spec) == 2 or spec[2] == 'log')
+
+def scale_to_range(u, spec):
+    """Maps unit samples u to the range spec: uniform on [low, high] (or on a log scale), and
+    integers (each value equally likely) when low and high are both ints."""
+    low, high = spec[:2]
+    log = len(spec) == 3
+    integer = isinstance(low, (int, np.integer)) and isinstance(high, (int, np.integer))
+    if log and not 0 < low < high:
+        raise ValueError(f"A log range needs 0 < low < high, got {spec}")
+    if integer and not log:
+        return np.minimum(low + np.floor(u * (high - low + 1)), high).astype(np.int64)
+    values = np.exp(np.log(low) + u * (np.log(high) - np.log(low))) if log else low + u * (high - low)
+    return np.clip(np.rint(values), low, high).astype(np.int64) if integer else values
+
+def design_space(sampler, n, ranges, seed=None):
+    """
+    Sweep space of a sampled design: n points drawn with sampler over the continuous entries
+    of ranges ({param_name: (low, high[, 'log'])}), crossed with its list entries like a grid
+    ({param_name: [values]}, e.g. SIMULATION_YEARS). Indexed like a SweepSpace: point-major,
+    the listed parameters varying fastest.
+    """
+    continuous = {key: spec for key, spec in ranges.items() if is_range(spec)}
+    listed = {key: list(spec) for key, spec in ranges.items() if not is_range(spec)}
+    unit = unit_sample(sampler, n, len(continuous), seed)
+    points = PointSpace({key: scale_to_range(unit[:, j], spec) for j, (key, spec) in enumerate(continuous.items())}
+                        if continuous else {})
+    return ProductSpace(points, SweepSpace(listed))
@@ -0,0 +1,94 @@
+# sim/sweep_scheduler.py
+# Cost-aware ordering of sweep runs. Run cost is very uneven (the proposal engine loops over
+# nodes, and a 10-year run costs twice a 5-year one), so runs are dispatched longest first
+# in chunks that shrink as the remaining work shrinks. The cost model is a per-model linear
+# fit of seconds on (1, months, months * nodes), recalibrated from the timings of each sweep.
+
+import json
+import os
+import numpy as np
+
+# (fixed, per month, per node-month) seconds, measured on a single-core machine; used until
+# a model has enough recorded timings of its own
+DEFAULT_COST_COEFFICIENTS = {
+    'sim1': (0.0, 2.4e-5, 0.0),
+    'sim2': (0.0, 2.0e-4, 1.3e-8),
+    'sim3': (0.0, 1.0e-5, 0.0),
+}
+MAX_SAMPLES_PER_MODEL = 5000 # Most recent timings kept for the fit
+CHUNKS_PER_WORKER = 4 # Guided chunking: each chunk takes about remaining / (CHUNKS_PER_WORKER * workers) seconds
+MIN_CHUNK_SECONDS = 0.05 # ...but at least this much work, to amortize the per-chunk dispatch overhead
+
+def _features(months, nodes):
+    return (1.0, float(months), float(months) * float(nodes))
+
+class CostModel:
+    """Estimated seconds per (model, months, nodes) run, calibrated from recorded run timings."""
+
+    def __init__(self, coefficients=None, samples=None):
+        self.coefficients = {model: tuple(c) for model, c in (coefficients or DEFAULT_COST_COEFFICIENTS).items()}
+        self.samples = {model: list(rows) for model, rows in (samples or {}).items()}
+
+    @classmethod
+    def load(cls, path):
+        """Cost model saved at path, or the defaults when there is no (readable) file."""
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            return cls({**DEFAULT_COST_COEFFICIENTS, **data.get('coefficients', {})}, data.get('samples'))
+        except (ValueError, OSError) as e:
+            print(f"Warning: could not read cost model {path} ({e}); using default costs.")
+            return cls()
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'coefficients': self.coefficients, 'samples': self.samples}, f)
+
+    def estimate(self, model, months, nodes):
+        coefficients = self.coefficients.get(model, DEFAULT_COST_COEFFICIENTS.get(model, (0.0, 1e-4, 0.0)))
+        return max(float(np.dot(coefficients, _features(months, nodes))), 1e-9)
+
+    def record(self, model, months, nodes, seconds):
+        rows = self.samples.setdefault(model, [])
+        rows.append((months, nodes, seconds))
+        if len(rows) > MAX_SAMPLES_PER_MODEL:
+            del rows[:len(rows) - MAX_SAMPLES_PER_MODEL]
+
+    def fit(self):
+        """Refits each model's coefficients (non-negative least squares by clipping) from its samples.
+        A model keeps its coefficients until its samples span at least two horizons or node counts."""
+        for model, rows in self.samples.items():
+            data = np.asarray(rows, dtype=np.float64)
+            if len(data) < 3 or (len(np.unique(data[:, 0])) < 2 and len(np.unique(data[:, 1])) < 2):
+                continue
+            X = np.array([_features(months, nodes) for months, nodes, _ in data])
+            coefficients, *_ = np.linalg.lstsq(X, data[:, 2], rcond=None)
+            self.coefficients[model] = tuple(float(c) for c in np.clip(coefficients, 0.0, None))
+
+def longest_first(costs):
+    """Indices of costs, most expensive first (LPT order)."""
+    return sorted(range(len(costs)), key=lambda i: -costs[i])
+
+def guided_chunks(sorted_costs, num_workers, chunks_per_worker=CHUNKS_PER_WORKER, min_chunk_cost=MIN_CHUNK_SECONDS):
+    """
+    Splits costs (already longest first) into consecutive index ranges. Each chunk
+    takes about max(remaining_cost / (chunks_per_worker * num_workers), min_chunk_cost), so
+    chunk sizes shrink towards the end of the sweep and workers finish close together.
+    Every chunk has at least one run.
+    """
+    remaining = float(sum(sorted_costs))
+    chunks = []
+    start = 0
+    while start < len(sorted_costs):
+        target = max(remaining / (chunks_per_worker * max(num_workers, 1)), min_chunk_cost)
+        stop = start
+        chunk_cost = 0.0
+        while stop < len(sorted_costs) and (stop == start or chunk_cost + sorted_costs[stop] <= target):
+            chunk_cost += sorted_costs[stop]
+            stop += 1
+        chunks.append(range(start, stop))
+        remaining -= chunk_cost
+        start = stop
+    return chunks
@@ -0,0 +1,218 @@
+# sim/sweep_space.py
+# Parameter sweep grids addressed by a flat integer index. A SweepSpace never materializes
+# the cartesian product: combination i is decoded from i on demand (mixed radix, last key
+# varying fastest, i.e. itertools.product order), so shards, random subsets and resumed
+# runs are just index ranges / index lists whatever the grid size. PointSpace holds an
+# explicit list of points (e.g. a sampled design, see sweep_sampling) and ProductSpace
+# crosses spaces in the same order. A space's definition() is plain JSON data that
+# space_from_definition rebuilds it from (e.g. to hand it to a queue worker on another host).
+
+import random
+import numpy as np
+
+def index_ranges(start, stop, chunksize):
+    """Consecutive ranges of at most chunksize indices covering [start, stop)."""
+    for chunk_start in range(start, stop, chunksize):
+        yield range(chunk_start, min(chunk_start + chunksize, stop))
+
+def contiguous_ranges(indices, chunksize):
+    """Sorted, distinct indices as consecutive ranges of at most chunksize indices (gaps start a new range)."""
+    indices = sorted(set(indices))
+    start = 0
+    while start < len(indices):
+        stop = start + 1
+        while stop < len(indices) and stop - start < chunksize and indices[stop] == indices[stop - 1] + 1:
+            stop += 1
+        yield range(indices[start], indices[stop - 1] + 1)
+        start = stop
+
+class IndexedSpace:
+    """
+    Base of the spaces: subclasses define keys, values (per key), size, __getitem__,
+    index_of, columns and definition; iteration and the index selections are shared.
+    """
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for _, params in self.items():
+            yield params
+
+    def items(self, indices=None):
+        """Yields (index, params) for the given indices (default: the whole space, in order)."""
+        for index in (range(self.size) if indices is None else indices):
+            yield index, self[index]
+
+    def _check_index(self, index):
+        """index in [0, size) (negative indices count from the end)."""
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(f"Sweep index {index} out of range for {self.size} combinations")
+        return index
+
+    # --- Index selections ---
+    def index_range(self, start=0, stop=None):
+        """range of indices from start (e.g. to resume after the first `start` runs) to stop."""
+        stop = self.size if stop is None else min(stop, self.size)
+        return range(min(start, stop), stop)
+
+    def shard(self, shard_index, num_shards):
+        """Contiguous block of indices for shard shard_index of num_shards (sizes differ by at most one)."""
+        if not 0 <= shard_index < num_shards:
+            raise ValueError(f"shard_index must be in [0, {num_shards}), got {shard_index}")
+        return range(self.size * shard_index // num_shards, self.size * (shard_index + 1) // num_shards)
+
+    def ranges(self, chunksize, start=0, stop=None):
+        """The indices from start to stop as consecutive ranges of at most chunksize."""
+        selected = self.index_range(start, stop)
+        return index_ranges(selected.start, selected.stop, chunksize)
+
+    def sample(self, k, seed=None):
+        """Sorted random subset of k distinct indices (all of them if k >= size)."""
+        if k >= self.size:
+            return list(range(self.size))
+        return sorted(random.Random(seed).sample(range(self.size), k))
+
+class SweepSpace(IndexedSpace):
+    """
+    Cartesian product of a {param_name: [values]} sweep config. space[i] is the i-th
+    combination as a {param_name: value} dict (the same order as
+    itertools.product(*config.values())) and space.index_of(params) is its inverse.
+    """
+
+    def __init__(self, config):
+        self.keys = tuple(config.keys())
+        self.values = tuple(tuple(values) for values in config.values())
+        self.shape = tuple(len(values) for values in self.values)
+        strides = []
+        stride = 1
+        for radix in reversed(self.shape):
+            strides.append(stride)
+            stride *= radix
+        self.strides = tuple(reversed(strides))
+        self.size = stride # An empty config has one (empty) combination, like itertools.product()
+
+    def definition(self):
+        return {'grid': {key: list(values) for key, values in zip(self.keys, self.values)}}
+
+    def __repr__(self):
+        return f"SweepSpace({dict(zip(self.keys, self.shape))}, size={self.size})"
+
+    def digits(self, index):
+        """Per-key value positions of combination index (negative indices count from the end)."""
+        index = self._check_index(index)
+        return tuple((index // stride) % radix for stride, radix in zip(self.strides, self.shape))
+
+    def __getitem__(self, index):
+        return {key: values[d] for key, values, d in zip(self.keys, self.values, self.digits(index))}
+
+    def index_of(self, params):
+        """Flat index of a {param_name: value} combination (extra keys are ignored)."""
+        index = 0
+        for key, values, stride in zip(self.keys, self.values, self.strides):
+            try:
+                index += values.index(params[key]) * stride
+            except ValueError:
+                raise ValueError(f"{params[key]!r} is not a swept value of '{key}': {list(values)}") from None
+        return index
+
+    def columns(self, indices):
+        """{param_name: array of its values} for an array of indices, decoded without building dicts."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return {key: np.asarray(values)[(indices // stride) % radix]
+                for key, values, stride, radix in zip(self.keys, self.values, self.strides, self.shape)}
+
+class PointSpace(IndexedSpace):
+    """
+    An explicit list of points, given as {param_name: array of values} columns of equal
+    length: space[i] is point i as a {param_name: value} dict of Python scalars.
+    """
+
+    def __init__(self, columns):
+        self.keys = tuple(columns.keys())
+        self.arrays = tuple(np.asarray(values) for values in columns.values())
+        self.values = tuple(tuple(values.tolist()) for values in self.arrays)
+        self.size = len(self.arrays[0]) if self.arrays else 1 # No keys: one (empty) point, like SweepSpace({})
+        if any(len(values) != self.size for values in self.arrays):
+            raise ValueError("PointSpace columns must have equal lengths")
+        self._index = {}
+        for index, point in enumerate(zip(*self.values)):
+            self._index.setdefault(point, index)
+
+    def definition(self):
+        return {'points': {key: list(values) for key, values in zip(self.keys, self.values)}}
+
+    def __repr__(self):
+        return f"PointSpace({list(self.keys)}, size={self.size})"
+
+    def __getitem__(self, index):
+        index = self._check_index(index)
+        return {key: values[index] for key, values in zip(self.keys, self.values)}
+
+    def index_of(self, params):
+        """Index of the first point equal to params on every key (extra keys are ignored)."""
+        point = tuple(params[key] for key in self.keys)
+        if point not in self._index:
+            raise ValueError(f"{dict(zip(self.keys, point))} is not a point of this space")
+        return self._index[point]
+
+    def columns(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        return {key: values[indices] for key, values in zip(self.keys, self.arrays)}
+
+class ProductSpace(IndexedSpace):
+    """
+    Cartesian product of spaces, the last varying fastest: index i is (i_1, ..., i_n) in mixed
+    radix of the spaces' sizes. Keys are the spaces' keys in order (they must be distinct).
+    """
+
+    def __init__(self, *spaces):
+        self.spaces = spaces
+        self.keys = tuple(key for space in spaces for key in space.keys)
+        if len(set(self.keys)) != len(self.keys):
+            raise ValueError(f"ProductSpace spaces share keys: {list(self.keys)}")
+        self.values = tuple(values for space in spaces for values in space.values)
+        strides = []
+        stride = 1
+        for space in reversed(spaces):
+            strides.append(stride)
+            stride *= len(space)
+        self.strides = tuple(reversed(strides))
+        self.size = stride
+
+    def definition(self):
+        return {'product': [space.definition() for space in self.spaces]}
+
+    def __repr__(self):
+        return f"ProductSpace({', '.join(map(repr, self.spaces))}, size={self.size})"
+
+    def __getitem__(self, index):
+        index = self._check_index(index)
+        params = {}
+        for space, stride in zip(self.spaces, self.strides):
+            params.update(space[(index // stride) % len(space)])
+        return params
+
+    def index_of(self, params):
+        return sum(space.index_of(params) * stride for space, stride in zip(self.spaces, self.strides))
+
+    def columns(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        columns = {}
+        for space, stride in zip(self.spaces, self.strides):
+            columns.update(space.columns((indices // stride) % len(space)))
+        return columns
+
+def space_from_definition(definition):
+    """Rebuilds a space from its definition() (JSON data: {'grid': config}, {'points': columns}
+    or {'product': [definitions]})."""
+    (kind, value), = definition.items()
+    if kind == 'grid':
+        return SweepSpace(value)
+    if kind == 'points':
+        return PointSpace(value)
+    if kind == 'product':
+        return ProductSpace(*(space_from_definition(item) for item in value))
+    raise ValueError(f"Unknown sweep space definition {kind!r}")
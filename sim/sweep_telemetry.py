@@ -0,0 +1,160 @@
+# sim/sweep_telemetry.py
+# Progress and resource accounting for sweeps: jobs/sec, a rolling ETA, time spent per
+# model, per-worker busy/idle time and peak RSS. Prints a compact status line while the
+# sweep runs and prints a summary at the end, optionally also written to a file (JSON, or
+# CSV with one row per model and worker), for sizing machines and spotting engine
+# slowdowns between runs.
+
+import csv
+import json
+import resource
+import sys
+import time
+from collections import deque
+
+STATUS_INTERVAL_SECONDS = 2.0 # Minimum time between status lines
+RATE_WINDOW_SECONDS = 30.0 # Throughput (and so the ETA) is measured over this trailing window
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size of this process (or RUSAGE_CHILDREN) in MB."""
+    maxrss = resource.getrusage(who).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024 # bytes on macOS, KB on Linux
+
+def format_duration(seconds):
+    """Compact h/m/s duration, e.g. '1h02m', '3m05s', '12s'."""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+class SweepTelemetry:
+    """
+    Collects a sweep's progress. The dispatcher calls record_runs() with the (model, seconds)
+    timings a worker reports and jobs_completed() as results are yielded; a status line is
+    printed at most every interval seconds (rewritten in place on a terminal). finish()
+    prints the final line and returns summary().
+    """
+
+    def __init__(self, total_jobs, num_workers, interval=STATUS_INTERVAL_SECONDS, window=RATE_WINDOW_SECONDS, stream=None):
+        self.total_jobs = total_jobs
+        self.num_workers = num_workers
+        self.interval = interval
+        self.window = window
+        self.stream = stream or sys.stdout
+        self.started = time.perf_counter()
+        self.finished = None
+        self.jobs_done = 0
+        self.model_seconds = {}
+        self.model_runs = {}
+        self.workers = {} # worker id -> {'busy_seconds', 'runs', 'peak_rss_mb'}
+        self._samples = deque([(self.started, 0)])
+        self._last_status = self.started
+
+    def record_runs(self, worker, runs, worker_peak_rss_mb=None):
+        """Adds a worker's (model, seconds) run timings and its latest peak RSS."""
+        stats = self.workers.setdefault(worker, {'busy_seconds': 0.0, 'runs': 0, 'peak_rss_mb': 0.0})
+        for model, seconds in runs:
+            self.model_seconds[model] = self.model_seconds.get(model, 0.0) + seconds
+            self.model_runs[model] = self.model_runs.get(model, 0) + 1
+            stats['busy_seconds'] += seconds
+            stats['runs'] += 1
+        if worker_peak_rss_mb is not None:
+            stats['peak_rss_mb'] = max(stats['peak_rss_mb'], worker_peak_rss_mb)
+
+    def jobs_completed(self, count=1):
+        self.jobs_done += count
+        now = time.perf_counter()
+        self._samples.append((now, self.jobs_done))
+        while len(self._samples) > 2 and self._samples[1][0] < now - self.window:
+            self._samples.popleft()
+        if now - self._last_status >= self.interval:
+            self._last_status = now
+            self._print(self.status_line(), final=False)
+
+    def elapsed(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def rate(self):
+        """Jobs per second over the trailing window."""
+        (first_time, first_done), (last_time, last_done) = self._samples[0], self._samples[-1]
+        return (last_done - first_done) / (last_time - first_time) if last_time > first_time else 0.0
+
+    def eta(self):
+        """Seconds left at the current rate (None before there is a rate)."""
+        rate = self.rate()
+        return (self.total_jobs - self.jobs_done) / rate if rate > 0 else None
+
+    def utilization(self):
+        """Busy fraction of the worker-seconds available since the start."""
+        available = self.elapsed() * max(self.num_workers, len(self.workers), 1)
+        return sum(stats['busy_seconds'] for stats in self.workers.values()) / available if available > 0 else 0.0
+
+    def status_line(self):
+        total_model_seconds = sum(self.model_seconds.values())
+        eta = self.eta()
+        parts = [f"Sweep {self.jobs_done}/{self.total_jobs} jobs ({100 * self.jobs_done / max(self.total_jobs, 1):.0f}%)",
+                 f"{self.rate():.1f} jobs/s",
+                 f"ETA {format_duration(eta) if eta is not None else '?'}",
+                 f"elapsed {format_duration(self.elapsed())}"]
+        if total_model_seconds > 0:
+            parts.append(" ".join(f"{model} {100 * seconds / total_model_seconds:.0f}%" for model, seconds in sorted(self.model_seconds.items())))
+        parts.append(f"workers {100 * self.utilization():.0f}% busy")
+        return " | ".join(parts)
+
+    def _print(self, line, final):
+        if self.stream.isatty():
+            print(f"\r{line}\033[K", end='\n' if final else '', file=self.stream, flush=True)
+        else:
+            print(line, file=self.stream, flush=True)
+
+    def finish(self):
+        """Prints the final status line and the summary; returns summary()."""
+        self.finished = time.perf_counter()
+        self._print(self.status_line(), final=True)
+        summary = self.summary()
+        print(self.summary_text(summary), file=self.stream, flush=True)
+        return summary
+
+    def summary_text(self, summary=None):
+        """summary() as a few lines: totals, then seconds per run of each model."""
+        summary = summary or self.summary()
+        lines = [f"Sweep summary: {summary['jobs']} jobs in {format_duration(summary['elapsed_seconds'])} "
+                 f"({summary['jobs_per_second']:.1f} jobs/s), workers {100 * summary['worker_utilization']:.0f}% busy, "
+                 f"peak RSS {summary['peak_rss_mb']:.0f} MB"]
+        lines += [f"  {model}: {stats['runs']} runs, {stats['seconds_per_run'] * 1000:.1f} ms/run"
+                  for model, stats in summary['models'].items()]
+        return "\n".join(lines)
+
+    def summary(self):
+        elapsed = self.elapsed()
+        return {
+            'jobs': self.jobs_done,
+            'total_jobs': self.total_jobs,
+            'elapsed_seconds': elapsed,
+            'jobs_per_second': self.jobs_done / elapsed if elapsed > 0 else 0.0,
+            'worker_utilization': self.utilization(),
+            'peak_rss_mb': max([peak_rss_mb()] + [stats['peak_rss_mb'] for stats in self.workers.values()]),
+            'models': {model: {'runs': self.model_runs[model], 'seconds': seconds,
+                               'seconds_per_run': seconds / self.model_runs[model]}
+                       for model, seconds in sorted(self.model_seconds.items())},
+            'workers': {str(worker): {**stats, 'idle_seconds': max(elapsed - stats['busy_seconds'], 0.0)}
+                        for worker, stats in self.workers.items()},
+        }
+
+    def write(self, path):
+        """Writes summary() to path: JSON, or CSV (one row per model and per worker) for a .csv path."""
+        summary = self.summary()
+        if not path.endswith('.csv'):
+            with open(path, 'w') as f:
+                json.dump(summary, f, indent=2)
+            return
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['kind', 'name', 'runs', 'seconds', 'seconds_per_run', 'idle_seconds', 'peak_rss_mb'])
+            writer.writerow(['sweep', 'total', summary['jobs'], summary['elapsed_seconds'], '', '', summary['peak_rss_mb']])
+            for model, stats in summary['models'].items():
+                writer.writerow(['model', model, stats['runs'], stats['seconds'], stats['seconds_per_run'], '', ''])
+            for worker, stats in summary['workers'].items():
+                writer.writerow(['worker', worker, stats['runs'], stats['busy_seconds'], '', stats['idle_seconds'], stats['peak_rss_mb']])
@@ -0,0 +1,149 @@
+# sim/work_queue.py
+# Lease-based work queue for sweeps that outgrow one process pool. A coordinator enqueues
+# ranges of job indices; any number of worker processes, on this host or on others that
+# share the file, lease a range, run it, renew the lease while working and acknowledge it
+# with the results. A range whose lease expires (its worker died) is leased again.
+# The broker is a single SQLite file, so the protocol can be exercised on one machine.
+
+from contextlib import contextmanager
+import json
+import os
+import socket
+import sqlite3
+import time
+import numpy as np
+
+DEFAULT_LEASE_SECONDS = 600
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot put {type(value).__name__} on the work queue")
+
+def worker_name():
+    """Default lease owner: host and process id."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class SQLiteWorkQueue:
+    """
+    Work items are (start, stop) index ranges of a named queue, each pending, leased (with an
+    owner and an expiry time) or done (with a JSON result). A queue also stores one spec
+    (opaque to the queue; JSON text from the sweep coordinator) that tells workers how to
+    run its items. Every state change is one short transaction, so concurrent workers never
+    lease the same live item.
+    """
+
+    BATCH_SIZE = 500 # Ids per SELECT ... IN (...) query (below SQLite's parameter limit)
+
+    def __init__(self, path, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        # Rollback journal (not WAL): WAL needs shared memory, which network filesystems lack
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS specs (queue TEXT PRIMARY KEY, spec BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY, queue TEXT NOT NULL, start INTEGER NOT NULL, stop INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending', owner TEXT, lease_expires REAL, attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT, UNIQUE (queue, start, stop));
+            CREATE INDEX IF NOT EXISTS items_by_state ON items (queue, state);
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT: takes the write lock up front so lease decisions can't race."""
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    # --- Coordinator side ---
+    def put_spec(self, queue, spec):
+        with self._transaction() as connection:
+            connection.execute("INSERT OR REPLACE INTO specs (queue, spec) VALUES (?, ?)", (queue, spec))
+
+    def enqueue(self, queue, ranges):
+        """Adds the ranges not already in the queue (re-enqueueing is a no-op, so a restarted
+        coordinator keeps the finished items). Returns the item ids of all the given ranges."""
+        ranges = [(r.start, r.stop) for r in ranges]
+        with self._transaction() as connection:
+            connection.executemany("INSERT OR IGNORE INTO items (queue, start, stop) VALUES (?, ?, ?)",
+                                   [(queue, start, stop) for start, stop in ranges])
+            ids = dict(((start, stop), item_id) for item_id, start, stop in
+                       connection.execute("SELECT id, start, stop FROM items WHERE queue = ?", (queue,)))
+        return [ids[r] for r in ranges]
+
+    def results(self, item_ids):
+        """{item_id: result} for the given items that are done."""
+        item_ids = list(item_ids)
+        found = {}
+        for start in range(0, len(item_ids), self.BATCH_SIZE):
+            batch = item_ids[start:start + self.BATCH_SIZE]
+            rows = self.connection.execute(
+                f"SELECT id, result FROM items WHERE state = 'done' AND id IN ({','.join('?' * len(batch))})", batch)
+            found.update((item_id, json.loads(result)) for item_id, result in rows)
+        return found
+
+    def counts(self, queue):
+        """{'pending': n, 'leased': n, 'expired': n, 'done': n} for a queue."""
+        counts = {'pending': 0, 'leased': 0, 'expired': 0, 'done': 0}
+        rows = self.connection.execute(
+            "SELECT CASE WHEN state = 'leased' AND lease_expires < ? THEN 'expired' ELSE state END, COUNT(*) "
+            "FROM items WHERE queue = ? GROUP BY 1", (time.time(), queue))
+        counts.update(rows)
+        return counts
+
+    # --- Worker side ---
+    def get_spec(self, queue):
+        row = self.connection.execute("SELECT spec FROM specs WHERE queue = ?", (queue,)).fetchone()
+        return row[0] if row else None
+
+    def queues_with_work(self):
+        """Names of queues with pending or expired items."""
+        rows = self.connection.execute(
+            "SELECT DISTINCT queue FROM items WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)", (time.time(),))
+        return [queue for (queue,) in rows]
+
+    def lease(self, queue, owner):
+        """Leases the next pending (or expired) item: returns (item_id, range) or None when there is none."""
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT id, start, stop FROM items WHERE queue = ? AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?)) "
+                "ORDER BY id LIMIT 1", (queue, now)).fetchone()
+            if row is None:
+                return None
+            item_id, start, stop = row
+            connection.execute(
+                "UPDATE items SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                (owner, now + self.lease_seconds, item_id))
+        return item_id, range(start, stop)
+
+    def renew(self, item_id, owner):
+        """Extends a held lease; False if it expired and was taken over by another worker."""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE items SET lease_expires = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                (time.time() + self.lease_seconds, item_id, owner))
+        return cursor.rowcount == 1
+
+    def ack(self, item_id, owner, result):
+        """Marks an item done with its result. The first acknowledgement wins; returns whether this one did."""
+        payload = json.dumps(result, default=_json_default)
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE items SET state = 'done', owner = ?, result = ? WHERE id = ? AND state != 'done'",
+                (owner, payload, item_id))
+        return cursor.rowcount == 1